@@ -1,11 +1,23 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from routes import user, booking, notification, admin
+import streaming
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    # Общий клиент потоковых прокси (streaming.py)
+    await streaming.aclose()
+
 
 app = FastAPI(
     title="API Gateway",
     description="Единая точка входа для blatnye-bratuyni",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan,
 )
 
 # --------------------------- CORS middleware setup ---------------------------
@@ -1,4 +1,5 @@
-from fastapi import APIRouter, Request, Depends, Response
+from fastapi import APIRouter, Body, Request, Depends, Response
+from streaming import stream_proxy
 import requests
 from config import BOOKING_SERVICE_URL
 from auth import get_current_user
@@ -40,6 +41,22 @@ async def options_zone(zone_id: int):
 async def options_zone_close(zone_id: int):
     return Response(status_code=200, headers=cors_headers())
 
+@router.options("/zones/{zone_id}/closures")
+async def options_zone_closures(zone_id: int):
+    return Response(status_code=200, headers=cors_headers())
+
+@router.options("/zones/{zone_id}/closures/{closure_id}")
+async def options_zone_closure(zone_id: int, closure_id: int):
+    return Response(status_code=200, headers=cors_headers())
+
+@router.options("/zones/{zone_id}/slots/generate")
+async def options_zone_slots_generate(zone_id: int):
+    return Response(status_code=200, headers=cors_headers())
+
+@router.options("/slots/gc")
+async def options_slots_gc():
+    return Response(status_code=200, headers=cors_headers())
+
 # --- PROXY ROUTES ---
 
 @router.post("/zones")
@@ -80,6 +97,42 @@ async def close_zone(zone_id: int, request: Request, user=Depends(get_current_us
     }
     resp = requests.post(f"{BOOKING_SERVICE_URL}/admin/zones/{zone_id}/close", json=body, headers=headers)
     return proxy_response(resp)
+
+@router.post("/zones/{zone_id}/closures")
+def create_zone_closure(zone_id: int, body: dict = Body(...), user=Depends(get_current_user)):
+    headers = {
+        "X-User-Id": str(user.get("user_id", user.get("sub"))),
+        "X-User-Role": user.get("role", "user"),
+    }
+    resp = requests.post(f"{BOOKING_SERVICE_URL}/admin/zones/{zone_id}/closures", json=body, headers=headers)
+    return proxy_response(resp)
+
+@router.get("/zones/{zone_id}/closures/{closure_id}")
+def get_zone_closure(zone_id: int, closure_id: int, user=Depends(get_current_user)):
+    headers = {
+        "X-User-Id": str(user.get("user_id", user.get("sub"))),
+        "X-User-Role": user.get("role", "user"),
+    }
+    resp = requests.get(f"{BOOKING_SERVICE_URL}/admin/zones/{zone_id}/closures/{closure_id}", headers=headers)
+    return proxy_response(resp)
+
+@router.post("/zones/{zone_id}/slots/generate")
+def generate_zone_slots(zone_id: int, body: dict = Body(...), user=Depends(get_current_user)):
+    headers = {
+        "X-User-Id": str(user.get("user_id", user.get("sub"))),
+        "X-User-Role": user.get("role", "user"),
+    }
+    resp = requests.post(f"{BOOKING_SERVICE_URL}/admin/zones/{zone_id}/slots/generate", json=body, headers=headers)
+    return proxy_response(resp)
+
+@router.post("/slots/gc")
+def collect_unused_slots(user=Depends(get_current_user)):
+    headers = {
+        "X-User-Id": str(user.get("user_id", user.get("sub"))),
+        "X-User-Role": user.get("role", "user"),
+    }
+    resp = requests.post(f"{BOOKING_SERVICE_URL}/admin/slots/gc", headers=headers)
+    return proxy_response(resp)
     
 @router.get("/zones")
 async def get_zones(user=Depends(get_current_user)):
@@ -89,3 +142,46 @@ async def get_zones(user=Depends(get_current_user)):
     }
     resp = requests.get(f"{BOOKING_SERVICE_URL}/admin/zones", headers=headers)
     return proxy_response(resp)
+
+@router.get("/zones/statistics")
+def get_zones_statistics(user=Depends(get_current_user)):
+    headers = {
+        "X-User-Id": str(user.get("user_id", user.get("sub"))),
+        "X-User-Role": user.get("role", "user"),
+    }
+    resp = requests.get(f"{BOOKING_SERVICE_URL}/admin/zones/statistics", headers=headers)
+    return proxy_response(resp)
+
+@router.get("/statistics")
+def get_global_statistics(user=Depends(get_current_user)):
+    headers = {
+        "X-User-Id": str(user.get("user_id", user.get("sub"))),
+        "X-User-Role": user.get("role", "user"),
+    }
+    resp = requests.get(f"{BOOKING_SERVICE_URL}/admin/statistics", headers=headers)
+    return proxy_response(resp)
+
+@router.get("/analytics/utilization")
+def get_utilization(request: Request, user=Depends(get_current_user)):
+    headers = {
+        "X-User-Id": str(user.get("user_id", user.get("sub"))),
+        "X-User-Role": user.get("role", "user"),
+    }
+    resp = requests.get(f"{BOOKING_SERVICE_URL}/admin/analytics/utilization", params=request.query_params, headers=headers)
+    return proxy_response(resp)
+
+@router.get("/bookings/export")
+async def export_bookings(request: Request, user=Depends(get_current_user)):
+    headers = {
+        "X-User-Id": str(user.get("user_id", user.get("sub"))),
+        "X-User-Role": user.get("role", "user"),
+    }
+    # CSV идёт клиенту по мере поступления, выгрузка целиком не буферизуется
+    return await stream_proxy(
+        f"{BOOKING_SERVICE_URL}/admin/bookings/export",
+        media_type="text/csv",
+        params=request.query_params,
+        headers=headers,
+        response_headers=cors_headers(),
+        pass_headers=("content-disposition",),
+    )
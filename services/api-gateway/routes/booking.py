@@ -1,4 +1,5 @@
-from fastapi import APIRouter, Request, Depends, Response
+from fastapi import APIRouter, Body, Request, Depends, Response
+from streaming import stream_proxy
 import requests
 from config import BOOKING_SERVICE_URL
 from auth import get_current_user
@@ -10,11 +11,26 @@ def get_zones():
     resp = requests.get(f"{BOOKING_SERVICE_URL}/zones")
     return Response(content=resp.content, status_code=resp.status_code, media_type=resp.headers.get('content-type',"application/json"))
 
+@router.get("/zones/stream")
+async def stream_zones():
+    # SSE: асинхронно, зритель не держит поток threadpool (см. streaming.py)
+    return await stream_proxy(
+        f"{BOOKING_SERVICE_URL}/zones/stream",
+        media_type="text/event-stream",
+        response_headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
 @router.get("/zones/{zone_id}/places")
 def get_places_in_zone(zone_id: int):
     resp = requests.get(f"{BOOKING_SERVICE_URL}/zones/{zone_id}/places")
     return Response(content=resp.content, status_code=resp.status_code, media_type=resp.headers.get('content-type',"application/json"))
 
+@router.get("/zones/{zone_id}/slots")
+def get_zone_slots(zone_id: int, request: Request):
+    # from / to передаются как есть
+    resp = requests.get(f"{BOOKING_SERVICE_URL}/zones/{zone_id}/slots", params=request.query_params)
+    return Response(content=resp.content, status_code=resp.status_code, media_type=resp.headers.get('content-type',"application/json"))
+
 @router.get("/places/{place_id}/slots")
 def get_slots(place_id: int, request: Request):
     # Forward query parameters
@@ -29,6 +45,9 @@ async def create_booking(request: Request, user=Depends(get_current_user)):
         "X-User-Id": str(user.get('user_id', user.get('sub'))),
         "X-User-Role": user.get('role', 'user')
     }
+    # Повтор с тем же ключом booking-service не выполнит второй раз
+    if "Idempotency-Key" in request.headers:
+        headers["Idempotency-Key"] = request.headers["Idempotency-Key"]
     resp = requests.post(f"{BOOKING_SERVICE_URL}/bookings", json=body, headers=headers)
     return Response(content=resp.content, status_code=resp.status_code, media_type=resp.headers.get('content-type',"application/json"))
 
@@ -39,9 +58,20 @@ async def create_booking_by_time(request: Request, user=Depends(get_current_user
         "X-User-Id": str(user.get('user_id', user.get('sub'))),
         "X-User-Role": user.get('role', 'user')
     }
+    if "Idempotency-Key" in request.headers:
+        headers["Idempotency-Key"] = request.headers["Idempotency-Key"]
     resp = requests.post(f"{BOOKING_SERVICE_URL}/bookings/by-time", json=body, headers=headers)
     return Response(content=resp.content, status_code=resp.status_code, media_type=resp.headers.get('content-type',"application/json"))
 
+@router.post("/bulk")
+def create_bookings_bulk(body: dict = Body(...), user=Depends(get_current_user)):
+    headers = {
+        "X-User-Id": str(user.get('user_id', user.get('sub'))),
+        "X-User-Role": user.get('role', 'user')
+    }
+    resp = requests.post(f"{BOOKING_SERVICE_URL}/bookings/bulk", json=body, headers=headers)
+    return Response(content=resp.content, status_code=resp.status_code, media_type=resp.headers.get('content-type',"application/json"))
+
 @router.post("/cancel")
 async def cancel(request: Request, user=Depends(get_current_user)):
     body = await request.json()
@@ -52,6 +82,15 @@ async def cancel(request: Request, user=Depends(get_current_user)):
     resp = requests.post(f"{BOOKING_SERVICE_URL}/bookings/cancel", json=body, headers=headers)
     return Response(content=resp.content, status_code=resp.status_code, media_type=resp.headers.get('content-type',"application/json"))
 
+@router.post("/cancel/bulk")
+def cancel_bulk(body: dict = Body(...), user=Depends(get_current_user)):
+    headers = {
+        "X-User-Id": str(user.get('user_id', user.get('sub'))),
+        "X-User-Role": user.get('role', 'user')
+    }
+    resp = requests.post(f"{BOOKING_SERVICE_URL}/bookings/cancel/bulk", json=body, headers=headers)
+    return Response(content=resp.content, status_code=resp.status_code, media_type=resp.headers.get('content-type',"application/json"))
+
 @router.get("/history")
 async def booking_history(request: Request, user=Depends(get_current_user)):
     headers = {
@@ -61,11 +100,37 @@ async def booking_history(request: Request, user=Depends(get_current_user)):
     resp = requests.get(f"{BOOKING_SERVICE_URL}/bookings/history", params=request.query_params, headers=headers)
     return Response(content=resp.content, status_code=resp.status_code, media_type=resp.headers.get('content-type',"application/json"))
 
+@router.get("/history/page")
+def booking_history_page(request: Request, user=Depends(get_current_user)):
+    headers = {
+        "X-User-Id": str(user.get('user_id', user.get('sub'))),
+        "X-User-Role": user.get('role', 'user')
+    }
+    resp = requests.get(f"{BOOKING_SERVICE_URL}/bookings/history/page", params=request.query_params, headers=headers)
+    return Response(content=resp.content, status_code=resp.status_code, media_type=resp.headers.get('content-type',"application/json"))
+
+@router.get("/history/export")
+async def booking_history_export(request: Request, user=Depends(get_current_user)):
+    headers = {
+        "X-User-Id": str(user.get('user_id', user.get('sub'))),
+        "X-User-Role": user.get('role', 'user')
+    }
+    # Строки идут клиенту по мере поступления, выгрузка целиком не буферизуется
+    return await stream_proxy(
+        f"{BOOKING_SERVICE_URL}/bookings/history/export",
+        media_type="application/x-ndjson",
+        params=request.query_params,
+        headers=headers,
+    )
+
 @router.post("/{booking_id}/extend")
-async def extend_booking(booking_id: int, user=Depends(get_current_user)):
+async def extend_booking(booking_id: int, request: Request, user=Depends(get_current_user)):
+    body = await request.json()
     headers = {
         "X-User-Id": str(user.get('user_id', user.get('sub'))),
         "X-User-Role": user.get('role', 'user')
     }
-    resp = requests.post(f"{BOOKING_SERVICE_URL}/bookings/{booking_id}/extend", headers=headers)
+    if "Idempotency-Key" in request.headers:
+        headers["Idempotency-Key"] = request.headers["Idempotency-Key"]
+    resp = requests.post(f"{BOOKING_SERVICE_URL}/bookings/{booking_id}/extend", json=body, headers=headers)
     return Response(content=resp.content, status_code=resp.status_code, media_type=resp.headers.get('content-type',"application/json"))
\ No newline at end of file
@@ -0,0 +1,71 @@
+"""
+Потоковое проксирование ответов booking-service: SSE (/bookings/zones/stream)
+и выгрузки (NDJSON-история, CSV броней).
+
+Остальные ручки шлюза ходят в сервисы через блокирующий requests. Ручки,
+объявленные через def, FastAPI выполняет в threadpool anyio (по умолчанию
+40 потоков): запрос короткий, поток быстро освобождается. Старые ручки
+объявлены async def и вызывают requests прямо в цикле событий, то есть
+на время запроса к сервису стоит весь шлюз. Потоковое соединение живёт
+минутами (SSE — всё время, пока открыта страница): с requests в async def
+оно остановило бы цикл событий, в def — держало бы поток пула, и
+несколько десятков открытых вкладок заняли бы весь threadpool. Поэтому
+потоковые ручки асинхронные целиком: общий httpx.AsyncClient, тело
+передаётся клиенту по мере поступления через aiter_raw, соединение с
+сервисом закрывается по окончании ответа или при отключении клиента.
+"""
+from typing import Iterable, Mapping, Optional
+
+import httpx
+from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
+
+# Таймаут только на подключение и отправку: поток ответа ждём сколько угодно
+TIMEOUT = httpx.Timeout(5.0, read=None)
+
+_client: Optional[httpx.AsyncClient] = None
+
+
+def get_client() -> httpx.AsyncClient:
+    global _client
+    if _client is None:
+        # identity: байты из aiter_raw отдаются клиенту как есть, без Content-Encoding
+        _client = httpx.AsyncClient(timeout=TIMEOUT, headers={"Accept-Encoding": "identity"})
+    return _client
+
+
+async def aclose() -> None:
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
+async def stream_proxy(
+    url: str,
+    *,
+    media_type: str,
+    params=None,
+    headers: Optional[Mapping[str, str]] = None,
+    response_headers: Optional[Mapping[str, str]] = None,
+    pass_headers: Iterable[str] = (),
+) -> StreamingResponse:
+    """
+    GET url и ответ, который отдаёт тело потоком. pass_headers — заголовки
+    ответа сервиса, которые передаются клиенту (например, Content-Disposition).
+    """
+    client = get_client()
+    resp = await client.send(
+        client.build_request("GET", url, params=params, headers=headers), stream=True
+    )
+    out_headers = dict(response_headers or {})
+    for name in pass_headers:
+        if name in resp.headers:
+            out_headers[name] = resp.headers[name]
+    return StreamingResponse(
+        resp.aiter_raw(),
+        status_code=resp.status_code,
+        media_type=resp.headers.get("content-type", media_type),
+        headers=out_headers,
+        background=BackgroundTask(resp.aclose),
+    )
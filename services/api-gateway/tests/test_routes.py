@@ -57,3 +57,64 @@ def test_get_zones_route(mock_get, test_client):
     
     assert response.status_code == 200
     mock_get.assert_called_once()
+
+
+def test_stream_proxies_are_async(test_client, monkeypatch):
+    """Потоковые прокси асинхронные и отдают тело сервиса как есть"""
+    import inspect
+
+    import httpx
+
+    import streaming
+    from routes import admin, booking
+
+    for route in (booking.stream_zones, booking.booking_history_export, admin.export_bookings):
+        assert inspect.iscoroutinefunction(route)
+
+    async def chunks():
+        yield b"event: snapshot\ndata: {}\n\n"
+        yield b"event: slot_taken\ndata: {}\n\n"
+
+    def handler(request):
+        assert request.url.path == "/zones/stream"
+        return httpx.Response(200, headers={"content-type": "text/event-stream"}, content=chunks())
+
+    monkeypatch.setattr(streaming, "_client", httpx.AsyncClient(transport=httpx.MockTransport(handler)))
+
+    response = test_client.get("/bookings/zones/stream")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    assert response.headers["cache-control"] == "no-cache"
+    assert response.text.count("event:") == 2
+
+
+@patch('routes.booking.requests.post')
+def test_blocking_proxies_run_in_threadpool(mock_post, test_client):
+    """Прокси с блокирующим requests объявлены def: FastAPI выполняет их в threadpool"""
+    import inspect
+
+    import jwt
+
+    from config import SECRET_KEY
+    from routes import admin, booking
+
+    for route in (
+        booking.create_bookings_bulk, booking.cancel_bulk, booking.booking_history_page,
+        admin.create_zone_closure, admin.get_zone_closure, admin.generate_zone_slots,
+        admin.collect_unused_slots, admin.get_zones_statistics,
+        admin.get_global_statistics, admin.get_utilization,
+    ):
+        assert not inspect.iscoroutinefunction(route)
+
+    mock_response = MagicMock()
+    mock_response.status_code = 422
+    mock_response.content = b'{"detail": "booking_ids, zone_id/date_from/date_to or all=true is required"}'
+    mock_response.headers = {'content-type': 'application/json'}
+    mock_post.return_value = mock_response
+    token = jwt.encode({"user_id": 1, "role": "user"}, SECRET_KEY, algorithm="HS256")
+
+    response = test_client.post(
+        "/bookings/cancel/bulk", json={}, headers={"Authorization": f"Bearer {token}"}
+    )
+    assert response.status_code == 422
+    assert mock_post.call_args.kwargs["json"] == {}
@@ -1,6 +1,9 @@
 from __future__ import annotations
 
-from typing import List
+import csv
+import io
+from datetime import date, datetime
+from typing import List, Optional
 
 from fastapi import (
     APIRouter,
@@ -8,16 +11,25 @@ from fastapi import (
     HTTPException,
     status,
     Path,
+    Query,
 )
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func, case, and_
+from sqlalchemy import select, func, case
 
+import analytics
+import clients
 import crud
+import dashboard
 import schemas
 import models
-from db import get_session
+import notifications
+import slot_grid
+from config import settings
+from db import get_read_session, get_session
+from fastjson import FastJSONResponse
 from security import require_admin
-from timezone_utils import now_msk, msk_to_utc
+from timezone_utils import now_utc, utc_iso
 
 router = APIRouter(prefix="/admin", tags=["admin"])
 
@@ -27,36 +39,24 @@ router = APIRouter(prefix="/admin", tags=["admin"])
     summary="Получить все зоны (включая закрытые) с полной статистикой (admin)",
 )
 async def get_all_zones_endpoint(
-    session: AsyncSession = Depends(get_session),
+    session: AsyncSession = Depends(get_read_session),
     _: None = Depends(require_admin),
 ):
+    if settings.FAST_JSON_RESPONSES:
+        return FastJSONResponse(
+            await crud.get_zones(session=session, include_inactive=True, as_rows=True)
+        )
     return await crud.get_zones(session=session, include_inactive=True)
 
 async def calc_zone_stats(session: AsyncSession, zone_id: int):
-    now = msk_to_utc(now_msk())
+    now = now_utc()
     stmt = (
         select(
             func.count(case((models.Booking.status == "active", 1))).label("active_bookings"),
             func.count(case((models.Booking.status == "cancelled", 1))).label("cancelled_bookings"),
-            func.count(
-                case(
-                    (
-                        and_(
-                            models.Booking.status == "active",
-                            models.Booking.start_time <= now,
-                            models.Booking.end_time > now,
-                        ),
-                        1
-                    )
-                )
-            ).label("current_occupancy"),
-        )
-        .select_from(models.Zone)
-        .outerjoin(models.Place, models.Place.zone_id == models.Zone.id)
-        .outerjoin(models.Slot, models.Slot.place_id == models.Place.id)
-        .outerjoin(models.Booking, models.Booking.slot_id == models.Slot.id)
-        .where(models.Zone.id == zone_id)
-        .group_by(models.Zone.id)
+            func.count(case((crud.in_progress(now), 1))).label("current_occupancy"),
+        )
+        .where(models.Booking.zone_id == zone_id)
     )
 
     result = await session.execute(stmt)
@@ -94,6 +94,9 @@ async def create_zone_endpoint(
         is_active=zone.is_active,
         closure_reason=zone.closure_reason,
         closed_until=zone.closed_until,
+        opens_at=zone.opens_at,
+        closes_at=zone.closes_at,
+        slot_minutes=zone.slot_minutes,
         created_at=zone.created_at,
         updated_at=zone.updated_at,
         **stats
@@ -110,11 +113,17 @@ async def update_zone_endpoint(
     session: AsyncSession = Depends(get_session),
     _: None = Depends(require_admin),
 ):
-    zone = await crud.update_zone(
-        session=session,
-        zone_id=zone_id,
-        data=data,
-    )
+    try:
+        zone = await crud.update_zone(
+            session=session,
+            zone_id=zone_id,
+            data=data,
+        )
+    except crud.ZoneUpdateError as e:
+        raise HTTPException(
+            status_code=422,
+            detail=str(e),
+        )
     if zone is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -128,6 +137,9 @@ async def update_zone_endpoint(
         is_active=zone.is_active,
         closure_reason=zone.closure_reason,
         closed_until=zone.closed_until,
+        opens_at=zone.opens_at,
+        closes_at=zone.closes_at,
+        slot_minutes=zone.slot_minutes,
         created_at=zone.created_at,
         updated_at=zone.updated_at,
         **stats
@@ -167,4 +179,214 @@ async def close_zone_endpoint(
         zone_id=zone_id,
         data=data,
     )
-    return affected_bookings
\ No newline at end of file
+    return affected_bookings
+
+
+@router.post(
+    "/zones/{zone_id}/closures",
+    response_model=schemas.ZoneClosureOut,
+    status_code=status.HTTP_202_ACCEPTED,
+    summary="Закрыть зону без списка броней в ответе; прогресс уведомлений — по id (admin)",
+)
+async def create_zone_closure_endpoint(
+    zone_id: int = Path(..., description="ID зоны"),
+    data: schemas.ZoneCloseRequest = ...,
+    session: AsyncSession = Depends(get_session),
+    _: None = Depends(require_admin),
+):
+    outcome = await crud.close_zone_tracked(
+        session=session,
+        zone_id=zone_id,
+        data=data,
+    )
+    if outcome is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Зона не найдена",
+        )
+    closure, _ = outcome
+    return await crud.get_zone_closure(session=session, closure_id=closure.id)
+
+
+@router.get(
+    "/zones/{zone_id}/closures/{closure_id}",
+    response_model=schemas.ZoneClosureOut,
+    summary="Прогресс рассылки уведомлений по закрытию зоны (admin)",
+)
+async def get_zone_closure_endpoint(
+    zone_id: int = Path(..., description="ID зоны"),
+    closure_id: int = Path(..., description="ID закрытия"),
+    session: AsyncSession = Depends(get_session),
+    _: None = Depends(require_admin),
+):
+    closure = await crud.get_zone_closure(session=session, closure_id=closure_id)
+    if closure is None or closure.zone_id != zone_id:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Закрытие зоны не найдено",
+        )
+    return closure
+
+@router.post(
+    "/zones/{zone_id}/slots/generate",
+    response_model=schemas.SlotGridResult,
+    summary="Сгенерировать сетку слотов зоны на интервал дат (admin)",
+)
+async def generate_slot_grid_endpoint(
+    zone_id: int = Path(..., description="ID зоны"),
+    data: schemas.SlotGridRequest = ...,
+    session: AsyncSession = Depends(get_session),
+    _: None = Depends(require_admin),
+):
+    try:
+        outcome = await slot_grid.generate_slot_grid(
+            session=session,
+            zone_id=zone_id,
+            date_from=data.date_from,
+            date_to=data.date_to,
+        )
+    except slot_grid.SlotGridError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e),
+        )
+    if outcome is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Зона не найдена",
+        )
+    places, created = outcome
+    return schemas.SlotGridResult(
+        zone_id=zone_id,
+        places=places,
+        days=(data.date_to - data.date_from).days + 1,
+        created=created,
+    )
+
+
+@router.post(
+    "/slots/gc",
+    response_model=schemas.SlotGcResult,
+    summary="Удалить прошедшие неиспользованные слоты (admin)",
+)
+async def collect_unused_slots_endpoint(
+    session: AsyncSession = Depends(get_session),
+    _: None = Depends(require_admin),
+):
+    deleted = await slot_grid.collect_unused_slots(session=session)
+    return schemas.SlotGcResult(deleted=deleted)
+
+
+@router.get(
+    "/zones/statistics",
+    response_model=List[schemas.ZoneStatistics],
+    summary="Статистика по всем зонам, включая закрытые (admin)",
+)
+async def get_zones_statistics_endpoint(
+    session: AsyncSession = Depends(get_read_session),
+    _: None = Depends(require_admin),
+):
+    return (await dashboard.dashboard.get(session)).zones
+
+
+@router.get(
+    "/statistics",
+    response_model=schemas.GlobalStatistics,
+    summary="Общая статистика по коворкингу (admin)",
+)
+async def get_global_statistics_endpoint(
+    session: AsyncSession = Depends(get_read_session),
+    _: None = Depends(require_admin),
+):
+    return (await dashboard.dashboard.get(session)).totals
+
+
+@router.get(
+    "/analytics/utilization",
+    response_model=schemas.UtilizationOut,
+    summary="Загрузка зон по дням недели и часам за интервал дат (admin)",
+)
+async def get_utilization_endpoint(
+    date_from: date = Query(..., alias="from"),
+    date_to: date = Query(..., alias="to"),
+    zone_id: Optional[int] = Query(None, description="Только эта зона"),
+    tz: str = Query(analytics.DEFAULT_TIMEZONE, description="Часовой пояс дат и часов"),
+    session: AsyncSession = Depends(get_read_session),
+    _: None = Depends(require_admin),
+):
+    try:
+        utilization = await analytics.get_utilization(
+            session=session,
+            date_from=date_from,
+            date_to=date_to,
+            zone_id=zone_id,
+            tz_name=tz,
+        )
+    except analytics.AnalyticsError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e),
+        )
+    if utilization is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Зона не найдена",
+        )
+    return utilization
+
+
+def _csv_value(value):
+    # Время — как в JSON-ответах: UTC со смещением
+    return utc_iso(value) if isinstance(value, datetime) else value
+
+
+@router.get(
+    "/bookings/export",
+    summary="Выгрузка броней всех пользователей в CSV потоком (admin)",
+    response_class=StreamingResponse,
+)
+async def export_bookings_endpoint(
+    date_from: Optional[date] = Query(None, alias="from"),
+    date_to: Optional[date] = Query(None, alias="to"),
+    zone_id: Optional[int] = Query(None),
+    status_: Optional[str] = Query(None, alias="status"),
+    include_archived: bool = Query(False, description="Вместе с архивом"),
+    session: AsyncSession = Depends(get_read_session),
+    _: None = Depends(require_admin),
+):
+    filters = schemas.BookingHistoryFilters(
+        status=status_,
+        zone_id=zone_id,
+        date_from=None if date_from is None else datetime.combine(date_from, datetime.min.time()),
+        date_to=None if date_to is None else datetime.combine(date_to, datetime.max.time()),
+    )
+
+    async def rows():
+        # Один буфер на всю выгрузку: в памяти — только текущая пачка
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(crud.EXPORT_COLUMNS)
+        yield buffer.getvalue()
+        async for batch in crud.stream_bookings_export(session, filters, include_archived):
+            buffer.seek(0)
+            buffer.truncate()
+            writer.writerows([_csv_value(value) for value in row] for row in batch)
+            yield buffer.getvalue()
+
+    return StreamingResponse(
+        rows(),
+        media_type="text/csv; charset=utf-8",
+        headers={"Content-Disposition": 'attachment; filename="bookings.csv"'},
+    )
+
+
+@router.get(
+    "/service-clients/stats",
+    summary="Счётчики запросов, ошибок и задержек клиентов соседних сервисов (admin)",
+)
+async def service_clients_stats_endpoint(
+    _: None = Depends(require_admin),
+):
+    stats = clients.registry.stats()
+    stats["user_email_cache"] = notifications.user_email_cache.stats()
+    return stats
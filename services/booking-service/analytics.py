@@ -0,0 +1,366 @@
+# services/booking-service/app/analytics.py
+"""
+Аналитика загрузки зон: почасовая свёртка и тепловые карты.
+
+Загрузка по дням недели и часам за произвольный интервал, посчитанная
+по bookings, — это чтение всех броней интервала на каждый запрос. Вместо
+этого фоновая задача ведёт свёртку zone_hourly_usage (зона, час): минуты
+неотменённых броней в часе, число начавшихся в нём броней и отмен.
+
+Свёртка инкрементальная. Водяной знак (rollup_watermarks) — ключ
+(updated_at, id) последней обработанной брони; проход берёт брони,
+изменённые после него, пачками по ROLLUP_BATCH_SIZE (ix_booking_updated).
+Часы, которые задевают брони пачки, пересчитываются целиком по броням и
+архиву, пересекающим эти часы. Пересчёт идемпотентен: отмена уже учтённой
+брони просто даёт новые значения тех же часов, а повторная обработка
+безопасна. Брони, изменённые за последние ROLLUP_LAG_SECONDS, ждут
+следующего прохода — updated_at ставится в начале транзакции, и
+незакоммиченная бронь иначе могла бы оказаться позади знака. Строка знака
+берётся FOR UPDATE, поэтому проходы разных экземпляров сервиса не
+пересекаются.
+
+GET /admin/analytics/utilization читает только свёртку.
+
+Запуск вручную:
+    python analytics.py
+"""
+from __future__ import annotations
+
+import asyncio
+from collections import defaultdict
+from datetime import date, datetime, time, timedelta, timezone
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+from sqlalchemy import and_, delete, or_, select, union_all, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+
+import models
+import schemas
+from catalogue import get_snapshot
+from config import settings
+from db import SessionLocal
+from timezone_utils import now_utc
+
+ROLLUP_NAME = "zone_hourly_usage"
+HOUR = timedelta(hours=1)
+EPOCH = datetime(1970, 1, 1)
+DEFAULT_TIMEZONE = "Europe/Moscow"
+
+Bucket = Tuple[int, datetime]
+
+
+class AnalyticsError(Exception):
+    pass
+
+
+def hours_between(start: datetime, end: datetime) -> Iterator[datetime]:
+    """Начала часов, пересекающих [start, end)."""
+    hour = start.replace(minute=0, second=0, microsecond=0)
+    while hour < end:
+        yield hour
+        hour += HOUR
+
+
+def _insert(session: AsyncSession, model):
+    dialect = session.bind.dialect.name
+    if dialect == "postgresql":
+        return postgresql.insert(model)
+    if dialect == "sqlite":
+        return sqlite.insert(model)
+    raise AnalyticsError(f"ON CONFLICT не поддерживается для {dialect}")
+
+
+async def _lock_watermark(session: AsyncSession) -> Tuple[datetime, int]:
+    await session.execute(
+        _insert(session, models.RollupWatermark)
+        .values(name=ROLLUP_NAME, updated_at=EPOCH, booking_id=0)
+        .on_conflict_do_nothing(index_elements=["name"])
+    )
+    row = (await session.execute(
+        select(models.RollupWatermark.updated_at, models.RollupWatermark.booking_id)
+        .where(models.RollupWatermark.name == ROLLUP_NAME)
+        .with_for_update()
+    )).one()
+    return row.updated_at, row.booking_id
+
+
+async def _changed_bookings(
+    session: AsyncSession,
+    after: Tuple[datetime, int],
+    until: datetime,
+    limit: int,
+) -> list:
+    updated_at, booking_id = after
+    result = await session.execute(
+        select(
+            models.Booking.id,
+            models.Booking.updated_at,
+            models.Booking.zone_id,
+            models.Booking.start_time,
+            models.Booking.end_time,
+        )
+        .where(
+            or_(
+                models.Booking.updated_at > updated_at,
+                and_(
+                    models.Booking.updated_at == updated_at,
+                    models.Booking.id > booking_id,
+                ),
+            ),
+            models.Booking.updated_at <= until,
+        )
+        .order_by(models.Booking.updated_at, models.Booking.id)
+        .limit(limit)
+    )
+    return result.all()
+
+
+def _overlapping(model, windows: Dict[int, Tuple[datetime, datetime]]):
+    return select(model.zone_id, model.start_time, model.end_time, model.status).where(
+        or_(*[
+            and_(model.zone_id == zone_id, model.start_time < hi, model.end_time > lo)
+            for zone_id, (lo, hi) in windows.items()
+        ])
+    )
+
+
+async def _recompute(session: AsyncSession, buckets: Set[Bucket]) -> None:
+    """Пересчитывает часы buckets по броням и архиву, пересекающим их."""
+    windows: Dict[int, Tuple[datetime, datetime]] = {}
+    for zone_id, hour in buckets:
+        lo, hi = windows.get(zone_id, (hour, hour + HOUR))
+        windows[zone_id] = (min(lo, hour), max(hi, hour + HOUR))
+
+    seconds: Dict[Bucket, float] = defaultdict(float)
+    started: Dict[Bucket, int] = defaultdict(int)
+    cancelled: Dict[Bucket, int] = defaultdict(int)
+    result = await session.execute(union_all(
+        _overlapping(models.Booking, windows),
+        _overlapping(models.BookingArchive, windows),
+    ))
+    for zone_id, start, end, status in result.all():
+        for hour in hours_between(start, end):
+            bucket = (zone_id, hour)
+            if bucket not in buckets:
+                continue
+            first = hour <= start
+            if status == "cancelled":
+                cancelled[bucket] += first
+                continue
+            started[bucket] += first
+            seconds[bucket] += (min(end, hour + HOUR) - max(start, hour)).total_seconds()
+
+    rows = [
+        {
+            "zone_id": zone_id,
+            "hour": hour,
+            "booked_minutes": round(seconds[(zone_id, hour)] / 60),
+            "bookings": started[(zone_id, hour)],
+            "cancellations": cancelled[(zone_id, hour)],
+        }
+        for zone_id, hour in buckets
+    ]
+    filled = [row for row in rows if row["booked_minutes"] or row["bookings"] or row["cancellations"]]
+    if filled:
+        stmt = _insert(session, models.ZoneHourlyUsage)
+        await session.execute(
+            stmt.on_conflict_do_update(
+                index_elements=["zone_id", "hour"],
+                set_={
+                    "booked_minutes": stmt.excluded.booked_minutes,
+                    "bookings": stmt.excluded.bookings,
+                    "cancellations": stmt.excluded.cancellations,
+                },
+            ),
+            filled,
+        )
+    # Часы, в которых ничего не осталось, не хранятся
+    empty: Dict[int, List[datetime]] = defaultdict(list)
+    for row in rows:
+        if not (row["booked_minutes"] or row["bookings"] or row["cancellations"]):
+            empty[row["zone_id"]].append(row["hour"])
+    if empty:
+        await session.execute(
+            delete(models.ZoneHourlyUsage).where(or_(*[
+                and_(
+                    models.ZoneHourlyUsage.zone_id == zone_id,
+                    models.ZoneHourlyUsage.hour.in_(hours),
+                )
+                for zone_id, hours in empty.items()
+            ]))
+        )
+
+
+async def refresh_rollups(
+    session: AsyncSession,
+    batch_size: Optional[int] = None,
+    lag_seconds: Optional[float] = None,
+) -> int:
+    """
+    Учитывает в свёртке брони, изменённые после водяного знака.
+    Каждая пачка — отдельная транзакция. Возвращает число обработанных броней.
+    """
+    batch_size = batch_size or settings.ROLLUP_BATCH_SIZE
+    lag = settings.ROLLUP_LAG_SECONDS if lag_seconds is None else lag_seconds
+    until = now_utc() - timedelta(seconds=lag)
+    processed = 0
+    while True:
+        watermark = await _lock_watermark(session)
+        changed = await _changed_bookings(session, watermark, until, batch_size)
+        if not changed:
+            await session.commit()
+            return processed
+        buckets = {
+            (row.zone_id, hour)
+            for row in changed
+            if row.zone_id is not None and row.start_time is not None and row.end_time is not None
+            for hour in hours_between(row.start_time, row.end_time)
+        }
+        if buckets:
+            await _recompute(session, buckets)
+        last = changed[-1]
+        await session.execute(
+            update(models.RollupWatermark)
+            .where(models.RollupWatermark.name == ROLLUP_NAME)
+            .values(updated_at=last.updated_at, booking_id=last.id)
+        )
+        await session.commit()
+        processed += len(changed)
+        if len(changed) < batch_size:
+            return processed
+
+
+def _timezone(name: str) -> ZoneInfo:
+    try:
+        return ZoneInfo(name)
+    except (ZoneInfoNotFoundError, ValueError):
+        raise AnalyticsError(f"Неизвестный часовой пояс: {name}")
+
+
+def _utc_midnight(day: date, tz: ZoneInfo) -> datetime:
+    return datetime.combine(day, time(0), tzinfo=tz).astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def _matrix(value=0) -> list:
+    return [[value] * 24 for _ in range(7)]
+
+
+async def get_utilization(
+    session: AsyncSession,
+    date_from: date,
+    date_to: date,
+    zone_id: Optional[int] = None,
+    tz_name: str = DEFAULT_TIMEZONE,
+) -> Optional[schemas.UtilizationOut]:
+    """
+    Тепловые карты загрузки за [date_from, date_to] (даты и часы — в tz_name)
+    по свёртке. None — зоны zone_id нет.
+    """
+    if date_to < date_from:
+        raise AnalyticsError("Дата окончания раньше даты начала")
+    if (date_to - date_from).days + 1 > settings.ANALYTICS_MAX_DAYS:
+        raise AnalyticsError(
+            f"Интервал не может быть больше {settings.ANALYTICS_MAX_DAYS} дней"
+        )
+    tz = _timezone(tz_name)
+    start = _utc_midnight(date_from, tz)
+    end = _utc_midnight(date_to + timedelta(days=1), tz)
+
+    snapshot = await get_snapshot(session)
+    if zone_id is not None:
+        zone = snapshot.zone(zone_id)
+        if zone is None:
+            return None
+        zones = [zone]
+    else:
+        zones = sorted(snapshot.zones.values(), key=lambda zone: zone.name)
+
+    def local(hour: datetime) -> Tuple[int, int]:
+        moment = hour.replace(tzinfo=timezone.utc).astimezone(tz)
+        return moment.weekday(), moment.hour
+
+    # Сколько раз каждый (день недели, час) встречается в интервале
+    occurrences = _matrix()
+    for hour in hours_between(start, end):
+        weekday, hour_of_day = local(hour)
+        occurrences[weekday][hour_of_day] += 1
+
+    stmt = select(
+        models.ZoneHourlyUsage.zone_id,
+        models.ZoneHourlyUsage.hour,
+        models.ZoneHourlyUsage.booked_minutes,
+        models.ZoneHourlyUsage.bookings,
+        models.ZoneHourlyUsage.cancellations,
+    ).where(
+        models.ZoneHourlyUsage.hour >= start,
+        models.ZoneHourlyUsage.hour < end,
+    )
+    if zone_id is not None:
+        stmt = stmt.where(models.ZoneHourlyUsage.zone_id == zone_id)
+    matrices = {zone.id: (_matrix(), _matrix(), _matrix()) for zone in zones}
+    for row in (await session.execute(stmt)).all():
+        zone_matrices = matrices.get(row.zone_id)
+        if zone_matrices is None:
+            continue
+        weekday, hour_of_day = local(row.hour)
+        minutes, bookings, cancellations = zone_matrices
+        minutes[weekday][hour_of_day] += row.booked_minutes
+        bookings[weekday][hour_of_day] += row.bookings
+        cancellations[weekday][hour_of_day] += row.cancellations
+
+    rolled_up_to = (await session.execute(
+        select(models.RollupWatermark.updated_at)
+        .where(models.RollupWatermark.name == ROLLUP_NAME)
+    )).scalar()
+
+    result = []
+    for zone in zones:
+        minutes, bookings, cancellations = matrices[zone.id]
+        places = snapshot.active_place_count(zone.id)
+        utilization = _matrix(0.0)
+        for weekday in range(7):
+            for hour_of_day in range(24):
+                capacity = places * 60 * occurrences[weekday][hour_of_day]
+                if capacity:
+                    utilization[weekday][hour_of_day] = round(
+                        minutes[weekday][hour_of_day] / capacity, 4
+                    )
+        result.append(schemas.ZoneUtilization(
+            zone_id=zone.id,
+            zone_name=zone.name,
+            places=places,
+            booked_minutes=minutes,
+            bookings=bookings,
+            cancellations=cancellations,
+            utilization=utilization,
+        ))
+    return schemas.UtilizationOut(
+        date_from=date_from,
+        date_to=date_to,
+        timezone=tz_name,
+        rolled_up_to=rolled_up_to if rolled_up_to and rolled_up_to > EPOCH else None,
+        zones=result,
+    )
+
+
+async def run_rollups() -> None:
+    """Фоновая задача: обновление свёртки раз в ROLLUP_INTERVAL_SECONDS."""
+    while True:
+        try:
+            async with SessionLocal() as session:
+                await refresh_rollups(session)
+        except Exception as e:
+            print(f"Zone usage rollup failed: {e}")
+        await asyncio.sleep(settings.ROLLUP_INTERVAL_SECONDS)
+
+
+async def _main() -> None:
+    async with SessionLocal() as session:
+        processed = await refresh_rollups(session)
+    print(f"Учтено изменённых броней: {processed}")
+
+
+if __name__ == "__main__":
+    asyncio.run(_main())
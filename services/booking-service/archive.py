@@ -0,0 +1,178 @@
+# services/booking-service/app/archive.py
+"""
+Архивация старых броней.
+
+bookings и slots растут бесконечно: каждая бронь по времени и каждое
+продление добавляют строки. Задача переносит брони, закончившиеся раньше
+начала месяца (сейчас - ARCHIVE_AFTER_MONTHS), в bookings_archive пачками
+по ARCHIVE_BATCH_SIZE и удаляет освободившиеся прошлые слоты тем же
+сборщиком, что и POST /admin/slots/gc (slot_grid.collect_unused_slots). Горячие
+таблицы остаются ограниченными по размеру, история читает архив по запросу
+(GET /bookings/history?include_archived=true).
+
+На Postgres bookings_archive партиционирована по месяцам start_time:
+перед переносом пачки создаются недостающие месячные партиции.
+
+Запуск вручную:
+    python archive.py --months 6
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Iterable, Optional
+
+from sqlalchemy import and_, delete, func, insert, or_, select, text
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+import models
+import slot_grid
+from config import settings
+from db import SessionLocal
+
+ARCHIVED_COLUMNS = [
+    "id",
+    "start_time",
+    "end_time",
+    "user_id",
+    "slot_id",
+    "zone_id",
+    "zone_name",
+    "zone_address",
+    "status",
+    "cancellation_reason",
+    "created_at",
+    "updated_at",
+]
+
+
+@dataclass
+class ArchiveResult:
+    moved_bookings: int = 0
+    deleted_slots: int = 0
+
+
+def month_start(dt: datetime, shift: int = 0) -> datetime:
+    """Начало месяца dt, сдвинутого на shift месяцев (UTC)."""
+    index = dt.year * 12 + (dt.month - 1) + shift
+    return datetime(index // 12, index % 12 + 1, 1, tzinfo=timezone.utc)
+
+
+def archive_cutoff(now: datetime, months: int) -> datetime:
+    """Архивируются брони, закончившиеся раньше начала месяца now - months."""
+    return month_start(now, -months)
+
+
+def _finished_before(cutoff: datetime):
+    return or_(
+        models.Booking.end_time < cutoff,
+        and_(models.Booking.end_time.is_(None), models.Booking.created_at < cutoff),
+    )
+
+
+async def ensure_archive_partitions(session: AsyncSession, months: Iterable[datetime]) -> None:
+    """Создаёт месячные партиции bookings_archive (только Postgres)."""
+    if session.bind.dialect.name != "postgresql":
+        return
+    for start in sorted(set(months)):
+        end = month_start(start, 1)
+        name = f"bookings_archive_y{start.year:04d}m{start.month:02d}"
+        try:
+            # SAVEPOINT: если в default-партиции уже есть строки за этот месяц,
+            # создать партицию нельзя — строки просто останутся в default
+            async with session.begin_nested():
+                await session.execute(text(
+                    f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF bookings_archive "
+                    f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+                ))
+        except DBAPIError as e:
+            print(f"Failed to create archive partition {name}: {e}")
+
+
+async def archive_batch(session: AsyncSession, cutoff: datetime, batch_size: int) -> int:
+    """Переносит одну пачку броней в архив. Возвращает число перенесённых."""
+    result = await session.execute(
+        select(
+            models.Booking.id,
+            models.Booking.start_time,
+            models.Booking.created_at,
+        )
+        .where(_finished_before(cutoff))
+        .order_by(models.Booking.id)
+        .limit(batch_size)
+    )
+    rows = result.all()
+    if not rows:
+        return 0
+    ids = [row.id for row in rows]
+    await ensure_archive_partitions(
+        session, (month_start(row.start_time or row.created_at) for row in rows)
+    )
+    source = select(
+        models.Booking.id,
+        # Ключ партиционирования не может быть NULL: старым броням без времени
+        # подставляем created_at
+        func.coalesce(models.Booking.start_time, models.Booking.created_at),
+        *[getattr(models.Booking, name) for name in ARCHIVED_COLUMNS[2:]],
+    ).where(models.Booking.id.in_(ids))
+    await session.execute(
+        insert(models.BookingArchive).from_select(ARCHIVED_COLUMNS, source)
+    )
+    await session.execute(delete(models.Booking).where(models.Booking.id.in_(ids)))
+    await session.commit()
+    return len(ids)
+
+
+async def archive_old_bookings(
+    session: AsyncSession,
+    months: Optional[int] = None,
+    batch_size: Optional[int] = None,
+    now: Optional[datetime] = None,
+) -> ArchiveResult:
+    months = settings.ARCHIVE_AFTER_MONTHS if months is None else months
+    batch_size = batch_size or settings.ARCHIVE_BATCH_SIZE
+    cutoff = archive_cutoff(now or datetime.now(timezone.utc), months)
+    outcome = ArchiveResult()
+    while True:
+        moved = await archive_batch(session, cutoff, batch_size)
+        outcome.moved_bookings += moved
+        if moved < batch_size:
+            break
+    outcome.deleted_slots = await slot_grid.collect_unused_slots(session, before=cutoff)
+    return outcome
+
+
+async def run_archiver() -> None:
+    """Фоновая задача: архивация раз в ARCHIVE_INTERVAL_SECONDS."""
+    while True:
+        try:
+            async with SessionLocal() as session:
+                outcome = await archive_old_bookings(session)
+            if outcome.moved_bookings or outcome.deleted_slots:
+                print(
+                    f"Archived {outcome.moved_bookings} bookings, "
+                    f"deleted {outcome.deleted_slots} slots"
+                )
+        except Exception as e:
+            print(f"Booking archiver failed: {e}")
+        await asyncio.sleep(settings.ARCHIVE_INTERVAL_SECONDS)
+
+
+async def _main(months: int, batch_size: int) -> None:
+    async with SessionLocal() as session:
+        outcome = await archive_old_bookings(session, months=months, batch_size=batch_size)
+    print(
+        f"Перенесено броней в архив: {outcome.moved_bookings}, "
+        f"удалено слотов: {outcome.deleted_slots}"
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Архивация старых броней")
+    parser.add_argument("--months", type=int, default=settings.ARCHIVE_AFTER_MONTHS)
+    parser.add_argument("--batch-size", type=int, default=settings.ARCHIVE_BATCH_SIZE)
+    args = parser.parse_args()
+    asyncio.run(_main(args.months, args.batch_size))
@@ -0,0 +1,193 @@
+# services/booking-service/app/catalogue.py
+"""
+Каталог зон и мест в памяти процесса.
+
+Зоны и места меняет только админ, а читаются они почти в каждом запросе:
+список зон и мест, проверка зоны и вместимости при бронировании и продлении.
+Каталог держит снимок (зона, место -> зона, активные места зоны, их число)
+и отдаёт его без запросов к БД.
+
+Снимок загружается при старте (main.py) или при первом обращении двумя
+запросами и сбрасывается:
+  - явно админскими функциями crud (create/update/delete/close zone);
+  - автоматически при flush/commit любой ORM-сессии, в которой менялись
+    Zone или Place (реактивация закрытых зон, скрипты, тесты);
+  - по CATALOGUE_TTL_SECONDS — изменения, сделанные другими экземплярами
+    сервиса, видны не позже чем через TTL.
+CATALOGUE_TTL_SECONDS = 0 отключает кэш: снимок строится на каждый вызов.
+Запоминаемый снимок читается только с основной базы: если каталог запросили
+через сессию реплики, загрузка идёт через SessionLocal.
+
+Элементы снимка — неизменяемые dataclass, а не ORM-объекты: они не привязаны
+к сессии и безопасно разделяются между запросами.
+"""
+from __future__ import annotations
+
+import asyncio
+import time
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, time as dtime
+from typing import Dict, List, Optional
+
+from sqlalchemy import event, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+import models
+from config import settings
+from db import SessionLocal
+
+
+@dataclass(frozen=True)
+class ZoneInfo:
+    id: int
+    name: str
+    address: Optional[str]
+    is_active: bool
+    closure_reason: Optional[str]
+    closed_until: Optional[datetime]
+    opens_at: dtime
+    closes_at: dtime
+    slot_minutes: int
+    created_at: datetime
+    updated_at: datetime
+
+
+@dataclass(frozen=True)
+class PlaceInfo:
+    id: int
+    zone_id: int
+    name: str
+    is_active: bool
+    created_at: datetime
+    updated_at: datetime
+
+    def as_dict(self) -> dict:
+        return asdict(self)
+
+
+@dataclass
+class Snapshot:
+    zones: Dict[int, ZoneInfo] = field(default_factory=dict)
+    places: Dict[int, PlaceInfo] = field(default_factory=dict)
+    # Активные места зоны по возрастанию id — порядок подбора места при брони
+    active_places: Dict[int, List[PlaceInfo]] = field(default_factory=dict)
+
+    def zone(self, zone_id: int) -> Optional[ZoneInfo]:
+        return self.zones.get(zone_id)
+
+    def place(self, place_id: int) -> Optional[PlaceInfo]:
+        return self.places.get(place_id)
+
+    def zone_of_place(self, place_id: int) -> Optional[ZoneInfo]:
+        place = self.places.get(place_id)
+        return self.zones.get(place.zone_id) if place else None
+
+    def places_in_zone(self, zone_id: int) -> List[PlaceInfo]:
+        return self.active_places.get(zone_id, [])
+
+    def active_place_count(self, zone_id: int) -> int:
+        return len(self.active_places.get(zone_id, ()))
+
+
+async def load_snapshot(session: AsyncSession) -> Snapshot:
+    snapshot = Snapshot()
+    zone_fields = list(ZoneInfo.__dataclass_fields__)
+    result = await session.execute(
+        select(*[getattr(models.Zone, name) for name in zone_fields])
+    )
+    for row in result.all():
+        zone = ZoneInfo(*row)
+        snapshot.zones[zone.id] = zone
+        snapshot.active_places[zone.id] = []
+    place_fields = list(PlaceInfo.__dataclass_fields__)
+    result = await session.execute(
+        select(*[getattr(models.Place, name) for name in place_fields])
+        .order_by(models.Place.id)
+    )
+    for row in result.all():
+        place = PlaceInfo(*row)
+        snapshot.places[place.id] = place
+        if place.is_active and place.zone_id in snapshot.active_places:
+            snapshot.active_places[place.zone_id].append(place)
+    return snapshot
+
+
+class Catalogue:
+    def __init__(self):
+        self._snapshot: Optional[Snapshot] = None
+        self._loaded_at = 0.0
+        # Растёт при каждом сбросе: загрузка, начатая до сброса, не сохраняется
+        self._generation = 0
+        self._lock = asyncio.Lock()
+        self.loads = 0
+
+    def invalidate(self) -> None:
+        self._generation += 1
+        self._snapshot = None
+
+    def _fresh(self) -> bool:
+        return (
+            self._snapshot is not None
+            and time.monotonic() - self._loaded_at < settings.CATALOGUE_TTL_SECONDS
+        )
+
+    async def get(self, session: AsyncSession) -> Snapshot:
+        if settings.CATALOGUE_TTL_SECONDS <= 0:
+            return await load_snapshot(session)
+        if self._fresh():
+            return self._snapshot
+        async with self._lock:
+            if self._fresh():
+                return self._snapshot
+            generation = self._generation
+            if session.info.get("read_only"):
+                # Снимок общий для всех запросов, в том числе проверок брони
+                # на основной: строим его только с основной, не с отстающей реплики
+                async with SessionLocal() as primary:
+                    snapshot = await load_snapshot(primary)
+            else:
+                snapshot = await load_snapshot(session)
+            self.loads += 1
+            if generation == self._generation:
+                self._snapshot = snapshot
+                self._loaded_at = time.monotonic()
+            return snapshot
+
+    def stats(self) -> dict:
+        snapshot = self._snapshot
+        return {
+            "loaded": snapshot is not None,
+            "zones": len(snapshot.zones) if snapshot else 0,
+            "places": len(snapshot.places) if snapshot else 0,
+            "loads": self.loads,
+        }
+
+
+catalogue = Catalogue()
+
+
+async def get_snapshot(session: AsyncSession) -> Snapshot:
+    return await catalogue.get(session)
+
+
+@event.listens_for(Session, "after_flush")
+def _track_catalogue_changes(session, flush_context):
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        if isinstance(obj, (models.Zone, models.Place)):
+            session.info["catalogue_changed"] = True
+            catalogue.invalidate()
+            return
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_after_commit(session):
+    # Снимок мог быть перечитан между flush и commit без этих изменений
+    if session.info.pop("catalogue_changed", False):
+        catalogue.invalidate()
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_rolled_back_changes(session):
+    if session.info.pop("catalogue_changed", False):
+        catalogue.invalidate()
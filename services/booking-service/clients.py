@@ -0,0 +1,183 @@
+# services/booking-service/app/clients.py
+"""
+Пул HTTP-клиентов к соседним сервисам.
+
+Раньше notifications.py создавал новый httpx.AsyncClient на каждый вызов:
+новое TCP-соединение и DNS-запрос трижды на каждое событие брони. Теперь на
+каждый сервис один долгоживущий клиент с keep-alive пулом соединений;
+клиенты создаются при старте приложения (configure) и закрываются при
+остановке (registry.aclose) — см. lifespan в main.py.
+
+ServiceClient.request:
+  - timeout — бюджет на весь вызов, включая повторы;
+  - идемпотентные методы (GET, HEAD, ...) повторяются до retries раз при
+    сетевой ошибке или 502/503/504, с экспоненциальной задержкой;
+  - POST не повторяется: повтор доставки уведомлений делает outbox;
+  - счётчики запросов, ошибок, повторов и задержек — registry.stats().
+"""
+from __future__ import annotations
+
+import asyncio
+import time
+from dataclasses import dataclass
+from typing import Dict, Optional
+
+import httpx
+
+from config import settings
+
+IDEMPOTENT_METHODS = {"GET", "HEAD", "OPTIONS", "PUT", "DELETE"}
+RETRY_STATUSES = {502, 503, 504}
+
+USER_SERVICE = "user-service"
+NOTIFICATION_SERVICE = "notification-service"
+
+
+@dataclass
+class ClientStats:
+    requests: int = 0
+    errors: int = 0
+    retries: int = 0
+    total_latency: float = 0.0
+    max_latency: float = 0.0
+
+    def observe(self, latency: float, error: bool) -> None:
+        self.requests += 1
+        self.total_latency += latency
+        self.max_latency = max(self.max_latency, latency)
+        if error:
+            self.errors += 1
+
+    def as_dict(self) -> dict:
+        return {
+            "requests": self.requests,
+            "errors": self.errors,
+            "retries": self.retries,
+            "avg_latency_ms": round(self.total_latency / self.requests * 1000, 2) if self.requests else 0.0,
+            "max_latency_ms": round(self.max_latency * 1000, 2),
+        }
+
+
+class ServiceClient:
+    def __init__(
+        self,
+        name: str,
+        base_url: str,
+        timeout: float,
+        retries: int = 0,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+    ):
+        self.name = name
+        self.timeout = timeout
+        self.retries = retries
+        self.stats = ClientStats()
+        self._client = httpx.AsyncClient(
+            base_url=base_url,
+            timeout=timeout,
+            transport=transport,
+            limits=httpx.Limits(
+                max_connections=settings.HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.HTTP_MAX_KEEPALIVE_CONNECTIONS,
+                keepalive_expiry=settings.HTTP_KEEPALIVE_EXPIRY_SECONDS,
+            ),
+        )
+
+    async def request(
+        self,
+        method: str,
+        path: str,
+        *,
+        timeout: Optional[float] = None,
+        retries: Optional[int] = None,
+        **kwargs,
+    ) -> httpx.Response:
+        method = method.upper()
+        budget = self.timeout if timeout is None else timeout
+        deadline = time.monotonic() + budget
+        attempts = 1
+        if method in IDEMPOTENT_METHODS:
+            attempts += self.retries if retries is None else retries
+        for attempt in range(attempts):
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise httpx.TimeoutException(f"{self.name}: бюджет {budget} с исчерпан")
+            started = time.monotonic()
+            try:
+                response = await asyncio.wait_for(
+                    self._client.request(method, path, timeout=remaining, **kwargs),
+                    timeout=remaining,
+                )
+            except (httpx.TransportError, asyncio.TimeoutError) as e:
+                self.stats.observe(time.monotonic() - started, error=True)
+                if attempt + 1 == attempts:
+                    if isinstance(e, asyncio.TimeoutError):
+                        raise httpx.TimeoutException(f"{self.name}: бюджет {budget} с исчерпан") from e
+                    raise
+            else:
+                retryable = response.status_code in RETRY_STATUSES
+                self.stats.observe(time.monotonic() - started, error=response.status_code >= 500)
+                if not retryable or attempt + 1 == attempts:
+                    return response
+            self.stats.retries += 1
+            delay = settings.HTTP_RETRY_BACKOFF_SECONDS * 2 ** attempt
+            await asyncio.sleep(min(delay, max(deadline - time.monotonic(), 0)))
+
+    async def get(self, path: str, **kwargs) -> httpx.Response:
+        return await self.request("GET", path, **kwargs)
+
+    async def post(self, path: str, **kwargs) -> httpx.Response:
+        return await self.request("POST", path, **kwargs)
+
+    async def aclose(self) -> None:
+        await self._client.aclose()
+
+
+class ClientRegistry:
+    """Один ServiceClient на сервис."""
+
+    def __init__(self):
+        self._clients: Dict[str, ServiceClient] = {}
+
+    def register(self, name: str, base_url: str, **kwargs) -> ServiceClient:
+        client = ServiceClient(name, base_url, **kwargs)
+        self._clients[name] = client
+        return client
+
+    def get(self, name: str) -> ServiceClient:
+        if not self._clients:
+            # Вне приложения (CLI, тесты crud) клиенты создаются при первом обращении
+            configure(self)
+        return self._clients[name]
+
+    def stats(self) -> dict:
+        return {name: client.stats.as_dict() for name, client in self._clients.items()}
+
+    async def aclose(self) -> None:
+        clients, self._clients = self._clients, {}
+        for client in clients.values():
+            await client.aclose()
+
+
+registry = ClientRegistry()
+
+
+def configure(target: Optional[ClientRegistry] = None) -> ClientRegistry:
+    """Регистрирует клиенты соседних сервисов из настроек."""
+    target = target or registry
+    target.register(
+        USER_SERVICE,
+        settings.USER_SERVICE_URL,
+        timeout=settings.USER_SERVICE_TIMEOUT_SECONDS,
+        retries=settings.HTTP_RETRIES,
+    )
+    target.register(
+        NOTIFICATION_SERVICE,
+        settings.NOTIFICATION_SERVICE_URL,
+        timeout=settings.NOTIFICATION_SERVICE_TIMEOUT_SECONDS,
+        retries=settings.HTTP_RETRIES,
+    )
+    return target
+
+
+def get_client(name: str) -> ServiceClient:
+    return registry.get(name)
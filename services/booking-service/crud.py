@@ -1,88 +1,120 @@
 from __future__ import annotations
 
+import base64
+import binascii
 from datetime import datetime, date, timedelta, timezone
-from typing import List, Optional
+from typing import AsyncIterator, List, Optional, Tuple
 
-from sqlalchemy import select, and_, func, case
+from sqlalchemy import (
+    Integer,
+    and_,
+    any_,
+    bindparam,
+    case,
+    cast,
+    exists,
+    func,
+    literal,
+    null,
+    or_,
+    select,
+    union_all,
+    update,
+)
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.dialects.postgresql import ARRAY
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.orm import joinedload
+from sqlalchemy.orm import aliased, joinedload
+from sqlalchemy.orm.attributes import set_committed_value
 
 import models
 import schemas
 from config import settings
-from timezone_utils import now_msk, msk_to_utc
-from notifications import (
-    get_user_email, 
-    send_email_notification, 
-    send_push_notification,
-    notify_booking_created,
-    notify_booking_cancelled,
-    notify_booking_extended,
-    notify_zone_closed
-)
+from timezone_utils import naive_utc, now_utc
+import idempotency
+import live
+import outbox
+from catalogue import PlaceInfo, catalogue, get_snapshot
 
 # ============================================================
 #                       READ-ONLY ЧАСТЬ
 # ============================================================
 
-async def get_zones(session: AsyncSession, include_inactive: bool = False) -> List[schemas.ZoneOut]:
-    now = msk_to_utc(now_msk())
-    stmt_reactivate = (
-        select(models.Zone)
-        .where(
-            and_(
-                models.Zone.is_active.is_(False),
-                models.Zone.closed_until.isnot(None),
-                models.Zone.closed_until <= now,
-            )
-        )
+def in_progress(now: datetime):
+    """
+    Условие «бронь идёт сейчас» — определение current_occupancy во всех
+    ответах: число активных броней, у которых now в [start_time, end_time),
+    то есть занятых прямо сейчас мест. Так же считает live (occupancy_changed).
+    """
+    return and_(
+        models.Booking.status == "active",
+        models.Booking.start_time <= now,
+        models.Booking.end_time > now,
     )
-    result = await session.execute(stmt_reactivate)
-    zones_to_reactivate = list(result.scalars().all())
-    
-    for zone in zones_to_reactivate:
-        zone.is_active = True
-        zone.closure_reason = None
-        zone.closed_until = None
-    
-    if zones_to_reactivate:
-        await session.commit()
-    
-    if include_inactive:
-        stmt = select(models.Zone).order_by(models.Zone.name)
-    else:
-        stmt = (
+
+async def get_zones(
+    session: AsyncSession,
+    include_inactive: bool = False,
+    as_rows: bool = False,
+) -> List[schemas.ZoneOut]:
+    """as_rows=True — словари с полями ZoneOut для быстрого пути (fastjson.py)."""
+    now = now_utc()
+    snapshot = await get_snapshot(session)
+
+    def expired(zone) -> bool:
+        return (
+            not zone.is_active
+            and zone.closed_until is not None
+            and zone.closed_until <= now
+        )
+
+    expired_ids = [zone.id for zone in snapshot.zones.values() if expired(zone)]
+    # На сессии реплики (db.get_read_session) писать нельзя: истёкшие закрытия
+    # учитываются только в ответе, в базе их снимет следующий запрос к основной
+    read_only = session.info.get("read_only", False)
+    if expired_ids and not read_only:
+        stmt_reactivate = (
             select(models.Zone)
-            .where(models.Zone.is_active.is_(True))
-            .order_by(models.Zone.name)
+            .where(
+                and_(
+                    models.Zone.id.in_(expired_ids),
+                    models.Zone.is_active.is_(False),
+                    models.Zone.closed_until.isnot(None),
+                    models.Zone.closed_until <= now,
+                )
+            )
         )
-    result = await session.execute(stmt)
-    zones: List[models.Zone] = list(result.scalars().all())
+        result = await session.execute(stmt_reactivate)
+        zones_to_reactivate = list(result.scalars().all())
+
+        for zone in zones_to_reactivate:
+            zone.is_active = True
+            zone.closure_reason = None
+            zone.closed_until = None
+            live.emit(session, live.ZONE_OPENED, {"zone_id": zone.id})
+
+        if zones_to_reactivate:
+            await session.commit()
+
+    zones = sorted(
+        (
+            zone for zone in snapshot.zones.values()
+            if include_inactive or zone.is_active or expired(zone)
+        ),
+        key=lambda zone: zone.name,
+    )
 
     all_zone_ids = [zone.id for zone in zones]
 
     stmt_stats = (
         select(
-            models.Zone.id.label('zone_id'),
+            models.Booking.zone_id,
             func.count(case((models.Booking.status == "active", 1))).label("active_bookings"),
             func.count(case((models.Booking.status == "cancelled", 1))).label("cancelled_bookings"),
-            func.count(case(
-                (
-                    and_(
-                        models.Booking.status == "active",
-                        models.Booking.start_time <= now,
-                        models.Booking.end_time > now,
-                        models.Place.zone_id == models.Zone.id,
-                    ),
-                    1
-                )
-            )).label("current_occupancy"),
+            func.count(case((in_progress(now), 1))).label("current_occupancy"),
         )
-        .outerjoin(models.Place, models.Place.zone_id == models.Zone.id)
-        .outerjoin(models.Slot, models.Slot.place_id == models.Place.id)
-        .outerjoin(models.Booking, models.Booking.slot_id == models.Slot.id)
-        .where(models.Zone.id.in_(all_zone_ids))
-        .group_by(models.Zone.id)
+        .where(models.Booking.zone_id.in_(all_zone_ids))
+        .group_by(models.Booking.zone_id)
     )
 
     result_stats = await session.execute(stmt_stats)
@@ -91,57 +123,154 @@ async def get_zones(session: AsyncSession, include_inactive: bool = False) -> Li
     result_list = []
     for zone in zones:
         stats_row = stats_map.get(zone.id)
-        result_list.append(schemas.ZoneOut(
+        reopened = expired(zone)
+        result_list.append(dict(
             id=zone.id,
             name=zone.name,
             address=zone.address,
-            is_active=zone.is_active,
-            closure_reason=zone.closure_reason,
-            closed_until=zone.closed_until,
+            is_active=zone.is_active or reopened,
+            closure_reason=None if reopened else zone.closure_reason,
+            closed_until=None if reopened else zone.closed_until,
+            opens_at=zone.opens_at,
+            closes_at=zone.closes_at,
+            slot_minutes=zone.slot_minutes,
             created_at=zone.created_at,
             updated_at=zone.updated_at,
             active_bookings=int(getattr(stats_row, "active_bookings", 0)),
             cancelled_bookings=int(getattr(stats_row, "cancelled_bookings", 0)),
             current_occupancy=int(getattr(stats_row, "current_occupancy", 0)),
         ))
-    return result_list
+    if as_rows:
+        return result_list
+    return [schemas.ZoneOut(**row) for row in result_list]
+
+def _schema_columns(model, schema) -> list:
+    """Колонки model под поля схемы ответа — для выборки строк без ORM-объектов."""
+    return [getattr(model, name) for name in schema.model_fields]
+
+async def _fetch_rows(session: AsyncSession, stmt) -> List[dict]:
+    result = await session.execute(stmt)
+    return [dict(row) for row in result.mappings()]
 
 async def get_places_by_zone(
     session: AsyncSession,
     zone_id: int,
-) -> List[models.Place]:
-    stmt = (
-        select(models.Place)
+) -> List[PlaceInfo]:
+    snapshot = await get_snapshot(session)
+    return sorted(snapshot.places_in_zone(zone_id), key=lambda place: place.name)
+
+async def get_place_rows_by_zone(session: AsyncSession, zone_id: int) -> List[dict]:
+    return [place.as_dict() for place in await get_places_by_zone(session, zone_id)]
+
+def _slots_by_place_and_date_stmt(place_id: int, target_date: date):
+    date_start = datetime.combine(target_date, datetime.min.time())
+    date_end = datetime.combine(target_date, datetime.max.time())
+    return (
+        select(models.Slot)
         .where(
             and_(
-                models.Place.zone_id == zone_id,
-                models.Place.is_active.is_(True),
+                models.Slot.place_id == place_id,
+                models.Slot.start_time >= date_start,
+                models.Slot.start_time <= date_end,
             )
         )
-        .order_by(models.Place.name)
+        .order_by(models.Slot.start_time)
     )
-    result = await session.execute(stmt)
-    return list(result.scalars().all())
+
+def _slot_available():
+    """
+    Свободен ли слот для показа: его флаг и ни одного занятого слота того же
+    места, который его пересекает. Ячейки сетки под бронью по произвольному
+    времени так видны занятыми и освобождаются вместе с ней (отмена, закрытие
+    зоны) — сами ячейки при брони не переключаются.
+    """
+    taken = aliased(models.Slot)
+    return and_(
+        models.Slot.is_available.is_(True),
+        ~exists().where(
+            taken.place_id == models.Slot.place_id,
+            taken.id != models.Slot.id,
+            taken.is_available.is_(False),
+            taken.start_time < models.Slot.end_time,
+            taken.end_time > models.Slot.start_time,
+        ),
+    ).label("is_available")
 
 async def get_slots_by_place_and_date(
     session: AsyncSession,
     place_id: int,
     target_date: date,
-) -> List[models.Slot]:
-    date_start = datetime.combine(target_date, datetime.min.time())
-    date_end = datetime.combine(target_date, datetime.max.time())
+) -> List[schemas.SlotOut]:
+    rows = await get_slot_rows_by_place_and_date(session, place_id, target_date)
+    return [schemas.SlotOut(**row) for row in rows]
+
+async def get_slot_rows_by_place_and_date(
+    session: AsyncSession,
+    place_id: int,
+    target_date: date,
+) -> List[dict]:
+    columns = [
+        _slot_available() if name == "is_available" else getattr(models.Slot, name)
+        for name in schemas.SlotOut.model_fields
+    ]
+    stmt = _slots_by_place_and_date_stmt(place_id, target_date).with_only_columns(*columns)
+    return await _fetch_rows(session, stmt)
+
+async def get_zone_slot_matrix(
+    session: AsyncSession,
+    zone_id: int,
+    date_from: date,
+    date_to: date,
+) -> Optional[schemas.SlotMatrix]:
+    """
+    Слоты всех активных мест зоны за [date_from, date_to] одним запросом,
+    доступность — по _slot_available. None — зоны нет; ValueError — интервал пустой или длиннее SLOT_MATRIX_MAX_DAYS.
+    """
+    if date_to < date_from:
+        raise ValueError("Дата окончания раньше даты начала")
+    if (date_to - date_from).days + 1 > settings.SLOT_MATRIX_MAX_DAYS:
+        raise ValueError(f"Интервал больше {settings.SLOT_MATRIX_MAX_DAYS} дней")
+    snapshot = await get_snapshot(session)
+    if snapshot.zone(zone_id) is None:
+        return None
+    range_start = datetime.combine(date_from, datetime.min.time())
+    range_end = datetime.combine(date_to + timedelta(days=1), datetime.min.time())
     result = await session.execute(
-        select(models.Slot)
+        select(
+            models.Slot.id,
+            models.Slot.place_id,
+            models.Slot.start_time,
+            models.Slot.end_time,
+            _slot_available(),
+        )
+        .join(models.Place, models.Place.id == models.Slot.place_id)
         .where(
             and_(
-                models.Slot.place_id == place_id,
-                models.Slot.start_time >= date_start,
-                models.Slot.start_time <= date_end,
+                models.Place.zone_id == zone_id,
+                models.Place.is_active.is_(True),
+                models.Slot.start_time >= range_start,
+                models.Slot.start_time < range_end,
             )
         )
-        .order_by(models.Slot.start_time)
+        .order_by(models.Slot.place_id, models.Slot.start_time)
     )
-    return list(result.scalars().all())
+    origin = range_start
+    matrix = schemas.SlotMatrix(
+        zone_id=zone_id,
+        origin=origin,
+        slot_ids=[],
+        place_ids=[],
+        start_offsets=[],
+        durations=[],
+        available=[],
+    )
+    for slot_id, place_id, start_time, end_time, is_available in result.all():
+        matrix.slot_ids.append(slot_id)
+        matrix.place_ids.append(place_id)
+        matrix.start_offsets.append(int((start_time - origin).total_seconds() // 60))
+        matrix.durations.append(int((end_time - start_time).total_seconds() // 60))
+        matrix.available.append(is_available)
+    return matrix
 
 # ============================================================
 #                      BOOKING ОПЕРАЦИИ
@@ -154,7 +283,8 @@ async def check_user_booking_conflicts(
     end_time: datetime,
     exclude_booking_id: Optional[int] = None,
 ) -> bool:
-    stmt = select(models.Booking).where(
+    # Нужен только факт пересечения: id + LIMIT 1 обслуживается ix_booking_user_active_time
+    stmt = select(models.Booking.id).where(
         and_(
             models.Booking.user_id == user_id,
             models.Booking.status == "active",
@@ -164,74 +294,227 @@ async def check_user_booking_conflicts(
     )
     if exclude_booking_id is not None:
         stmt = stmt.where(models.Booking.id != exclude_booking_id)
-    result = await session.execute(stmt)
-    conflicting_bookings = result.scalars().all()
-    return len(conflicting_bookings) > 0
+    result = await session.execute(stmt.limit(1))
+    return result.first() is not None
+
+async def _claim_slot(session: AsyncSession, slot_id: int):
+    """
+    Атомарно занимает свободный слот условным UPDATE ... RETURNING.
+    Из одновременных запросов на один слот строку получает ровно один:
+    Postgres ждёт завершения его транзакции и перепроверяет is_available,
+    остальные получают 0 строк. Строка слота заблокирована до commit/rollback.
+    None — слота нет или он уже занят; иначе (place_id, start_time, end_time).
+    """
+    result = await session.execute(
+        update(models.Slot)
+        .where(models.Slot.id == slot_id, models.Slot.is_available.is_(True))
+        .values(is_available=False)
+        .returning(models.Slot.place_id, models.Slot.start_time, models.Slot.end_time)
+    )
+    return result.first()
+
+def _slot_insert(session: AsyncSession):
+    if session.bind.dialect.name == "sqlite":
+        return sqlite.insert(models.Slot)
+    return postgresql.insert(models.Slot)
+
+async def _claim_adhoc_slot(
+    session: AsyncSession,
+    place_id: int,
+    start_time: datetime,
+    end_time: datetime,
+) -> Optional[models.Slot]:
+    """
+    Слот вне сетки: INSERT ... ON CONFLICT DO NOTHING по uq_place_time_interval
+    (строка вставляется свободной) и захват тем же условным UPDATE ... RETURNING,
+    что и у слотов сетки. Одновременный запрос на то же место и интервал ждёт
+    на уникальном индексе, дубль не вставляет и при захвате получает 0 строк.
+    None — слот уже занят.
+    """
+    await session.execute(
+        _slot_insert(session)
+        .values(place_id=place_id, start_time=start_time, end_time=end_time, is_available=True)
+        .on_conflict_do_nothing(index_elements=["place_id", "start_time", "end_time"])
+    )
+    result = await session.execute(
+        update(models.Slot)
+        .where(
+            models.Slot.place_id == place_id,
+            models.Slot.start_time == start_time,
+            models.Slot.end_time == end_time,
+            models.Slot.is_available.is_(True),
+        )
+        .values(is_available=False)
+        .returning(models.Slot)
+    )
+    return result.scalar_one_or_none()
+
+# Пространство ключей advisory lock мест ("plac"): pg_advisory_xact_lock(ключ, place_id)
+PLACE_LOCK_KEY = 0x706C6163
+
+async def _others_on_place(
+    session: AsyncSession,
+    place_id: int,
+    slot_id: int,
+    start_time: datetime,
+    end_time: datetime,
+) -> dict:
+    """
+    Слоты места, пересекающие [start_time, end_time), кроме уже захваченного
+    slot_id, — для _free_place. Сначала берётся advisory lock места до конца
+    транзакции (SQLite пишет последовательно и так), потом слоты читаются
+    заново: захваты пересекающихся, но разных интервалов одного места
+    проверяются по очереди, и проверка видит закоммиченный захват соседа.
+    Порядок во всех путях один — строка слота, затем место, — поэтому
+    взаимных блокировок нет. Вместимость зоны отсюда же: на каждом месте в
+    каждый момент не больше одной брони.
+    """
+    if session.bind.dialect.name == "postgresql":
+        await session.execute(select(func.pg_advisory_xact_lock(PLACE_LOCK_KEY, place_id)))
+    result = await session.execute(
+        select(models.Slot)
+        .where(
+            models.Slot.place_id == place_id,
+            models.Slot.id != slot_id,
+            models.Slot.start_time < end_time,
+            models.Slot.end_time > start_time,
+        )
+        .execution_options(populate_existing=True)
+    )
+    return {place_id: list(result.scalars().all())}
+
+async def _take_free_place(
+    session: AsyncSession,
+    places: List[PlaceInfo],
+    slots_by_place: dict,
+    start_time: datetime,
+    end_time: datetime,
+) -> Optional[tuple]:
+    """
+    _free_place с захватом слота: (place, slot), slot уже занят этим запросом.
+    Слот сетки захватывается через _claim_slot, недостающий слот на интервал
+    создаётся и захватывается через _claim_adhoc_slot, после чего место
+    перепроверяется через _others_on_place. Если другой запрос успел занять
+    этот слот или пересекающий его, свой захват снимается, место помечается
+    занятым и поиск продолжается со следующего места.
+    """
+    while True:
+        free = _free_place(places, slots_by_place, start_time, end_time)
+        if free is None:
+            return None
+        place, slot = free
+        if slot is None:
+            slot = await _claim_adhoc_slot(session, place.id, start_time, end_time)
+            if slot is None:
+                # Строку вставил и занял чужой запрос — место в этом поиске занято
+                result = await session.execute(
+                    select(models.Slot).where(
+                        models.Slot.place_id == place.id,
+                        models.Slot.start_time == start_time,
+                        models.Slot.end_time == end_time,
+                    )
+                )
+                slot = result.scalar_one()
+                set_committed_value(slot, "is_available", False)
+                slots_by_place[place.id].append(slot)
+                continue
+            slots_by_place[place.id].append(slot)
+        else:
+            claimed = await _claim_slot(session, slot.id)
+            # Без записи в БД: строка уже занята — этим запросом или чужим
+            set_committed_value(slot, "is_available", False)
+            if claimed is None:
+                continue
+        others = await _others_on_place(session, place.id, slot.id, start_time, end_time)
+        if _free_place([place], others, start_time, end_time) is not None:
+            return place, slot
+        # Пересекающий интервал занял другой запрос: свой слот снова свободен,
+        # а в этом поиске место остаётся занятым
+        await session.execute(
+            update(models.Slot).where(models.Slot.id == slot.id).values(is_available=True)
+        )
+        slots_by_place[place.id] = others[place.id] + [slot]
 
 async def create_booking(
     session: AsyncSession,
     user_id: int,
     booking_in: schemas.BookingCreate,
 ) -> Optional[models.Booking]:
-    stmt = (
-        select(models.Slot)
-        .options(joinedload(models.Slot.place).joinedload(models.Place.zone))
-        .where(models.Slot.id == booking_in.slot_id)
-    )
-    result = await session.execute(stmt)
-    slot = result.scalar_one_or_none()
-    if slot is None:
+    # Сначала захват слота: занятый или несуществующий слот — один запрос
+    claimed = await _claim_slot(session, booking_in.slot_id)
+    if claimed is None:
         return None
-    if not slot.is_available:
+    place_id, start_time, end_time = claimed
+    if not await _can_book_claimed_slot(
+        session, user_id, booking_in.slot_id, place_id, start_time, end_time
+    ):
+        # Откат освобождает слот и снимает блокировку строки
+        await session.rollback()
         return None
-    stmt = select(models.Booking).where(
-        and_(
-            models.Booking.user_id == user_id,
-            models.Booking.slot_id == slot.id,
-            models.Booking.status == "active",
-        )
+    zone = (await get_snapshot(session)).zone_of_place(place_id)
+    booking = models.Booking(
+        user_id=user_id,
+        slot_id=booking_in.slot_id,
+        status="active",
+        zone_id=zone.id if zone else None,
+        zone_name=zone.name if zone else None,
+        zone_address=zone.address if zone else None,
+        start_time=start_time,
+        end_time=end_time,
     )
-    result = await session.execute(stmt)
-    existing = result.scalar_one_or_none()
-    if existing is not None:
-        return None
+    session.add(booking)
+    live.emit_booking(session, live.SLOT_TAKEN, booking, place_id)
+    # // уведомления: событие в outbox той же транзакцией, доставит диспетчер
+    outbox.enqueue(
+        session,
+        outbox.BOOKING_CREATED,
+        user_id=user_id,
+        zone_name=booking.zone_name,
+        start_time=booking.start_time,
+        end_time=booking.end_time,
+    )
+    # Под Idempotency-Key commit делает idempotency.run вместе с ответом
+    await idempotency.commit(session)
+    await session.refresh(booking)
+    return booking
+
+async def _can_book_claimed_slot(
+    session: AsyncSession,
+    user_id: int,
+    slot_id: int,
+    place_id: int,
+    start_time: datetime,
+    end_time: datetime,
+) -> bool:
+    """Проверки брони уже захваченного слота: место, пересечения, вместимость зоны."""
+    snapshot = await get_snapshot(session)
+    place = snapshot.place(place_id)
+    if place is None:
+        return False
+    # Ячейка сетки может пересекаться с занятым слотом брони по произвольному времени;
+    # сам захваченный слот уже недоступен и в проверке не участвует
+    others = await _others_on_place(session, place_id, slot_id, start_time, end_time)
+    if _free_place([place], others, start_time, end_time) is None:
+        return False
     has_conflict = await check_user_booking_conflicts(
         session=session,
         user_id=user_id,
-        start_time=slot.start_time,
-        end_time=slot.end_time,
+        start_time=start_time,
+        end_time=end_time,
     )
     if has_conflict:
-        return None
-    zone = slot.place.zone if slot.place else None
+        return False
+    zone = snapshot.zone_of_place(place_id)
     if zone:
         can_book = await check_zone_capacity(
             session=session,
             zone_id=zone.id,
-            start_time=slot.start_time,
-            end_time=slot.end_time,
+            start_time=start_time,
+            end_time=end_time,
         )
         if not can_book:
-            return None
-    zone = slot.place.zone if slot.place else None
-    booking = models.Booking(
-        user_id=user_id,
-        slot_id=slot.id,
-        status="active",
-        zone_name=zone.name if zone else None,
-        zone_address=zone.address if zone else None,
-        start_time=slot.start_time,
-        end_time=slot.end_time,
-    )
-    session.add(booking)
-    slot.is_available = False
-    await session.commit()
-    await session.refresh(booking)
-    
-    # // уведомления: Отправляем email и push уведомление при создании бронирования
-    await notify_booking_created(user_id, booking.zone_name, booking.start_time, booking.end_time)
-    
-    return booking
+            return False
+    return True
 
 async def create_booking_by_time_range(
     session: AsyncSession,
@@ -270,7 +553,8 @@ async def create_booking_by_time_range(
         return None
     if duration.total_seconds() > settings.MAX_BOOKING_HOURS * 3600:
         return None
-    zone = await session.get(models.Zone, booking_in.zone_id)
+    snapshot = await get_snapshot(session)
+    zone = snapshot.zone(booking_in.zone_id)
     if zone is None or not zone.is_active:
         return None
     has_conflict = await check_user_booking_conflicts(
@@ -289,98 +573,247 @@ async def create_booking_by_time_range(
     )
     if not can_book:
         return None
-    stmt = (
-        select(models.Place)
-        .where(
+    places = snapshot.places_in_zone(zone.id)
+    if not places:
+        return None
+    slots_by_place = await _slots_by_place(
+        session, [place.id for place in places], start_time, end_time
+    )
+    free = await _take_free_place(session, places, slots_by_place, start_time, end_time)
+    if free is None:
+        return None
+    place, slot = free
+    booking = models.Booking(
+        user_id=user_id,
+        slot=slot,
+        status="active",
+        zone_id=zone.id,
+        zone_name=zone.name,
+        zone_address=zone.address,
+        start_time=start_time,
+        end_time=end_time,
+    )
+    session.add(booking)
+    live.emit_booking(session, live.SLOT_TAKEN, booking, place.id)
+    # // уведомления: событие в outbox той же транзакцией, доставит диспетчер
+    outbox.enqueue(
+        session,
+        outbox.BOOKING_CREATED,
+        user_id=user_id,
+        zone_name=booking.zone_name,
+        start_time=start_time,
+        end_time=end_time,
+    )
+    # Под Idempotency-Key commit делает idempotency.run вместе с ответом
+    await idempotency.commit(session)
+    await session.refresh(booking)
+    return booking
+
+async def _slots_by_place(
+    session: AsyncSession,
+    place_ids: List[int],
+    start_time: datetime,
+    end_time: datetime,
+) -> dict:
+    """Слоты мест, пересекающие [start_time, end_time), одним запросом."""
+    slots_by_place = {place_id: [] for place_id in place_ids}
+    result = await session.execute(
+        select(models.Slot).where(
             and_(
-                models.Place.zone_id == zone.id,
-                models.Place.is_active.is_(True),
+                models.Slot.place_id.in_(place_ids),
+                models.Slot.start_time < end_time,
+                models.Slot.end_time > start_time,
             )
         )
     )
-    result = await session.execute(stmt)
-    places = list(result.scalars().all())
-    if not places:
-        return None
+    for slot in result.scalars().all():
+        slots_by_place[slot.place_id].append(slot)
+    return slots_by_place
+
+def _free_place(
+    places: List[PlaceInfo],
+    slots_by_place: dict,
+    start_time: datetime,
+    end_time: datetime,
+) -> Optional[tuple]:
+    """
+    Первое место, свободное в [start_time, end_time): (place, slot), где slot —
+    существующий слот ровно на этот интервал (например, из сетки слотов) или None.
+    Место занято, если его пересекает хоть один недоступный слот.
+    """
+    # Время слотов в моделях уже naive UTC (models.UTCDateTime)
+    start_time = naive_utc(start_time)
+    end_time = naive_utc(end_time)
     for place in places:
-        stmt_exact = (
-            select(models.Slot)
-            .where(
-                and_(
-                    models.Slot.place_id == place.id,
-                    models.Slot.start_time == start_time,
-                    models.Slot.end_time == end_time,
-                )
+        exact = None
+        busy = False
+        for slot in slots_by_place.get(place.id, ()):
+            if slot.start_time >= end_time or slot.end_time <= start_time:
+                continue
+            if not slot.is_available:
+                busy = True
+                break
+            if slot.start_time == start_time and slot.end_time == end_time:
+                exact = slot
+        if not busy:
+            return place, exact
+    return None
+
+class BookingBulkError(Exception):
+    pass
+
+def _bulk_dates(data: schemas.BookingBulkCreate) -> List[date]:
+    if data.dates is not None:
+        return sorted(set(data.dates))
+    rule = data.recurrence
+    result = []
+    day = rule.date_from
+    while day <= rule.date_to:
+        if day.weekday() in rule.weekdays:
+            result.append(day)
+        day += timedelta(days=1)
+    return result
+
+def _overlaps(intervals: List[tuple], start_time: datetime, end_time: datetime) -> List[tuple]:
+    return [(s, e) for s, e in intervals if s < end_time and e > start_time]
+
+async def create_bookings_bulk(
+    session: AsyncSession,
+    user_id: int,
+    data: schemas.BookingBulkCreate,
+) -> schemas.BookingBulkResult:
+    """
+    Создаёт серию броней в зоне одним проходом: все пересечения пользователя,
+    вместимость зоны и занятость слотов читаются тремя запросами на весь
+    диапазон дат, дальше проверки идут в памяти, коммит — один.
+    Даты, которые не удалось забронировать, возвращаются со статусом ошибки.
+    """
+    dates = _bulk_dates(data)
+    if not dates:
+        raise BookingBulkError("Не выбрано ни одной даты")
+    if len(dates) > settings.MAX_BULK_OCCURRENCES:
+        raise BookingBulkError(
+            f"Слишком много дат (максимум {settings.MAX_BULK_OCCURRENCES})"
+        )
+    start_of_day = timedelta(hours=data.start_hour, minutes=data.start_minute)
+    end_of_day = timedelta(hours=data.end_hour, minutes=data.end_minute)
+    duration = end_of_day - start_of_day
+    if duration.total_seconds() <= 0:
+        raise BookingBulkError("Некорректный интервал времени")
+    if duration.total_seconds() > settings.MAX_BOOKING_HOURS * 3600:
+        raise BookingBulkError(
+            f"Превышен максимальный лимит бронирования ({settings.MAX_BOOKING_HOURS} часов)"
+        )
+    snapshot = await get_snapshot(session)
+    zone = snapshot.zone(data.zone_id)
+    if zone is None or not zone.is_active:
+        raise BookingBulkError("Зона не найдена или закрыта")
+
+    occurrences = []
+    for day in dates:
+        midnight = datetime.combine(day, datetime.min.time())
+        occurrences.append((day, midnight + start_of_day, midnight + end_of_day))
+    range_start = occurrences[0][1]
+    range_end = occurrences[-1][2]
+
+    places = snapshot.places_in_zone(zone.id)
+
+    result = await session.execute(
+        select(models.Booking.start_time, models.Booking.end_time).where(
+            and_(
+                models.Booking.user_id == user_id,
+                models.Booking.status == "active",
+                models.Booking.start_time < range_end,
+                models.Booking.end_time > range_start,
             )
         )
-        result_exact = await session.execute(stmt_exact)
-        exact_slot = result_exact.scalar_one_or_none()
-        if exact_slot and exact_slot.is_available:
-            exact_slot.is_available = False
-            booking = models.Booking(
-                user_id=user_id,
-                slot_id=exact_slot.id,
-                status="active",
-                zone_name=zone.name,
-                zone_address=zone.address,
-                start_time=start_time,
-                end_time=end_time,
+    )
+    user_intervals = [tuple(row) for row in result.all()]
+
+    result = await session.execute(
+        select(models.Booking.start_time, models.Booking.end_time).where(
+            and_(
+                models.Booking.zone_id == zone.id,
+                models.Booking.status == "active",
+                models.Booking.start_time < range_end,
+                models.Booking.end_time > range_start,
             )
-            session.add(booking)
-            await session.commit()
-            await session.refresh(booking)
-            
-            # // уведомления: Отправляем email и push уведомление при создании бронирования
-            await notify_booking_created(user_id, booking.zone_name, booking.start_time, booking.end_time)
-            
-            return booking
-        if exact_slot and not exact_slot.is_available:
+        )
+    )
+    zone_intervals = [
+        (s, e) for s, e in result.all() if s is not None and e is not None
+    ]
+
+    slots_by_place = {}
+    if places:
+        slots_by_place = await _slots_by_place(
+            session, [place.id for place in places], range_start, range_end
+        )
+
+    items = []
+    created = []
+    for day, start_time, end_time in occurrences:
+        if _overlaps(user_intervals, start_time, end_time):
+            items.append(schemas.BookingBulkItem(
+                date=day, status="conflict",
+                detail="У вас уже есть бронирование на это время",
+            ))
             continue
-        if not exact_slot:
-            stmt = (
-                select(models.Slot)
-                .where(
-                    and_(
-                        models.Slot.place_id == place.id,
-                        models.Slot.start_time < end_time,
-                        models.Slot.end_time > start_time,
-                    )
-                )
-            )
-            result = await session.execute(stmt)
-            overlapping_slots = list(result.scalars().all())
-            has_conflict = False
-            for slot in overlapping_slots:
-                if not slot.is_available:
-                    has_conflict = True
-                    break
-            if not has_conflict:
-                slot = models.Slot(
-                    place_id=place.id,
-                    start_time=start_time,
-                    end_time=end_time,
-                    is_available=False,
-                )
-                session.add(slot)
-                await session.flush()
-                booking = models.Booking(
-                    user_id=user_id,
-                    slot_id=slot.id,
-                    status="active",
-                    zone_name=zone.name,
-                    zone_address=zone.address,
-                    start_time=start_time,
-                    end_time=end_time,
-                )
-                session.add(booking)
-                await session.commit()
-                await session.refresh(booking)
-                
-                # // уведомления: Отправляем email и push уведомление при создании бронирования
-                await notify_booking_created(user_id, booking.zone_name, booking.start_time, booking.end_time)
-                
-                return booking
-    return None
+        if not places or not _fits_capacity(
+            _overlaps(zone_intervals, start_time, end_time), start_time, end_time, len(places)
+        ):
+            items.append(schemas.BookingBulkItem(
+                date=day, status="zone_full", detail="Зона переполнена на это время",
+            ))
+            continue
+        free = await _take_free_place(session, places, slots_by_place, start_time, end_time)
+        if free is None:
+            items.append(schemas.BookingBulkItem(
+                date=day, status="no_places", detail="Нет свободных мест на это время",
+            ))
+            continue
+        place, target_slot = free
+        booking = models.Booking(
+            user_id=user_id,
+            slot=target_slot,
+            status="active",
+            zone_id=zone.id,
+            zone_name=zone.name,
+            zone_address=zone.address,
+            start_time=start_time,
+            end_time=end_time,
+        )
+        session.add(booking)
+        live.emit_booking(session, live.SLOT_TAKEN, booking, place.id)
+        user_intervals.append((start_time, end_time))
+        zone_intervals.append((start_time, end_time))
+        created.append((len(items), booking))
+        items.append(schemas.BookingBulkItem(date=day, status="created"))
+
+    if created:
+        # // уведомления: одно сводное событие вместо письма на каждую бронь
+        outbox.enqueue(
+            session,
+            outbox.BOOKINGS_BULK_CREATED,
+            user_id=user_id,
+            zone_name=zone.name,
+            intervals=[(booking.start_time, booking.end_time) for _, booking in created],
+        )
+        await session.commit()
+        # Один запрос вместо refresh на каждую бронь — подтягиваем created_at/updated_at
+        await session.execute(
+            select(models.Booking)
+            .where(models.Booking.id.in_([booking.id for _, booking in created]))
+            .execution_options(populate_existing=True)
+        )
+        for index, booking in created:
+            items[index].booking = schemas.BookingOut.model_validate(booking)
+
+    return schemas.BookingBulkResult(
+        created=len(created),
+        failed=len(items) - len(created),
+        items=items,
+    )
 
 async def get_booking_by_id(
     session: AsyncSession,
@@ -394,6 +827,34 @@ async def get_booking_by_id(
     result = await session.execute(stmt)
     return result.scalar_one_or_none()
 
+async def _cancel_active_bookings(session: AsyncSession, *conditions) -> List[models.Booking]:
+    """
+    Отмена активных броней под conditions без чтения их заранее: один
+    UPDATE bookings ... RETURNING и один UPDATE slots ... RETURNING
+    (place_id нужен событиям slot_released). Без commit — его делает вызывающий.
+    """
+    result = await session.execute(
+        update(models.Booking)
+        .where(models.Booking.status == "active", *conditions)
+        .values(status="cancelled")
+        .returning(models.Booking)
+        .execution_options(synchronize_session=False, populate_existing=True)
+    )
+    bookings: List[models.Booking] = list(result.scalars().all())
+    if not bookings:
+        return bookings
+    slots = await session.execute(
+        update(models.Slot)
+        .where(_id_in(session, models.Slot.id, [booking.slot_id for booking in bookings]))
+        .values(is_available=True)
+        .returning(models.Slot.id, models.Slot.place_id)
+        .execution_options(synchronize_session=False)
+    )
+    place_by_slot = dict(slots.all())
+    for booking in bookings:
+        live.emit_booking(session, live.SLOT_RELEASED, booking, place_by_slot.get(booking.slot_id))
+    return bookings
+
 async def cancel_booking(
     session: AsyncSession,
     user_id: int,
@@ -401,52 +862,265 @@ async def cancel_booking(
     *,
     is_admin: bool = False,
 ) -> Optional[models.Booking]:
-    booking = await get_booking_by_id(session, booking_id)
-    if booking is None:
-        return None
-    if not is_admin and booking.user_id != user_id:
-        return None
-    if booking.status != "active":
+    conditions = [models.Booking.id == booking_id]
+    if not is_admin:
+        conditions.append(models.Booking.user_id == user_id)
+    cancelled = await _cancel_active_bookings(session, *conditions)
+    if not cancelled:
+        # Ничего не отменено: брони нет, она чужая или уже не активна.
+        # Только на этом пути читаем бронь — повторная отмена отдаёт её как есть
+        booking = await session.get(models.Booking, booking_id)
+        if booking is None:
+            return None
+        if not is_admin and booking.user_id != user_id:
+            return None
         return booking
-    booking.status = "cancelled"
-    if booking.slot:
-        booking.slot.is_available = True
+    booking = cancelled[0]
+    # // уведомления: событие в outbox той же транзакцией, доставит диспетчер
+    outbox.enqueue(
+        session,
+        outbox.BOOKING_CANCELLED,
+        user_id=booking.user_id,
+        zone_name=booking.zone_name,
+        start_time=booking.start_time,
+        end_time=booking.end_time,
+    )
+    # updated_at и остальные поля уже пришли в RETURNING — refresh не нужен
     await session.commit()
-    await session.refresh(booking)
-    
-    # // уведомления: Отправляем email и push уведомление при отмене бронирования
-    await notify_booking_cancelled(booking.user_id, booking.zone_name, booking.start_time, booking.end_time)
-    
     return booking
 
-async def get_booking_history(
+async def cancel_bookings_bulk(
     session: AsyncSession,
     user_id: int,
-    filters: Optional[schemas.BookingHistoryFilters] = None,
-) -> List[models.Booking]:
-    filters = filters or schemas.BookingHistoryFilters()
-    stmt = (
-        select(models.Booking)
-        .join(models.Slot, models.Slot.id == models.Booking.slot_id)
-        .join(models.Place, models.Place.id == models.Slot.place_id)
-        .join(models.Zone, models.Zone.id == models.Place.zone_id)
-        .where(models.Booking.user_id == user_id)
-        .options(joinedload(models.Booking.slot))
-        .order_by(models.Booking.created_at.desc())
+    data: schemas.BookingBulkCancel,
+) -> schemas.BookingBulkCancelResult:
+    """
+    Массовая отмена своих броней — по списку id или фильтром «будущие брони»
+    (зона, интервал дат начала; без них — только при data.all, это проверяет
+    схема). Та же пара UPDATE ... RETURNING, что и у
+    одиночной отмены, независимо от числа броней; один commit.
+    """
+    conditions = [models.Booking.user_id == user_id]
+    if data.booking_ids is not None:
+        if len(data.booking_ids) > settings.MAX_BULK_CANCEL:
+            raise BookingBulkError(
+                f"Слишком много броней (максимум {settings.MAX_BULK_CANCEL})"
+            )
+        conditions.append(_id_in(session, models.Booking.id, data.booking_ids))
+    else:
+        filters = schemas.BookingHistoryFilters(
+            zone_id=data.zone_id,
+            date_from=(
+                None if data.date_from is None
+                else datetime.combine(data.date_from, datetime.min.time())
+            ),
+            date_to=(
+                None if data.date_to is None
+                else datetime.combine(data.date_to, datetime.max.time())
+            ),
+        )
+        conditions.extend(_booking_filter_conditions(filters, models.Booking))
+        conditions.append(models.Booking.start_time >= now_utc())
+
+    bookings = await _cancel_active_bookings(session, *conditions)
+    bookings.sort(key=lambda booking: (booking.start_time or datetime.min, booking.id))
+    if bookings:
+        intervals_by_zone = {}
+        for booking in bookings:
+            intervals_by_zone.setdefault((booking.zone_id, booking.zone_name), []).append(
+                (booking.start_time, booking.end_time)
+            )
+        # // уведомления: одно сводное событие на зону вместо письма на каждую бронь
+        for (_, zone_name), intervals in intervals_by_zone.items():
+            outbox.enqueue(
+                session,
+                outbox.BOOKINGS_BULK_CANCELLED,
+                user_id=user_id,
+                zone_name=zone_name,
+                intervals=intervals,
+            )
+        await session.commit()
+
+    cancelled_ids = {booking.id for booking in bookings}
+    return schemas.BookingBulkCancelResult(
+        cancelled=len(bookings),
+        bookings=[schemas.BookingOut.model_validate(booking) for booking in bookings],
+        skipped=[
+            booking_id for booking_id in dict.fromkeys(data.booking_ids or [])
+            if booking_id not in cancelled_ids
+        ],
     )
+
+def _booking_filter_conditions(filters: schemas.BookingHistoryFilters, model) -> list:
+    # model — Booking или BookingArchive: набор колонок у них общий
     conds = []
     if filters.status:
-        conds.append(models.Booking.status == filters.status)
+        conds.append(model.status == filters.status)
+    # zone_id и время денормализованы в bookings — join не нужен
     if filters.zone_id:
-        conds.append(models.Zone.id == filters.zone_id)
+        conds.append(model.zone_id == filters.zone_id)
     if filters.date_from:
-        conds.append(models.Slot.start_time >= filters.date_from)
+        conds.append(model.start_time >= filters.date_from)
     if filters.date_to:
-        conds.append(models.Slot.start_time <= filters.date_to)
+        conds.append(model.start_time <= filters.date_to)
+    return conds
+
+def _booking_history_stmt(
+    user_id: int,
+    filters: schemas.BookingHistoryFilters,
+    model=models.Booking,
+):
+    stmt = select(model).where(model.user_id == user_id)
+    conds = _booking_filter_conditions(filters, model)
     if conds:
         stmt = stmt.where(and_(*conds))
-    result = await session.execute(stmt)
-    return list(result.scalars().all())
+    return stmt.order_by(model.created_at.desc(), model.id.desc())
+
+def encode_history_cursor(booking: models.Booking) -> str:
+    raw = f"{booking.created_at.isoformat()}|{booking.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+def decode_history_cursor(cursor: str) -> tuple:
+    """Разбирает курсор (created_at, id); ValueError при неверном формате."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, booking_id = base64.urlsafe_b64decode(padded).decode().rsplit("|", 1)
+        return datetime.fromisoformat(created_at), int(booking_id)
+    except (ValueError, UnicodeDecodeError, binascii.Error) as e:
+        raise ValueError("Некорректный курсор") from e
+
+async def get_booking_history(
+    session: AsyncSession,
+    user_id: int,
+    filters: Optional[schemas.BookingHistoryFilters] = None,
+    include_archived: bool = False,
+) -> List[models.Booking]:
+    filters = filters or schemas.BookingHistoryFilters()
+    result = await session.execute(_booking_history_stmt(user_id, filters))
+    bookings = list(result.scalars().all())
+    if include_archived:
+        # Архив (см. archive.py) читается только по запросу
+        result = await session.execute(
+            _booking_history_stmt(user_id, filters, model=models.BookingArchive)
+        )
+        bookings.extend(result.scalars().all())
+        bookings.sort(key=lambda b: (b.created_at, b.id), reverse=True)
+    return bookings
+
+async def get_booking_history_rows(
+    session: AsyncSession,
+    user_id: int,
+    filters: Optional[schemas.BookingHistoryFilters] = None,
+    include_archived: bool = False,
+) -> List[dict]:
+    """То же, что get_booking_history, но словарями с полями BookingOut."""
+    filters = filters or schemas.BookingHistoryFilters()
+    sources = [models.Booking, models.BookingArchive] if include_archived else [models.Booking]
+    rows: List[dict] = []
+    for model in sources:
+        stmt = _booking_history_stmt(user_id, filters, model=model).with_only_columns(
+            *_schema_columns(model, schemas.BookingOut)
+        )
+        rows.extend(await _fetch_rows(session, stmt))
+    if include_archived:
+        rows.sort(key=lambda r: (r["created_at"], r["id"]), reverse=True)
+    return rows
+
+async def get_booking_history_page(
+    session: AsyncSession,
+    user_id: int,
+    filters: Optional[schemas.BookingHistoryFilters] = None,
+    limit: int = settings.HISTORY_PAGE_SIZE,
+    cursor: Optional[str] = None,
+) -> schemas.BookingHistoryPage:
+    """
+    Keyset-пагинация по (created_at, id) в порядке убывания.
+    next_cursor указывает на последнюю запись страницы; None — страниц больше нет.
+    """
+    filters = filters or schemas.BookingHistoryFilters()
+    limit = max(1, min(limit, settings.HISTORY_MAX_PAGE_SIZE))
+    stmt = _booking_history_stmt(user_id, filters)
+    if cursor:
+        created_at, booking_id = decode_history_cursor(cursor)
+        stmt = stmt.where(
+            or_(
+                models.Booking.created_at < created_at,
+                and_(
+                    models.Booking.created_at == created_at,
+                    models.Booking.id < booking_id,
+                ),
+            )
+        )
+    result = await session.execute(stmt.limit(limit + 1))
+    bookings = list(result.scalars().all())
+    next_cursor = None
+    if len(bookings) > limit:
+        bookings = bookings[:limit]
+        next_cursor = encode_history_cursor(bookings[-1])
+    return schemas.BookingHistoryPage(
+        items=[schemas.BookingOut.model_validate(b) for b in bookings],
+        next_cursor=next_cursor,
+    )
+
+async def stream_booking_history(
+    session: AsyncSession,
+    user_id: int,
+    filters: Optional[schemas.BookingHistoryFilters] = None,
+) -> AsyncIterator[models.Booking]:
+    """
+    Полная история через серверный курсор: строки читаются пачками по
+    HISTORY_STREAM_BATCH, память на запрос не зависит от числа броней.
+    """
+    filters = filters or schemas.BookingHistoryFilters()
+    stmt = _booking_history_stmt(user_id, filters).execution_options(
+        yield_per=settings.HISTORY_STREAM_BATCH
+    )
+    result = await session.stream_scalars(stmt)
+    async for booking in result:
+        yield booking
+
+EXPORT_COLUMNS = (
+    "id",
+    "user_id",
+    "slot_id",
+    "zone_id",
+    "zone_name",
+    "zone_address",
+    "start_time",
+    "end_time",
+    "status",
+    "cancellation_reason",
+    "created_at",
+    "updated_at",
+)
+
+def _bookings_export_stmt(filters: schemas.BookingHistoryFilters, model=models.Booking):
+    stmt = select(*[getattr(model, name) for name in EXPORT_COLUMNS])
+    conds = _booking_filter_conditions(filters, model)
+    if conds:
+        stmt = stmt.where(and_(*conds))
+    return stmt.order_by(model.id)
+
+async def stream_bookings_export(
+    session: AsyncSession,
+    filters: Optional[schemas.BookingHistoryFilters] = None,
+    include_archived: bool = False,
+) -> AsyncIterator[list]:
+    """
+    Брони всех пользователей под фильтром пачками строк (колонки EXPORT_COLUMNS)
+    через серверный курсор: первая пачка отдаётся, как только прочитана,
+    в памяти — не больше EXPORT_STREAM_BATCH строк. Архив — после bookings.
+    """
+    filters = filters or schemas.BookingHistoryFilters()
+    sources = [models.Booking, models.BookingArchive] if include_archived else [models.Booking]
+    for model in sources:
+        result = await session.stream(
+            _bookings_export_stmt(filters, model).execution_options(
+                yield_per=settings.EXPORT_STREAM_BATCH
+            )
+        )
+        async for rows in result.partitions():
+            yield rows
 
 class BookingExtensionError(Exception):
     pass
@@ -487,17 +1161,9 @@ async def extend_booking(
         raise BookingExtensionError(
             "У вас уже есть другое бронирование на это время"
         )
-    zone = None
-    if slot.place:
-        stmt = (
-            select(models.Place)
-            .options(joinedload(models.Place.zone))
-            .where(models.Place.id == slot.place_id)
-        )
-        result = await session.execute(stmt)
-        place = result.scalar_one_or_none()
-        if place and place.zone:
-            zone = place.zone
+    snapshot = await get_snapshot(session)
+    place = snapshot.place(slot.place_id)
+    zone = snapshot.zone_of_place(slot.place_id)
     if zone is None:
         raise BookingExtensionError("Зона не найдена")
     can_book = await check_zone_capacity(
@@ -510,66 +1176,39 @@ async def extend_booking(
         raise BookingExtensionError(
             "Зона переполнена на выбранное время. Попробуйте продлить на меньшее время"
         )
-    stmt_exact = (
-        select(models.Slot)
-        .where(
-            and_(
-                models.Slot.place_id == slot.place_id,
-                models.Slot.start_time == booking.end_time,
-                models.Slot.end_time == new_end_time,
-            )
-        )
+    slots_by_place = await _slots_by_place(
+        session, [slot.place_id], booking.end_time, new_end_time
+    )
+    free = await _take_free_place(
+        session, [place], slots_by_place, booking.end_time, new_end_time
     )
-    result_exact = await session.execute(stmt_exact)
-    extended_slot = result_exact.scalar_one_or_none()
-    if extended_slot and extended_slot.is_available:
-        extended_slot.is_available = False
-    elif extended_slot and not extended_slot.is_available:
+    if free is None:
         raise BookingExtensionError(
             "Выбранное время уже занято. Попробуйте продлить на меньшее время"
         )
-    else:
-        stmt_overlap = (
-            select(models.Slot)
-            .where(
-                and_(
-                    models.Slot.place_id == slot.place_id,
-                    models.Slot.start_time < new_end_time,
-                    models.Slot.end_time > booking.end_time,
-                )
-            )
-        )
-        result_overlap = await session.execute(stmt_overlap)
-        overlapping_slots = list(result_overlap.scalars().all())
-        for overlap_slot in overlapping_slots:
-            if not overlap_slot.is_available:
-                raise BookingExtensionError(
-                    "Выбранное время частично занято. Попробуйте продлить на меньшее время"
-                )
-        extended_slot = models.Slot(
-            place_id=slot.place_id,
-            start_time=booking.end_time,
-            end_time=new_end_time,
-            is_available=False,
-        )
-        session.add(extended_slot)
-        await session.flush()
+    _, extended_slot = free
     new_booking = models.Booking(
         user_id=user_id,
         slot_id=extended_slot.id,
         status="active",
+        zone_id=zone.id if zone else None,
         zone_name=zone.name if zone else None,
         zone_address=zone.address if zone else None,
         start_time=booking.end_time,
         end_time=new_end_time,
     )
     session.add(new_booking)
-    await session.commit()
+    live.emit_booking(session, live.SLOT_TAKEN, new_booking, slot.place_id)
+    # // уведомления: событие в outbox той же транзакцией, доставит диспетчер
+    outbox.enqueue(
+        session,
+        outbox.BOOKING_EXTENDED,
+        user_id=user_id,
+        zone_name=new_booking.zone_name,
+        end_time=new_end_time,
+    )
+    await idempotency.commit(session)
     await session.refresh(new_booking)
-    
-    # // уведомления: Отправляем email и push уведомление при продлении бронирования
-    await notify_booking_extended(user_id, new_booking.zone_name, new_booking.end_time)
-    
     return new_booking
 
 # ============================================================
@@ -584,6 +1223,9 @@ async def create_zone(
         name=data.name,
         address=data.address,
         is_active=data.is_active,
+        opens_at=data.opens_at,
+        closes_at=data.closes_at,
+        slot_minutes=data.slot_minutes,
     )
     session.add(zone)
     await session.flush()
@@ -594,10 +1236,16 @@ async def create_zone(
             is_active=True,
         )
         session.add(place)
+    if zone.is_active:
+        live.emit(session, live.ZONE_OPENED, {"zone_id": zone.id})
     await session.commit()
+    catalogue.invalidate()
     await session.refresh(zone)
     return zone
 
+class ZoneUpdateError(Exception):
+    pass
+
 async def update_zone(
     session: AsyncSession,
     zone_id: int,
@@ -607,9 +1255,23 @@ async def update_zone(
     if zone is None:
         return None
     update_data = data.model_dump(exclude_unset=True)
+    # Часы работы проверяем после слияния с текущими: PATCH может менять
+    # только одну границу, а сетка слотов при closes_at <= opens_at пуста
+    opens_at = update_data.get("opens_at") or zone.opens_at
+    closes_at = update_data.get("closes_at") or zone.closes_at
+    if closes_at <= opens_at:
+        raise ZoneUpdateError("closes_at must be later than opens_at")
+    was_active = zone.is_active
     for field, value in update_data.items():
         setattr(zone, field, value)
+    if zone.is_active != was_active:
+        live.emit(
+            session,
+            live.ZONE_OPENED if zone.is_active else live.ZONE_CLOSED,
+            {"zone_id": zone.id},
+        )
     await session.commit()
+    catalogue.invalidate()
     await session.refresh(zone)
     return zone
 
@@ -621,85 +1283,221 @@ async def delete_zone(
     if zone is None:
         return False
     await session.delete(zone)
+    live.emit(session, live.ZONE_CLOSED, {"zone_id": zone_id, "deleted": True})
     await session.commit()
+    catalogue.invalidate()
     return True
 
+def _id_in(session: AsyncSession, column, ids: List[int]):
+    """
+    column IN ids одним условием при любом числе id. На Postgres — один
+    параметр-массив (= ANY), а не параметр на каждый id: лимит параметров
+    драйвера (32767 у asyncpg) не ограничивает размер списка.
+    """
+    if session.bind.dialect.name == "postgresql":
+        return column == any_(bindparam("ids", ids, type_=ARRAY(Integer)))
+    return column.in_(ids)
+
 async def close_zone(
     session: AsyncSession,
     zone_id: int,
     data: schemas.ZoneCloseRequest,
 ) -> List[models.Booking]:
+    outcome = await close_zone_tracked(session, zone_id, data)
+    return outcome[1] if outcome else []
+
+async def close_zone_tracked(
+    session: AsyncSession,
+    zone_id: int,
+    data: schemas.ZoneCloseRequest,
+) -> Optional[tuple]:
+    """
+    Закрывает зону одной транзакцией и постоянным числом запросов при любом
+    числе броней: брони отменяются одним UPDATE ... RETURNING (отбор по
+    денормализованному zone_id, без join через slots/places), их слоты
+    освобождаются одним UPDATE slots, уведомления группируются по
+    пользователю и уходят через outbox.
+    Возвращает (ZoneClosure, отменённые брони) или None, если зоны нет.
+    """
     zone = await session.get(models.Zone, zone_id)
     if zone is None:
-        return []
+        return None
     zone.is_active = False
     zone.closure_reason = data.reason
     zone.closed_until = data.to_time
-    stmt = (
-        select(models.Booking)
-        .join(models.Slot, models.Slot.id == models.Booking.slot_id)
-        .join(models.Place, models.Place.id == models.Slot.place_id)
-        .join(models.Zone, models.Zone.id == models.Place.zone_id)
+    result = await session.execute(
+        update(models.Booking)
         .where(
             and_(
-                models.Zone.id == zone_id,
+                models.Booking.zone_id == zone_id,
                 models.Booking.status == "active",
-                models.Slot.start_time < data.to_time,
-                models.Slot.end_time  > data.from_time,
+                models.Booking.start_time < data.to_time,
+                models.Booking.end_time > data.from_time,
             )
         )
-        .options(joinedload(models.Booking.slot))
+        .values(
+            status="cancelled",
+            cancellation_reason=f"Зона закрыта: {data.reason}",
+        )
+        .returning(models.Booking)
+        .execution_options(synchronize_session=False, populate_existing=True)
     )
-    result = await session.execute(stmt)
     affected_bookings: List[models.Booking] = list(result.scalars().all())
+    slot_ids = [booking.slot_id for booking in affected_bookings]
+    if slot_ids:
+        await session.execute(
+            update(models.Slot)
+            .where(_id_in(session, models.Slot.id, slot_ids))
+            .values(is_available=True)
+            .execution_options(synchronize_session=False)
+        )
+    intervals_by_user = {}
     for booking in affected_bookings:
-        booking.status = "cancelled"
-        booking.cancellation_reason = f"Зона закрыта: {data.reason}"
-        if booking.slot:
-            booking.slot.is_available = True
+        intervals_by_user.setdefault(booking.user_id, []).append(
+            (booking.start_time, booking.end_time)
+        )
+    # Одно событие на закрытие вместо slot_released по каждой брони
+    live.emit(session, live.ZONE_CLOSED, {
+        "zone_id": zone.id,
+        "reason": data.reason,
+        "closed_until": data.to_time,
+        "released_slots": len(slot_ids),
+    })
+    current = sum(
+        1 for booking in affected_bookings
+        if live.is_current(booking.start_time, booking.end_time)
+    )
+    if current:
+        live.emit(session, live.OCCUPANCY_CHANGED, {"zone_id": zone.id, "delta": -current})
+    closure = models.ZoneClosure(
+        zone_id=zone.id,
+        reason=data.reason,
+        from_time=data.from_time,
+        to_time=data.to_time,
+        affected_bookings=len(affected_bookings),
+        affected_users=len(intervals_by_user),
+    )
+    session.add(closure)
+    await session.flush()
+    # // уведомления: одно событие на пользователя, в той же транзакции
+    for user_id, intervals in intervals_by_user.items():
+        outbox.enqueue(
+            session,
+            outbox.ZONE_CLOSED,
+            zone_closure_id=closure.id,
+            user_id=user_id,
+            zone_name=zone.name,
+            reason=data.reason,
+            intervals=sorted(intervals),
+        )
     await session.commit()
+    catalogue.invalidate()
     await session.refresh(zone)
-    for booking in affected_bookings:
-        await session.refresh(booking)
-    
-    # // уведомления: Отправляем email и push уведомление всем затронутым пользователям о закрытии зоны
-    for booking in affected_bookings:
-        await notify_zone_closed(
-            booking.user_id,
-            zone.name,
-            data.reason,
-            booking.start_time,
-            booking.end_time
-        )
-    
-    return affected_bookings
+    return closure, affected_bookings
 
-async def get_global_statistics(
+async def get_zone_closure(
     session: AsyncSession,
-) -> schemas.GlobalStatistics:
-    stmt = select(
-        func.count(models.Booking.id).filter(models.Booking.status == "active").label("active_count"),
-        func.count(models.Booking.id).filter(models.Booking.status == "cancelled").label("cancelled_count"),
+    closure_id: int,
+) -> Optional[schemas.ZoneClosureOut]:
+    """Закрытие зоны и прогресс рассылки уведомлений по нему."""
+    closure = await session.get(models.ZoneClosure, closure_id)
+    if closure is None:
+        return None
+    result = await session.execute(
+        select(models.OutboxEvent.status, func.count(models.OutboxEvent.id))
+        .where(models.OutboxEvent.zone_closure_id == closure_id)
+        .group_by(models.OutboxEvent.status)
     )
-    result = await session.execute(stmt)
-    row = result.one()
-    total_active = row.active_count or 0
-    total_cancelled = row.cancelled_count or 0
-    now = msk_to_utc(now_msk())
-    stmt = select(func.count(func.distinct(models.Booking.user_id))).where(
-        and_(
-            models.Booking.status == "active",
-            models.Booking.start_time <= now,
-            models.Booking.end_time > now,
+    counts = dict(result.all())
+    pending = counts.get("pending", 0)
+    failed = counts.get("failed", 0)
+    if pending:
+        status = "notifying"
+    elif failed:
+        status = "completed_with_errors"
+    else:
+        status = "completed"
+    return schemas.ZoneClosureOut(
+        id=closure.id,
+        zone_id=closure.zone_id,
+        reason=closure.reason,
+        from_time=closure.from_time,
+        to_time=closure.to_time,
+        affected_bookings=closure.affected_bookings,
+        affected_users=closure.affected_users,
+        status=status,
+        notifications_pending=pending,
+        notifications_delivered=counts.get("delivered", 0),
+        notifications_failed=failed,
+        created_at=closure.created_at,
+    )
+
+def _statistics_columns(now: datetime) -> tuple:
+    current = in_progress(now)
+    return (
+        func.count(case((models.Booking.status == "active", 1))).label("active_bookings"),
+        func.count(case((models.Booking.status == "cancelled", 1))).label("cancelled_bookings"),
+        func.count(case((current, 1))).label("current_occupancy"),
+        # Для общей статистики — люди, а не брони: пользователь с двумя
+        # текущими бронями в разных зонах считается один раз
+        func.count(func.distinct(case((current, models.Booking.user_id)))).label("users_now"),
+    )
+
+async def get_statistics(
+    session: AsyncSession,
+) -> Tuple[List[schemas.ZoneStatistics], schemas.GlobalStatistics]:
+    """
+    Статистика по зонам и общая одним запросом: строки по Booking.zone_id и
+    итоговая строка (is_total) через UNION ALL.
+    Зоны без броней и их состояние закрытия — из каталога, без запроса.
+    """
+    now = now_utc()
+    per_zone = (
+        select(
+            models.Booking.zone_id,
+            literal(False).label("is_total"),
+            *_statistics_columns(now),
         )
+        .group_by(models.Booking.zone_id)
     )
-    result = await session.execute(stmt)
-    users_now = result.scalar() or 0
-    return schemas.GlobalStatistics(
-        total_active_bookings=total_active,
-        total_cancelled_bookings=total_cancelled,
-        users_in_coworking_now=users_now,
+    totals = select(
+        cast(null(), Integer).label("zone_id"),
+        literal(True).label("is_total"),
+        *_statistics_columns(now),
     )
+    rows = (await session.execute(union_all(per_zone, totals))).all()
+    total = next(row for row in rows if row.is_total)
+    by_zone = {row.zone_id: row for row in rows if not row.is_total}
+
+    snapshot = await get_snapshot(session)
+    zones = []
+    for zone in sorted(snapshot.zones.values(), key=lambda zone: zone.name):
+        row = by_zone.get(zone.id)
+        zones.append(schemas.ZoneStatistics(
+            zone_id=zone.id,
+            zone_name=zone.name,
+            is_active=zone.is_active,
+            closure_reason=zone.closure_reason,
+            closed_until=zone.closed_until,
+            active_bookings=row.active_bookings if row else 0,
+            cancelled_bookings=row.cancelled_bookings if row else 0,
+            current_occupancy=row.current_occupancy if row else 0,
+        ))
+    return zones, schemas.GlobalStatistics(
+        total_active_bookings=total.active_bookings or 0,
+        total_cancelled_bookings=total.cancelled_bookings or 0,
+        users_in_coworking_now=total.users_now or 0,
+    )
+
+async def get_zones_statistics(session: AsyncSession) -> List[schemas.ZoneStatistics]:
+    zones, _ = await get_statistics(session)
+    return zones
+
+async def get_global_statistics(
+    session: AsyncSession,
+) -> schemas.GlobalStatistics:
+    _, totals = await get_statistics(session)
+    return totals
 
 async def check_zone_capacity(
     session: AsyncSession,
@@ -707,55 +1505,47 @@ async def check_zone_capacity(
     start_time: datetime,
     end_time: datetime,
 ) -> bool:
-    stmt = select(func.count(models.Place.id)).where(
-        and_(
-            models.Place.zone_id == zone_id,
-            models.Place.is_active.is_(True),
-        )
-    )
-    result = await session.execute(stmt)
-    max_capacity = result.scalar() or 0
+    snapshot = await get_snapshot(session)
+    max_capacity = snapshot.active_place_count(zone_id)
     if max_capacity == 0:
         return False
-    stmt = (
-        select(models.Booking)
-        .join(models.Slot, models.Slot.id == models.Booking.slot_id)
-        .join(models.Place, models.Place.id == models.Slot.place_id)
-        .where(
-            and_(
-                models.Place.zone_id == zone_id,
-                models.Booking.status == "active",
-                models.Booking.start_time < end_time,
-                models.Booking.end_time > start_time,
-            )
+    stmt = select(models.Booking.start_time, models.Booking.end_time).where(
+        and_(
+            models.Booking.zone_id == zone_id,
+            models.Booking.status == "active",
+            models.Booking.start_time < end_time,
+            models.Booking.end_time > start_time,
         )
     )
     result = await session.execute(stmt)
-    overlapping_bookings = list(result.scalars().all())
-    time_points = []
-    time_points.append(start_time)
-    time_points.append(end_time)
-    for booking in overlapping_bookings:
-        if booking.start_time and booking.end_time:
-            time_points.append(booking.start_time)
-            time_points.append(booking.end_time)
-    # --- Исправление ключевой ошибки: привести все точки к aware-UTC ---
-    time_points = [
-        dt.replace(tzinfo=timezone.utc) if dt.tzinfo is None else dt
-        for dt in time_points
-    ]
-    time_points = sorted(set(time_points))
-    # --------------------------------------------------------------
-    for check_time in time_points:
+    return _fits_capacity(list(result.all()), start_time, end_time, max_capacity)
+
+
+def _fits_capacity(
+    intervals: List[tuple],
+    start_time: datetime,
+    end_time: datetime,
+    max_capacity: int,
+) -> bool:
+    """
+    Проверяет, что новый интервал [start_time, end_time) вместе с уже занятыми
+    интервалами ни в одной точке не превышает max_capacity.
+    """
+    # Интервалы из БД уже naive UTC (models.UTCDateTime) — приводим только
+    # границы нового интервала, а не каждую бронь
+    start_time = naive_utc(start_time)
+    end_time = naive_utc(end_time)
+    time_points = {start_time, end_time}
+    for s, e in intervals:
+        time_points.add(s)
+        time_points.add(e)
+    for check_time in sorted(time_points):
         if check_time < start_time or check_time >= end_time:
             continue
-        active_count = 0
-        for booking in overlapping_bookings:
-            if (booking.start_time and booking.end_time and
-                booking.start_time <= check_time < booking.end_time):
+        active_count = 1
+        for s, e in intervals:
+            if s <= check_time < e:
                 active_count += 1
-        if start_time <= check_time < end_time:
-            active_count += 1
         if active_count > max_capacity:
             return False
-    return True
\ No newline at end of file
+    return True
@@ -0,0 +1,93 @@
+# services/booking-service/app/dashboard.py
+"""
+Снимок статистики для админской панели (GET /admin/zones/statistics,
+GET /admin/statistics).
+
+Панель опрашивает статистику раз в несколько секунд из каждой открытой
+вкладки, а сама статистика — агрегат по всей таблице броней. Поэтому ручки
+отдают готовый снимок из памяти процесса:
+  - фоновая задача (main.py) пересобирает его раз в STATISTICS_REFRESH_SECONDS
+    одним запросом crud.get_statistics — с реплики, если она доступна;
+  - запрос, пришедший к снимку старше STATISTICS_MAX_AGE_SECONDS (задача
+    выключена или упала, первый запрос после старта), собирает его сам;
+    одновременные такие запросы ждут одну сборку.
+Число агрегатов в БД не зависит от числа открытых панелей.
+STATISTICS_REFRESH_SECONDS = 0 отключает снимок: статистика считается на
+каждый запрос.
+"""
+from __future__ import annotations
+
+import asyncio
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from typing import List, Optional
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+import crud
+import schemas
+from config import settings
+from db import ReadSessionLocal, SessionLocal, replica_monitor
+from timezone_utils import now_utc
+
+
+@dataclass(frozen=True)
+class Statistics:
+    zones: List[schemas.ZoneStatistics]
+    totals: schemas.GlobalStatistics
+    built_at: datetime
+
+
+async def build(session: AsyncSession) -> Statistics:
+    zones, totals = await crud.get_statistics(session)
+    return Statistics(zones=zones, totals=totals, built_at=now_utc())
+
+
+class Dashboard:
+    def __init__(self):
+        self._statistics: Optional[Statistics] = None
+        self._built_at = 0.0
+        self._lock = asyncio.Lock()
+        self.builds = 0
+
+    def invalidate(self) -> None:
+        self._statistics = None
+
+    def _fresh(self) -> bool:
+        return (
+            self._statistics is not None
+            and time.monotonic() - self._built_at < settings.STATISTICS_MAX_AGE_SECONDS
+        )
+
+    async def refresh(self, session: AsyncSession) -> Statistics:
+        statistics = await build(session)
+        self.builds += 1
+        self._statistics = statistics
+        self._built_at = time.monotonic()
+        return statistics
+
+    async def get(self, session: AsyncSession) -> Statistics:
+        if settings.STATISTICS_REFRESH_SECONDS <= 0:
+            return await build(session)
+        if self._fresh():
+            return self._statistics
+        async with self._lock:
+            if self._fresh():
+                return self._statistics
+            return await self.refresh(session)
+
+
+dashboard = Dashboard()
+
+
+async def run_refresher() -> None:
+    """Фоновая задача: пересборка снимка раз в STATISTICS_REFRESH_SECONDS."""
+    while True:
+        try:
+            use_replica = ReadSessionLocal is not None and await replica_monitor.usable()
+            async with (ReadSessionLocal if use_replica else SessionLocal)() as session:
+                await dashboard.refresh(session)
+        except Exception as e:
+            print(f"Dashboard statistics refresh failed: {e}")
+        await asyncio.sleep(settings.STATISTICS_REFRESH_SECONDS)
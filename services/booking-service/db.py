@@ -1,7 +1,26 @@
 # services/booking-service/app/db.py
-from typing import AsyncGenerator
+"""
+Подключения к БД.
 
+Все записи идут в основную базу (DATABASE_URL). Если задан READ_DATABASE_URL,
+тяжёлые читающие ручки (зоны, места, слоты, история, статистика) получают
+сессию реплики через get_read_session, кроме случаев:
+  - пользователь сам писал в последние READ_YOUR_WRITES_SECONDS секунд —
+    он должен увидеть свои изменения, читаем с основной (запись отмечается
+    при commit сессии небезопасного запроса, до отправки ответа);
+  - реплика недоступна или отстаёт больше чем на REPLICA_MAX_LAG_SECONDS —
+    проверка кэшируется на REPLICA_HEALTH_CHECK_SECONDS.
+Запоминание записей ведётся в памяти процесса: каждый экземпляр сервиса
+знает только о записях, прошедших через него.
+"""
+import asyncio
+import time
+from typing import AsyncGenerator, Dict, Optional
+
+from fastapi import Depends, Request
+from sqlalchemy import event, text
 from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import Session
 
 from config import settings
 
@@ -17,7 +36,152 @@ SessionLocal = async_sessionmaker(
     class_=AsyncSession,
 )
 
+read_engine = (
+    create_async_engine(settings.READ_DATABASE_URL, echo=False, future=True)
+    if settings.READ_DATABASE_URL
+    else None
+)
+
+ReadSessionLocal = (
+    async_sessionmaker(
+        bind=read_engine,
+        expire_on_commit=False,
+        class_=AsyncSession,
+        info={"read_only": True},
+    )
+    if read_engine is not None
+    else None
+)
+
+SAFE_METHODS = {"GET", "HEAD", "OPTIONS"}
+# session.info: пользователь, чьи commit в этой сессии помечаются в recent_writers
+WRITER_KEY = "writer_id"
+
+# Отставание реплики: 0, если всё полученное WAL уже применено
+REPLICA_LAG_SQL = text(
+    "SELECT CASE WHEN NOT pg_is_in_recovery() "
+    "OR pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+    "ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) END"
+)
+
+
+class RecentWriters:
+    """Пользователи, писавшие в последние READ_YOUR_WRITES_SECONDS секунд."""
+
+    def __init__(self):
+        self._last_write: Dict[int, float] = {}
+
+    def mark(self, user_id: int) -> None:
+        now = time.monotonic()
+        self._last_write[user_id] = now
+        if len(self._last_write) > settings.READ_YOUR_WRITES_MAX_USERS:
+            horizon = now - settings.READ_YOUR_WRITES_SECONDS
+            self._last_write = {
+                uid: at for uid, at in self._last_write.items() if at > horizon
+            }
+
+    def recent(self, user_id: int) -> bool:
+        at = self._last_write.get(user_id)
+        return at is not None and time.monotonic() - at < settings.READ_YOUR_WRITES_SECONDS
+
+
+class ReplicaMonitor:
+    """Кэшированная проверка доступности и отставания реплики."""
+
+    def __init__(self, read_engine):
+        self.engine = read_engine
+        self._healthy = False
+        self._checked_at: Optional[float] = None
+        self._lock = asyncio.Lock()
+        self.lag: Optional[float] = None
 
-async def get_session() -> AsyncGenerator[AsyncSession, None]:
+    async def _check(self) -> bool:
+        try:
+            async with self.engine.connect() as conn:
+                if conn.dialect.name != "postgresql":
+                    await conn.execute(text("SELECT 1"))
+                    self.lag = 0.0
+                    return True
+                self.lag = float((await conn.execute(REPLICA_LAG_SQL)).scalar() or 0)
+        except Exception as e:
+            print(f"Read replica unavailable: {e}")
+            self.lag = None
+            return False
+        return self.lag <= settings.REPLICA_MAX_LAG_SECONDS
+
+    def _fresh(self) -> bool:
+        return (
+            self._checked_at is not None
+            and time.monotonic() - self._checked_at < settings.REPLICA_HEALTH_CHECK_SECONDS
+        )
+
+    async def usable(self) -> bool:
+        if self.engine is None:
+            return False
+        if self._fresh():
+            return self._healthy
+        async with self._lock:
+            if not self._fresh():
+                try:
+                    self._healthy = await asyncio.wait_for(
+                        self._check(), timeout=settings.REPLICA_HEALTH_CHECK_TIMEOUT_SECONDS
+                    )
+                except asyncio.TimeoutError:
+                    print("Read replica health check timed out")
+                    self._healthy = False
+                self._checked_at = time.monotonic()
+        return self._healthy
+
+
+recent_writers = RecentWriters()
+replica_monitor = ReplicaMonitor(read_engine)
+
+
+def _user_id(request: Request) -> Optional[int]:
+    try:
+        return int(request.headers["X-User-Id"])
+    except (KeyError, ValueError):
+        return None
+
+
+async def get_session(request: Request) -> AsyncGenerator[AsyncSession, None]:
     async with SessionLocal() as session:
+        user_id = _user_id(request)
+        if request.method not in SAFE_METHODS and user_id is not None:
+            session.info[WRITER_KEY] = user_id
+        yield session
+
+
+@event.listens_for(Session, "after_commit")
+def _mark_writer(session):
+    # Пометка — сразу после commit, ещё до ответа: teardown yield-зависимостей
+    # FastAPI выполняет уже после отправки ответа, и следующий GET клиента
+    # успел бы уйти на отстающую реплику
+    user_id = session.info.get(WRITER_KEY)
+    if user_id is not None:
+        recent_writers.mark(user_id)
+
+
+async def use_replica(request: Request) -> bool:
+    if ReadSessionLocal is None:
+        return False
+    user_id = _user_id(request)
+    if user_id is not None and recent_writers.recent(user_id):
+        return False
+    return await replica_monitor.usable()
+
+
+async def get_read_session(
+    request: Request,
+    primary: AsyncSession = Depends(get_session),
+) -> AsyncGenerator[AsyncSession, None]:
+    """
+    Сессия для читающих ручек: реплика, если она есть, жива и пользователь
+    недавно не писал, иначе основная (primary — ленивая, соединение не берётся,
+    пока по ней не выполнен запрос).
+    """
+    if not await use_replica(request):
+        yield primary
+        return
+    async with ReadSessionLocal() as session:
         yield session
@@ -0,0 +1,55 @@
+# services/booking-service/app/fastjson.py
+"""
+Быстрая сериализация списков в JSON.
+
+Обычный путь: crud возвращает ORM-объекты или Pydantic-модели, FastAPI
+валидирует каждую строку через response_model (from_attributes) и только
+потом сериализует. Для длинных списков (места, слоты, история) это основная
+часть времени ответа.
+
+Быстрый путь (settings.FAST_JSON_RESPONSES): crud отдаёт строки запроса как
+словари ровно с полями схемы ответа, а FastJSONResponse превращает их в байты
+одним вызовом orjson. Ручка возвращает Response, поэтому FastAPI валидацию
+пропускает, а response_model остаётся в декораторе и схема OpenAPI та же.
+
+Формат совпадает со схемами (schemas.UTCDatetime): datetime в ISO 8601 с
+суффиксом "Z"; naive datetime — а атрибуты моделей naive UTC — считается UTC.
+time — как "HH:MM:SS". Без orjson работает запасной вариант на стандартном json.
+"""
+import json
+from datetime import date, datetime, time, timedelta
+from typing import Any
+
+from fastapi.responses import Response
+
+from timezone_utils import utc_iso
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson необязателен
+    orjson = None
+
+
+def _default(value: Any) -> Any:
+    if isinstance(value, datetime):
+        if value.tzinfo is None or value.utcoffset() == timedelta(0):
+            return utc_iso(value)
+        return value.isoformat()
+    if isinstance(value, (date, time)):
+        return value.isoformat()
+    raise TypeError(f"Тип {type(value).__name__} не сериализуется в JSON")
+
+
+def dumps(content: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(content, option=orjson.OPT_NAIVE_UTC | orjson.OPT_UTC_Z)
+    return json.dumps(
+        content, default=_default, ensure_ascii=False, separators=(",", ":")
+    ).encode("utf-8")
+
+
+class FastJSONResponse(Response):
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
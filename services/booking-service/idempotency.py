@@ -0,0 +1,254 @@
+# services/booking-service/app/idempotency.py
+"""
+Заголовок Idempotency-Key для пишущих ручек броней.
+
+Шлюз или клиент повторяет POST, не дождавшись ответа, — без ключа повтор
+снова проходит все проверки пересечений и может создать вторую бронь
+(для продления — вторую бронь в цепочке). С ключом:
+  - первая попытка занимает ключ (строка idempotency_keys в статусе
+    in_progress, INSERT ... ON CONFLICT DO NOTHING), выполняет ручку и
+    сохраняет ответ — успешный или 4xx. Успешный ответ пишется той же
+    транзакцией, что и бронь: crud фиксирует изменения через commit() этого
+    модуля, который под ключом делает только flush. Процесс, упавший посреди
+    ручки, не оставит записанную бронь при ключе in_progress;
+  - повтор с тем же ключом получает сохранённый ответ с заголовком
+    Idempotent-Replayed: true, не трогая таблицы броней;
+  - повтор, пришедший во время первой попытки, ждёт её результат
+    (опрос раз в IDEMPOTENCY_POLL_SECONDS, не дольше IDEMPOTENCY_WAIT_SECONDS,
+    затем 409);
+  - тот же ключ с другим запросом (путь или тело) — 422.
+Ключ действует в пределах пользователя и хранится IDEMPOTENCY_TTL_SECONDS.
+5xx и исключения ответа не сохраняют: ключ освобождается, повтор выполнится
+заново. Попытка, не завершившаяся за IDEMPOTENCY_LOCK_SECONDS (упал процесс),
+считается брошенной, и ключ может занять повтор.
+
+Ключи хранятся в БД, поэтому повтор, попавший на другой экземпляр сервиса,
+тоже получает сохранённый ответ.
+"""
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import time
+from datetime import timedelta
+from typing import Any, Awaitable, Callable, Optional, Type
+
+from fastapi import Header, HTTPException, status
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+from sqlalchemy import and_, delete, or_, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+
+import models
+from config import settings
+from db import SessionLocal
+from timezone_utils import now_utc
+
+HEADER = "Idempotency-Key"
+REPLAYED_HEADER = "Idempotent-Replayed"
+MAX_KEY_LENGTH = 255
+
+IN_PROGRESS = "in_progress"
+COMPLETED = "completed"
+
+# session.info: commit пишущей ручки отложен до сохранения ответа (см. commit)
+DEFERRED_COMMIT = "idempotency_deferred_commit"
+
+
+async def commit(session: AsyncSession) -> None:
+    """
+    Commit пишущих функций crud. Внутри run() с ключом — только flush:
+    изменения фиксирует run() одним commit вместе с сохранённым ответом.
+    """
+    if session.info.get(DEFERRED_COMMIT):
+        await session.flush()
+    else:
+        await session.commit()
+
+
+async def idempotency_key(
+    key: Optional[str] = Header(default=None, alias=HEADER),
+) -> Optional[str]:
+    if key is not None and not 0 < len(key) <= MAX_KEY_LENGTH:
+        raise HTTPException(
+            status.HTTP_400_BAD_REQUEST,
+            f"{HEADER}: от 1 до {MAX_KEY_LENGTH} символов",
+        )
+    return key
+
+
+def fingerprint(path: str, payload: Any) -> str:
+    """sha256 пути и тела запроса: ключ нельзя переиспользовать для другого запроса."""
+    body = json.dumps(payload, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(f"{path}\n{body}".encode("utf-8")).hexdigest()
+
+
+def _insert(session: AsyncSession):
+    if session.bind.dialect.name == "sqlite":
+        return sqlite.insert(models.IdempotencyKey)
+    return postgresql.insert(models.IdempotencyKey)
+
+
+def _key_filter(user_id: int, key: str):
+    return and_(
+        models.IdempotencyKey.user_id == user_id,
+        models.IdempotencyKey.key == key,
+    )
+
+
+async def _claim(session: AsyncSession, user_id: int, key: str, request_fingerprint: str) -> bool:
+    """True — ключ занят этой попыткой."""
+    now = now_utc()
+    # Просроченный ответ или брошенная попытка ключ не держат
+    await session.execute(
+        delete(models.IdempotencyKey).where(
+            _key_filter(user_id, key),
+            or_(
+                models.IdempotencyKey.expires_at <= now,
+                and_(
+                    models.IdempotencyKey.status == IN_PROGRESS,
+                    models.IdempotencyKey.created_at
+                    <= now - timedelta(seconds=settings.IDEMPOTENCY_LOCK_SECONDS),
+                ),
+            ),
+        )
+    )
+    result = await session.execute(
+        _insert(session)
+        .values(
+            user_id=user_id,
+            key=key,
+            fingerprint=request_fingerprint,
+            status=IN_PROGRESS,
+            created_at=now,
+            expires_at=now + timedelta(seconds=settings.IDEMPOTENCY_TTL_SECONDS),
+        )
+        .on_conflict_do_nothing(index_elements=["user_id", "key"])
+    )
+    # Коммит сразу: повторы на других соединениях должны видеть занятый ключ
+    await session.commit()
+    return result.rowcount == 1
+
+
+async def _load(session: AsyncSession, user_id: int, key: str):
+    row = (await session.execute(
+        select(
+            models.IdempotencyKey.fingerprint,
+            models.IdempotencyKey.status,
+            models.IdempotencyKey.response_status,
+            models.IdempotencyKey.response_body,
+        ).where(_key_filter(user_id, key))
+    )).first()
+    # Не держим транзакцию открытой, пока ждём первую попытку; commit,
+    # а не rollback — объекты сессии не истекают
+    await session.commit()
+    return row
+
+
+async def _complete(
+    session: AsyncSession, user_id: int, key: str, response_status: int, body: Any
+) -> None:
+    await session.execute(
+        update(models.IdempotencyKey)
+        .where(_key_filter(user_id, key))
+        .values(status=COMPLETED, response_status=response_status, response_body=body)
+    )
+    await session.commit()
+
+
+async def _release(session: AsyncSession, user_id: int, key: str) -> None:
+    await session.rollback()
+    await session.execute(delete(models.IdempotencyKey).where(_key_filter(user_id, key)))
+    await session.commit()
+
+
+def _replay(row) -> JSONResponse:
+    return JSONResponse(
+        row.response_body,
+        status_code=row.response_status,
+        headers={REPLAYED_HEADER: "true"},
+    )
+
+
+async def run(
+    session: AsyncSession,
+    user_id: int,
+    key: Optional[str],
+    path: str,
+    payload: Any,
+    handler: Callable[[], Awaitable[Any]],
+    response_model: Type[BaseModel],
+    status_code: int = status.HTTP_200_OK,
+):
+    """
+    Выполняет handler не больше одного раза на ключ. Без ключа — просто
+    вызывает handler и возвращает его результат.
+    """
+    if key is None:
+        return await handler()
+
+    request_fingerprint = fingerprint(path, payload)
+    deadline = time.monotonic() + settings.IDEMPOTENCY_WAIT_SECONDS
+    while not await _claim(session, user_id, key, request_fingerprint):
+        row = await _load(session, user_id, key)
+        if row is None:
+            # Первая попытка упала и освободила ключ — занимаем сами
+            continue
+        if row.fingerprint != request_fingerprint:
+            raise HTTPException(
+                422,
+                f"{HEADER} уже использован для другого запроса",
+            )
+        if row.status == COMPLETED:
+            return _replay(row)
+        if time.monotonic() >= deadline:
+            raise HTTPException(
+                status.HTTP_409_CONFLICT,
+                f"Запрос с этим {HEADER} ещё выполняется",
+            )
+        await asyncio.sleep(settings.IDEMPOTENCY_POLL_SECONDS)
+
+    session.info[DEFERRED_COMMIT] = True
+    try:
+        result = await handler()
+        body = response_model.model_validate(result, from_attributes=True).model_dump(mode="json")
+    except HTTPException as e:
+        session.info.pop(DEFERRED_COMMIT, None)
+        if e.status_code >= 500:
+            await _release(session, user_id, key)
+            raise
+        # Ответ 4xx (конфликт, ошибка продления) повтор получает тот же
+        await session.rollback()
+        await _complete(session, user_id, key, e.status_code, {"detail": e.detail})
+        raise
+    except Exception:
+        session.info.pop(DEFERRED_COMMIT, None)
+        # Незафиксированная бронь откатывается вместе с освобождением ключа
+        await _release(session, user_id, key)
+        raise
+
+    session.info.pop(DEFERRED_COMMIT, None)
+    # Один commit: бронь и сохранённый ответ
+    await _complete(session, user_id, key, status_code, body)
+    return JSONResponse(body, status_code=status_code)
+
+
+async def purge_expired(session: AsyncSession) -> int:
+    result = await session.execute(
+        delete(models.IdempotencyKey).where(models.IdempotencyKey.expires_at <= now_utc())
+    )
+    await session.commit()
+    return result.rowcount or 0
+
+
+async def run_cleanup() -> None:
+    """Фоновая задача: удаление просроченных ключей раз в IDEMPOTENCY_CLEANUP_SECONDS."""
+    while True:
+        try:
+            async with SessionLocal() as session:
+                await purge_expired(session)
+        except Exception as e:
+            print(f"Idempotency key cleanup failed: {e}")
+        await asyncio.sleep(settings.IDEMPOTENCY_CLEANUP_SECONDS)
@@ -0,0 +1,160 @@
+# services/booking-service/app/live.py
+"""
+Живые изменения зон для GET /zones/stream (Server-Sent Events).
+
+Пишущие функции crud кладут события в сессию (emit / emit_booking) рядом с
+outbox.enqueue; после успешного commit они публикуются в hub, при откате —
+отбрасываются. Подписчик (одно SSE-соединение) получает снимок зон при
+подключении, дальше только дельты:
+  zone_opened / zone_closed — зона открыта или закрыта (в т.ч. удалена);
+  slot_taken / slot_released — бронь создана или отменена;
+  occupancy_changed — бронь, идущая прямо сейчас, изменила current_occupancy
+                      зоны на delta.
+Смена occupancy со временем (бронь началась или закончилась без записи в БД)
+не публикуется — клиент видит интервалы в slot_* событиях.
+
+У каждого подписчика своя ограниченная очередь (LIVE_QUEUE_SIZE): медленный
+клиент не тормозит ни запись, ни остальных — при переполнении его очередь
+очищается и вместо пропущенных дельт он получает одно событие resync
+(перечитать GET /zones). Пока событий нет, раз в LIVE_HEARTBEAT_SECONDS
+уходит комментарий-пинг, чтобы прокси не закрывали соединение.
+
+Hub живёт в памяти процесса: подписчик видит записи, прошедшие через тот же
+экземпляр сервиса. Простаивающие подписчики не держат соединений с БД.
+"""
+from __future__ import annotations
+
+import asyncio
+import itertools
+from datetime import datetime
+from typing import AsyncIterator, Callable, Optional, Set, Union
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+import fastjson
+from config import settings
+from timezone_utils import naive_utc, now_utc
+
+ZONE_OPENED = "zone_opened"
+ZONE_CLOSED = "zone_closed"
+SLOT_TAKEN = "slot_taken"
+SLOT_RELEASED = "slot_released"
+OCCUPANCY_CHANGED = "occupancy_changed"
+SNAPSHOT = "snapshot"
+RESYNC = "resync"
+
+PENDING_KEY = "live_events"
+
+
+class Subscription:
+    def __init__(self, maxsize: int):
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=maxsize)
+        self.dropped = 0
+
+    def push(self, item: tuple) -> None:
+        try:
+            self.queue.put_nowait(item)
+        except asyncio.QueueFull:
+            # Дельты потеряны — клиенту нужен полный снимок, а не хвост очереди
+            self.dropped += self.queue.qsize()
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait((None, RESYNC, {}))
+
+
+class Hub:
+    def __init__(self):
+        self.subscribers: Set[Subscription] = set()
+        self._ids = itertools.count(1)
+        self.published = 0
+
+    def subscribe(self) -> Optional[Subscription]:
+        """None — достигнут LIVE_MAX_SUBSCRIBERS."""
+        if len(self.subscribers) >= settings.LIVE_MAX_SUBSCRIBERS:
+            return None
+        subscription = Subscription(settings.LIVE_QUEUE_SIZE)
+        self.subscribers.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        self.subscribers.discard(subscription)
+
+    def publish(self, event_type: str, data: dict) -> None:
+        item = (next(self._ids), event_type, data)
+        self.published += 1
+        for subscription in self.subscribers:
+            subscription.push(item)
+
+    def stats(self) -> dict:
+        return {
+            "subscribers": len(self.subscribers),
+            "published": self.published,
+            "dropped": sum(s.dropped for s in self.subscribers),
+        }
+
+
+hub = Hub()
+
+
+def emit(session, event_type: str, data: Union[dict, Callable[[], dict]]) -> None:
+    """
+    Событие публикуется после commit сессии. data может быть функцией —
+    тогда она вызывается уже после commit, когда id новых строк известны.
+    """
+    session.info.setdefault(PENDING_KEY, []).append((event_type, data))
+
+
+def emit_booking(session, event_type: str, booking, place_id: int) -> None:
+    """slot_taken / slot_released по брони; occupancy_changed, если бронь идёт сейчас."""
+    delta = 1 if event_type == SLOT_TAKEN else -1
+
+    def payload() -> dict:
+        return {
+            "zone_id": booking.zone_id,
+            "place_id": place_id,
+            "slot_id": booking.slot_id,
+            "start_time": booking.start_time,
+            "end_time": booking.end_time,
+        }
+
+    emit(session, event_type, payload)
+    if is_current(booking.start_time, booking.end_time):
+        emit(session, OCCUPANCY_CHANGED, lambda: {"zone_id": booking.zone_id, "delta": delta})
+
+
+def is_current(start_time: Optional[datetime], end_time: Optional[datetime]) -> bool:
+    if start_time is None or end_time is None:
+        return False
+    return naive_utc(start_time) <= now_utc() < naive_utc(end_time)
+
+
+@event.listens_for(Session, "after_commit")
+def _publish_after_commit(session):
+    for event_type, data in session.info.pop(PENDING_KEY, ()):
+        hub.publish(event_type, data() if callable(data) else data)
+
+
+@event.listens_for(Session, "after_rollback")
+def _drop_after_rollback(session):
+    session.info.pop(PENDING_KEY, None)
+
+
+def format_event(event_type: str, data, event_id: Optional[int] = None) -> bytes:
+    head = f"id: {event_id}\n" if event_id is not None else ""
+    return (
+        f"{head}event: {event_type}\n".encode()
+        + b"data: " + fastjson.dumps(data) + b"\n\n"
+    )
+
+
+async def stream(subscription: Subscription) -> AsyncIterator[bytes]:
+    while True:
+        try:
+            event_id, event_type, data = await asyncio.wait_for(
+                subscription.queue.get(), timeout=settings.LIVE_HEARTBEAT_SECONDS
+            )
+        except asyncio.TimeoutError:
+            yield b": ping\n\n"
+            continue
+        yield format_event(event_type, data, event_id)
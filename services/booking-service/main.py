@@ -1,26 +1,55 @@
 # services/booking-service/app/main.py
+import asyncio
+
 from fastapi import FastAPI
 from contextlib import asynccontextmanager
 
 from routes import router as user_router
 from admin import router as admin_router
 
-from db import engine
-from models import Base
+import analytics
+import clients
+import dashboard
+import idempotency
+import migrator
+from archive import run_archiver
+from catalogue import catalogue
+from outbox import run_dispatcher
+from config import settings
+from db import SessionLocal, engine
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    # ----------------------------
-    # ВРЕМЕННОЕ РЕШЕНИЕ:
-    # создаём таблицы при старте сервиса.
-    # Потом это будет заменено Alembic миграциями.
-    # ----------------------------
-    async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
+    # Схема — версионные миграции; если всё применено, это один SELECT
+    if settings.MIGRATE_ON_STARTUP:
+        await migrator.migrate(engine)
+
+    # Каталог зон и мест загружается сразу, а не первым запросом
+    async with SessionLocal() as session:
+        await catalogue.get(session)
+
+    # Один пул соединений на соседний сервис на всё время жизни приложения
+    clients.configure()
+
+    tasks = []
+    if settings.ARCHIVE_INTERVAL_SECONDS > 0:
+        tasks.append(asyncio.create_task(run_archiver()))
+    if settings.OUTBOX_POLL_SECONDS > 0:
+        tasks.append(asyncio.create_task(run_dispatcher()))
+    if settings.IDEMPOTENCY_CLEANUP_SECONDS > 0:
+        tasks.append(asyncio.create_task(idempotency.run_cleanup()))
+    if settings.STATISTICS_REFRESH_SECONDS > 0:
+        tasks.append(asyncio.create_task(dashboard.run_refresher()))
+    if settings.ROLLUP_INTERVAL_SECONDS > 0:
+        tasks.append(asyncio.create_task(analytics.run_rollups()))
 
     yield  # ← запуск приложения
 
+    for task in tasks:
+        task.cancel()
+    await clients.registry.aclose()
+
 
 app = FastAPI(
     title="Booking Service",
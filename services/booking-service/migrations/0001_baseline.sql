@@ -0,0 +1,123 @@
+-- Миграция 0001: базовая схема booking-service
+--
+-- Совпадает с models.py на момент перехода с create_all на версионные
+-- миграции (и с services/database/migration_add_*.sql, применёнными вручную).
+-- Все команды IF NOT EXISTS: на базе, созданной раньше через create_all,
+-- миграция ничего не меняет и только записывается в schema_migrations.
+
+CREATE TABLE IF NOT EXISTS zones (
+    id SERIAL PRIMARY KEY,
+    name VARCHAR(255) NOT NULL,
+    address VARCHAR(255),
+    is_active BOOLEAN NOT NULL,
+    closure_reason TEXT,
+    closed_until TIMESTAMP WITH TIME ZONE,
+    opens_at TIME WITHOUT TIME ZONE DEFAULT '08:00' NOT NULL,
+    closes_at TIME WITHOUT TIME ZONE DEFAULT '22:00' NOT NULL,
+    slot_minutes INTEGER DEFAULT 60 NOT NULL,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW() NOT NULL,
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW() NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_zones_id ON zones (id);
+
+CREATE TABLE IF NOT EXISTS places (
+    id SERIAL PRIMARY KEY,
+    zone_id INTEGER NOT NULL REFERENCES zones (id) ON DELETE CASCADE,
+    name VARCHAR(255) NOT NULL,
+    is_active BOOLEAN NOT NULL,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW() NOT NULL,
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW() NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_places_id ON places (id);
+CREATE INDEX IF NOT EXISTS ix_places_zone_id ON places (zone_id);
+
+CREATE TABLE IF NOT EXISTS slots (
+    id SERIAL PRIMARY KEY,
+    place_id INTEGER NOT NULL REFERENCES places (id) ON DELETE CASCADE,
+    start_time TIMESTAMP WITH TIME ZONE NOT NULL,
+    end_time TIMESTAMP WITH TIME ZONE NOT NULL,
+    is_available BOOLEAN NOT NULL,
+    CONSTRAINT uq_place_time_interval UNIQUE (place_id, start_time, end_time)
+);
+CREATE INDEX IF NOT EXISTS ix_slots_place_id ON slots (place_id);
+CREATE INDEX IF NOT EXISTS ix_slot_place_start ON slots (place_id, start_time);
+CREATE INDEX IF NOT EXISTS ix_slot_available_end ON slots (end_time) WHERE is_available;
+
+CREATE TABLE IF NOT EXISTS bookings (
+    id SERIAL PRIMARY KEY,
+    user_id INTEGER NOT NULL,
+    slot_id INTEGER NOT NULL REFERENCES slots (id) ON DELETE CASCADE,
+    zone_id INTEGER REFERENCES zones (id) ON DELETE CASCADE,
+    zone_name VARCHAR(255),
+    zone_address VARCHAR(255),
+    start_time TIMESTAMP WITH TIME ZONE,
+    end_time TIMESTAMP WITH TIME ZONE,
+    status VARCHAR(32) NOT NULL,
+    cancellation_reason TEXT,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW() NOT NULL,
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW() NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_bookings_user_id ON bookings (user_id);
+CREATE INDEX IF NOT EXISTS ix_bookings_slot_id ON bookings (slot_id);
+CREATE INDEX IF NOT EXISTS ix_bookings_status ON bookings (status);
+CREATE INDEX IF NOT EXISTS ix_booking_user_active_time
+    ON bookings (user_id, start_time, end_time)
+    WHERE status = 'active';
+CREATE INDEX IF NOT EXISTS ix_booking_active_time
+    ON bookings (start_time, end_time)
+    INCLUDE (slot_id, user_id)
+    WHERE status = 'active';
+CREATE INDEX IF NOT EXISTS ix_booking_user_created
+    ON bookings (user_id, created_at, id);
+CREATE INDEX IF NOT EXISTS ix_booking_zone_status_time
+    ON bookings (zone_id, status, start_time, end_time);
+
+CREATE TABLE IF NOT EXISTS bookings_archive (
+    id INTEGER NOT NULL,
+    start_time TIMESTAMP WITH TIME ZONE NOT NULL,
+    end_time TIMESTAMP WITH TIME ZONE,
+    user_id INTEGER NOT NULL,
+    slot_id INTEGER NOT NULL,
+    zone_id INTEGER,
+    zone_name VARCHAR(255),
+    zone_address VARCHAR(255),
+    status VARCHAR(32) NOT NULL,
+    cancellation_reason TEXT,
+    created_at TIMESTAMP WITH TIME ZONE NOT NULL,
+    updated_at TIMESTAMP WITH TIME ZONE NOT NULL,
+    archived_at TIMESTAMP WITH TIME ZONE DEFAULT NOW() NOT NULL,
+    PRIMARY KEY (id, start_time)
+) PARTITION BY RANGE (start_time);
+CREATE TABLE IF NOT EXISTS bookings_archive_default
+    PARTITION OF bookings_archive DEFAULT;
+CREATE INDEX IF NOT EXISTS ix_booking_archive_user_created
+    ON bookings_archive (user_id, created_at);
+
+CREATE TABLE IF NOT EXISTS zone_closures (
+    id SERIAL PRIMARY KEY,
+    zone_id INTEGER NOT NULL REFERENCES zones (id) ON DELETE CASCADE,
+    reason TEXT NOT NULL,
+    from_time TIMESTAMP WITH TIME ZONE NOT NULL,
+    to_time TIMESTAMP WITH TIME ZONE NOT NULL,
+    affected_bookings INTEGER NOT NULL,
+    affected_users INTEGER NOT NULL,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW() NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_zone_closures_zone_id ON zone_closures (zone_id);
+
+CREATE TABLE IF NOT EXISTS outbox (
+    id SERIAL PRIMARY KEY,
+    event_type VARCHAR(64) NOT NULL,
+    payload JSON NOT NULL,
+    zone_closure_id INTEGER REFERENCES zone_closures (id) ON DELETE SET NULL,
+    status VARCHAR(32) NOT NULL,
+    attempts INTEGER NOT NULL,
+    next_attempt_at TIMESTAMP WITH TIME ZONE DEFAULT NOW() NOT NULL,
+    last_error TEXT,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW() NOT NULL,
+    delivered_at TIMESTAMP WITH TIME ZONE
+);
+CREATE INDEX IF NOT EXISTS ix_outbox_pending
+    ON outbox (next_attempt_at, id)
+    WHERE status = 'pending';
+CREATE INDEX IF NOT EXISTS ix_outbox_zone_closure_id ON outbox (zone_closure_id);
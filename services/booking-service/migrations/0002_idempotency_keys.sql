@@ -0,0 +1,18 @@
+-- Миграция 0002: ответы на запросы с Idempotency-Key (idempotency.py)
+--
+-- Повтор POST /bookings, /bookings/by-time, /bookings/{id}/extend с тем же
+-- ключом получает сохранённый ответ, не выполняя бронирование снова.
+-- Строки старше expires_at удаляет фоновая очистка booking-service.
+
+CREATE TABLE IF NOT EXISTS idempotency_keys (
+    user_id INTEGER NOT NULL,
+    key VARCHAR(255) NOT NULL,
+    fingerprint VARCHAR(64) NOT NULL,
+    status VARCHAR(32) NOT NULL,
+    response_status INTEGER,
+    response_body JSON,
+    created_at TIMESTAMP WITH TIME ZONE NOT NULL,
+    expires_at TIMESTAMP WITH TIME ZONE NOT NULL,
+    PRIMARY KEY (user_id, key)
+);
+CREATE INDEX IF NOT EXISTS ix_idempotency_keys_expires_at ON idempotency_keys (expires_at);
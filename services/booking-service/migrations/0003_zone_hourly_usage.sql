@@ -0,0 +1,26 @@
+-- migrate:no-transaction
+-- Миграция 0003: почасовая свёртка загрузки зон (analytics.py)
+--
+-- zone_hourly_usage пересчитывается фоновой задачей booking-service по броням,
+-- изменённым после водяного знака из rollup_watermarks; поиск изменённых
+-- броней идёт по ix_booking_updated. Индекс на bookings строится
+-- CONCURRENTLY, поэтому миграция выполняется вне транзакции; все команды
+-- IF NOT EXISTS, и прерванный запуск можно повторить.
+
+CREATE TABLE IF NOT EXISTS zone_hourly_usage (
+    zone_id INTEGER NOT NULL REFERENCES zones (id) ON DELETE CASCADE,
+    hour TIMESTAMP WITH TIME ZONE NOT NULL,
+    booked_minutes INTEGER NOT NULL,
+    bookings INTEGER NOT NULL,
+    cancellations INTEGER NOT NULL,
+    PRIMARY KEY (zone_id, hour)
+);
+CREATE INDEX IF NOT EXISTS ix_zone_hourly_usage_hour ON zone_hourly_usage (hour);
+
+CREATE TABLE IF NOT EXISTS rollup_watermarks (
+    name VARCHAR(64) PRIMARY KEY,
+    updated_at TIMESTAMP WITH TIME ZONE NOT NULL,
+    booking_id INTEGER NOT NULL
+);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_booking_updated ON bookings (updated_at, id);
@@ -0,0 +1,7 @@
+-- Миграция 0004: каналы доставки событий outbox (outbox.py)
+--
+-- Email и push одного события доставляются независимо: уже отправленные
+-- каналы сохраняются в delivered_channels, и повтор события после ошибки
+-- другого канала не отправляет их снова.
+
+ALTER TABLE outbox ADD COLUMN IF NOT EXISTS delivered_channels JSON NOT NULL DEFAULT '[]';
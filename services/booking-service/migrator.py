@@ -0,0 +1,226 @@
+# services/booking-service/app/migrator.py
+"""
+Версионные миграции схемы booking-service.
+
+Миграции — файлы migrations/NNNN_name.sql, применяются по возрастанию номера.
+Применённые записываются в schema_migrations (номер, имя, sha256 файла,
+время применения), поэтому при старте сервису достаточно одного SELECT:
+если всё применено и контрольные суммы совпали — миграций нет.
+
+Если есть неприменённые миграции:
+  - берётся advisory lock, так что из нескольких одновременно стартующих
+    реплик мигрирует одна, остальные ждут и затем видят, что делать нечего.
+    Ждущие опрашивают pg_try_advisory_lock, а не висят в pg_advisory_lock:
+    CREATE INDEX CONCURRENTLY ждёт завершения всех идущих транзакций, и
+    заблокированный запрос соседней реплики дал бы взаимоблокировку;
+  - каждая миграция выполняется в своей транзакции вместе с записью в
+    schema_migrations: упавшая миграция не оставляет полусостояния и будет
+    повторена при следующем запуске;
+  - файл с первой строкой "-- migrate:no-transaction" выполняется вне
+    транзакции по одной команде (для CREATE INDEX CONCURRENTLY, который не
+    блокирует запись в большую таблицу). Команды такого файла должны быть
+    идемпотентными (IF NOT EXISTS): после сбоя файл повторяется целиком.
+    Невалидный индекс от прерванного CONCURRENTLY нужно удалить вручную.
+
+Изменённый после применения файл — ошибка запуска: схема в базе уже не
+совпадает с тем, что описано в коде. Миграции из базы, неизвестные коду
+(новая версия уже применила свои), не мешают старым репликам работать.
+
+Для SQLite (локальный запуск без Postgres) схема создаётся по models.py.
+
+Запуск вручную:
+    python migrator.py          # применить
+    python migrator.py status   # список миграций
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import hashlib
+import re
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from models import Base
+
+MIGRATIONS_DIR = Path(__file__).resolve().parent / "migrations"
+NO_TRANSACTION_MARKER = "-- migrate:no-transaction"
+# Ключ advisory lock миграций booking-service ("bkmigr")
+LOCK_KEY = 0x626B6D696772
+LOCK_POLL_SECONDS = 0.5
+
+_FILE_RE = re.compile(r"^(\d+)_(\w+)\.sql$")
+_CONCURRENTLY_RE = re.compile(r"\bCONCURRENTLY\b", re.IGNORECASE)
+
+CREATE_MIGRATIONS_TABLE = """
+CREATE TABLE IF NOT EXISTS schema_migrations (
+    version INTEGER PRIMARY KEY,
+    name VARCHAR(255) NOT NULL,
+    checksum CHAR(64) NOT NULL,
+    applied_at TIMESTAMP WITH TIME ZONE DEFAULT NOW() NOT NULL,
+    execution_ms INTEGER NOT NULL
+)
+"""
+
+
+class MigrationError(Exception):
+    pass
+
+
+@dataclass(frozen=True)
+class Migration:
+    version: int
+    name: str
+    sql: str
+    checksum: str
+    transactional: bool
+
+    def statements(self) -> List[str]:
+        """Команды файла по одной — для миграций вне транзакции."""
+        lines = [
+            line for line in self.sql.splitlines()
+            if not line.lstrip().startswith("--")
+        ]
+        return [stmt.strip() for stmt in "\n".join(lines).split(";") if stmt.strip()]
+
+
+def load_migrations(directory: Path = MIGRATIONS_DIR) -> List[Migration]:
+    migrations: Dict[int, Migration] = {}
+    for path in sorted(directory.glob("*.sql")):
+        match = _FILE_RE.match(path.name)
+        if match is None:
+            raise MigrationError(f"Имя миграции не по шаблону NNNN_name.sql: {path.name}")
+        version = int(match.group(1))
+        if version in migrations:
+            raise MigrationError(f"Два файла с номером {version}: {path.name}")
+        sql = path.read_text(encoding="utf-8").replace("\r\n", "\n")
+        transactional = not sql.lstrip().startswith(NO_TRANSACTION_MARKER)
+        if transactional and _CONCURRENTLY_RE.search(sql):
+            raise MigrationError(
+                f"{path.name}: CONCURRENTLY не работает в транзакции, "
+                f"добавьте первой строкой '{NO_TRANSACTION_MARKER}'"
+            )
+        migrations[version] = Migration(
+            version=version,
+            name=match.group(2),
+            sql=sql,
+            checksum=hashlib.sha256(sql.encode("utf-8")).hexdigest(),
+            transactional=transactional,
+        )
+    return [migrations[version] for version in sorted(migrations)]
+
+
+def pending_migrations(
+    migrations: List[Migration], applied: Dict[int, str]
+) -> List[Migration]:
+    """Неприменённые миграции; ошибка, если применённый файл изменён."""
+    for migration in migrations:
+        checksum = applied.get(migration.version)
+        if checksum is not None and checksum != migration.checksum:
+            raise MigrationError(
+                f"Миграция {migration.version:04d}_{migration.name} изменена после применения"
+            )
+    return [m for m in migrations if m.version not in applied]
+
+
+async def _applied(driver) -> Optional[Dict[int, str]]:
+    """version -> checksum; None, если таблицы миграций ещё нет."""
+    exists = await driver.fetchval("SELECT to_regclass('schema_migrations') IS NOT NULL")
+    if not exists:
+        return None
+    rows = await driver.fetch("SELECT version, checksum FROM schema_migrations")
+    return {row["version"]: row["checksum"] for row in rows}
+
+
+async def _apply(driver, migration: Migration) -> None:
+    started = time.monotonic()
+    record = (
+        "INSERT INTO schema_migrations (version, name, checksum, execution_ms) "
+        "VALUES ($1, $2, $3, $4)"
+    )
+    if migration.transactional:
+        async with driver.transaction():
+            await driver.execute(migration.sql)
+            await driver.execute(
+                record, migration.version, migration.name, migration.checksum,
+                int((time.monotonic() - started) * 1000),
+            )
+        return
+    for statement in migration.statements():
+        await driver.execute(statement)
+    await driver.execute(
+        record, migration.version, migration.name, migration.checksum,
+        int((time.monotonic() - started) * 1000),
+    )
+
+
+async def migrate(engine: AsyncEngine, directory: Path = MIGRATIONS_DIR) -> List[int]:
+    """Применяет неприменённые миграции, возвращает их номера."""
+    if engine.dialect.name != "postgresql":
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        return []
+
+    migrations = load_migrations(directory)
+    async with engine.connect() as conn:
+        # Нужен сам asyncpg: сценарии из нескольких команд и команды вне транзакции
+        driver = (await conn.get_raw_connection()).driver_connection
+
+        # Быстрый путь: один SELECT без блокировок
+        applied = await _applied(driver)
+        if applied is not None and not pending_migrations(migrations, applied):
+            return []
+
+        while not await driver.fetchval("SELECT pg_try_advisory_lock($1)", LOCK_KEY):
+            await asyncio.sleep(LOCK_POLL_SECONDS)
+        try:
+            await driver.execute(CREATE_MIGRATIONS_TABLE)
+            # Пока ждали блокировку, миграции могла применить другая реплика
+            pending = pending_migrations(migrations, await _applied(driver))
+            for migration in pending:
+                await _apply(driver, migration)
+            return [m.version for m in pending]
+        finally:
+            await driver.execute("SELECT pg_advisory_unlock($1)", LOCK_KEY)
+
+
+async def status(
+    engine: AsyncEngine, directory: Path = MIGRATIONS_DIR
+) -> List[Tuple[int, str, Optional[datetime]]]:
+    """(номер, имя, время применения или None) для каждой миграции."""
+    applied_at: Dict[int, datetime] = {}
+    async with engine.connect() as conn:
+        driver = (await conn.get_raw_connection()).driver_connection
+        if await _applied(driver) is not None:
+            rows = await driver.fetch("SELECT version, applied_at FROM schema_migrations")
+            applied_at = {row["version"]: row["applied_at"] for row in rows}
+    return [
+        (m.version, m.name, applied_at.get(m.version))
+        for m in load_migrations(directory)
+    ]
+
+
+async def _main(args: argparse.Namespace) -> None:
+    from db import engine
+
+    try:
+        if args.command == "status":
+            for version, name, applied_at in await status(engine):
+                state = applied_at.isoformat() if applied_at else "не применена"
+                print(f"{version:04d}_{name}: {state}")
+        else:
+            applied = await migrate(engine)
+            print(f"Применено миграций: {len(applied)}")
+    finally:
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Миграции схемы booking-service")
+    parser.add_argument("command", nargs="?", choices=["up", "status"], default="up")
+    asyncio.run(_main(parser.parse_args()))
@@ -1,24 +1,53 @@
-from datetime import datetime
+from datetime import datetime, time
 from sqlalchemy import (
     Boolean,
     Column,
+    DDL,
     ForeignKey,
     Integer,
+    JSON,
     String,
     Text,
     UniqueConstraint,
     Index,
     TIMESTAMP,
+    Time,
+    event,
     func,
+    select,
+    text,
 )
 from sqlalchemy.orm import declarative_base, relationship
+from sqlalchemy.types import TypeDecorator
 
 # Импорт утилиты для работы с московским временем
-from timezone_utils import now_utc
+from timezone_utils import as_utc, naive_utc, now_utc
 
 Base = declarative_base()
 
 
+class UTCDateTime(TypeDecorator):
+    """
+    TIMESTAMP WITH TIME ZONE с единым представлением в Python: naive UTC
+    (как now_utc и SQLite). Postgres отдаёт aware, API присылает и naive, и
+    aware — приводим один раз здесь, а не в каждом сравнении:
+      - при чтении значение переводится в UTC и теряет tzinfo;
+      - при присваивании атрибуту модели — то же (_normalize_utc_attribute);
+      - драйверу уходит aware UTC: asyncpg считает naive локальным временем
+        сервера, SQLite смещение отбрасывает.
+    Naive — только внутреннее представление: в ответах API время уходит со
+    смещением UTC (schemas.UTCDatetime, fastjson).
+    """
+    impl = TIMESTAMP(timezone=True)
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        return None if value is None else as_utc(value)
+
+    def process_result_value(self, value, dialect):
+        return None if value is None else naive_utc(value)
+
+
 class Zone(Base):
     __tablename__ = "zones"
 
@@ -28,11 +57,16 @@ class Zone(Base):
     is_active = Column(Boolean, default=True, nullable=False)
     
     closure_reason = Column(Text, nullable=True)
-    closed_until = Column(TIMESTAMP(timezone=True), nullable=True)
+    closed_until = Column(UTCDateTime(), nullable=True)
+
+    # Часы работы и шаг сетки слотов (slot_grid.py), время UTC
+    opens_at = Column(Time, default=time(8, 0), server_default=text("'08:00'"), nullable=False)
+    closes_at = Column(Time, default=time(22, 0), server_default=text("'22:00'"), nullable=False)
+    slot_minutes = Column(Integer, default=60, server_default=text("60"), nullable=False)
     
-    created_at = Column(TIMESTAMP(timezone=True), server_default=func.now(), nullable=False)
+    created_at = Column(UTCDateTime(), server_default=func.now(), nullable=False)
     updated_at = Column(
-        TIMESTAMP(timezone=True),
+        UTCDateTime(),
         server_default=func.now(),
         onupdate=func.now(),
         nullable=False,
@@ -56,9 +90,9 @@ class Place(Base):
     )
     name = Column(String(255), nullable=False)
     is_active = Column(Boolean, default=True, nullable=False)
-    created_at = Column(TIMESTAMP(timezone=True), server_default=func.now(), nullable=False)
+    created_at = Column(UTCDateTime(), server_default=func.now(), nullable=False)
     updated_at = Column(
-        TIMESTAMP(timezone=True),
+        UTCDateTime(),
         server_default=func.now(),
         onupdate=func.now(),
         nullable=False,
@@ -81,6 +115,12 @@ class Slot(Base):
             name="uq_place_time_interval",
         ),
         Index("ix_slot_place_start", "place_id", "start_time"),
+        Index(
+            "ix_slot_available_end",
+            "end_time",
+            postgresql_where=text("is_available"),
+            sqlite_where=text("is_available"),
+        ),
     )
 
     id = Column(Integer, primary_key=True)
@@ -90,8 +130,8 @@ class Slot(Base):
         nullable=False,
         index=True,
     )
-    start_time = Column(TIMESTAMP(timezone=True), nullable=False)
-    end_time = Column(TIMESTAMP(timezone=True), nullable=False)
+    start_time = Column(UTCDateTime(), nullable=False)
+    end_time = Column(UTCDateTime(), nullable=False)
     is_available = Column(Boolean, default=True, nullable=False)
 
     place = relationship("Place", back_populates="slots")
@@ -106,6 +146,32 @@ class Slot(Base):
 
 class Booking(Base):
     __tablename__ = "bookings"
+    __table_args__ = (
+        # Пересечения броней пользователя (check_user_booking_conflicts)
+        Index(
+            "ix_booking_user_active_time",
+            "user_id",
+            "start_time",
+            "end_time",
+            postgresql_where=text("status = 'active'"),
+            sqlite_where=text("status = 'active'"),
+        ),
+        # Вместимость зоны и статистика по активным броням во времени
+        Index(
+            "ix_booking_active_time",
+            "start_time",
+            "end_time",
+            postgresql_include=["slot_id", "user_id"],
+            postgresql_where=text("status = 'active'"),
+            sqlite_where=text("status = 'active'"),
+        ),
+        # История пользователя: keyset по (created_at, id)
+        Index("ix_booking_user_created", "user_id", "created_at", "id"),
+        # Вместимость, закрытие и статистика зоны без join через slots/places
+        Index("ix_booking_zone_status_time", "zone_id", "status", "start_time", "end_time"),
+        # Изменённые брони после водяного знака свёртки загрузки (analytics.py)
+        Index("ix_booking_updated", "updated_at", "id"),
+    )
 
     id = Column(Integer, primary_key=True)
     user_id = Column(Integer, nullable=False, index=True)
@@ -115,10 +181,16 @@ class Booking(Base):
         nullable=False,
         index=True,
     )
+    # Денормализация зоны: zone_id — для фильтрации без join, name/address — для отображения
+    zone_id = Column(
+        Integer,
+        ForeignKey("zones.id", ondelete="CASCADE"),
+        nullable=True,
+    )
     zone_name = Column(String(255), nullable=True)
     zone_address = Column(String(255), nullable=True)
-    start_time = Column(TIMESTAMP(timezone=True), nullable=True)
-    end_time = Column(TIMESTAMP(timezone=True), nullable=True)
+    start_time = Column(UTCDateTime(), nullable=True)
+    end_time = Column(UTCDateTime(), nullable=True)
     status = Column(
         String(32),
         default="active",
@@ -126,9 +198,9 @@ class Booking(Base):
         index=True,
     )
     cancellation_reason = Column(Text, nullable=True)
-    created_at = Column(TIMESTAMP(timezone=True), server_default=func.now(), nullable=False)
+    created_at = Column(UTCDateTime(), server_default=func.now(), nullable=False)
     updated_at = Column(
-        TIMESTAMP(timezone=True),
+        UTCDateTime(),
         server_default=func.now(),
         onupdate=func.now(),
         nullable=False,
@@ -137,4 +209,209 @@ class Booking(Base):
     slot = relationship("Slot", back_populates="bookings")
 
     def __repr__(self) -> str:
-        return f"<Booking id={self.id} user_id={self.user_id} slot_id={self.slot_id}>"
\ No newline at end of file
+        return f"<Booking id={self.id} user_id={self.user_id} slot_id={self.slot_id}>"
+
+
+class BookingArchive(Base):
+    """
+    Архив завершённых и отменённых броней старше ARCHIVE_AFTER_MONTHS (см. archive.py).
+    На Postgres таблица партиционирована по месяцам start_time; ключ
+    партиционирования обязан входить в первичный ключ.
+    """
+    __tablename__ = "bookings_archive"
+    __table_args__ = (
+        Index("ix_booking_archive_user_created", "user_id", "created_at"),
+        {"postgresql_partition_by": "RANGE (start_time)"},
+    )
+
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    start_time = Column(UTCDateTime(), primary_key=True)
+    end_time = Column(UTCDateTime(), nullable=True)
+    user_id = Column(Integer, nullable=False)
+    slot_id = Column(Integer, nullable=False)
+    zone_id = Column(Integer, nullable=True)
+    zone_name = Column(String(255), nullable=True)
+    zone_address = Column(String(255), nullable=True)
+    status = Column(String(32), nullable=False)
+    cancellation_reason = Column(Text, nullable=True)
+    created_at = Column(UTCDateTime(), nullable=False)
+    updated_at = Column(UTCDateTime(), nullable=False)
+    archived_at = Column(UTCDateTime(), server_default=func.now(), nullable=False)
+
+    def __repr__(self) -> str:
+        return f"<BookingArchive id={self.id} user_id={self.user_id} start_time={self.start_time}>"
+
+
+class ZoneClosure(Base):
+    """
+    Запись о закрытии зоны: сколько броней отменено и скольким пользователям
+    ушли уведомления. Прогресс рассылки считается по событиям outbox с этим
+    zone_closure_id (GET /admin/zones/closures/{id}).
+    """
+    __tablename__ = "zone_closures"
+
+    id = Column(Integer, primary_key=True)
+    zone_id = Column(
+        Integer,
+        ForeignKey("zones.id", ondelete="CASCADE"),
+        nullable=False,
+        index=True,
+    )
+    reason = Column(Text, nullable=False)
+    from_time = Column(UTCDateTime(), nullable=False)
+    to_time = Column(UTCDateTime(), nullable=False)
+    affected_bookings = Column(Integer, default=0, nullable=False)
+    affected_users = Column(Integer, default=0, nullable=False)
+    created_at = Column(UTCDateTime(), server_default=func.now(), nullable=False)
+
+    def __repr__(self) -> str:
+        return f"<ZoneClosure id={self.id} zone_id={self.zone_id} bookings={self.affected_bookings}>"
+
+
+class OutboxEvent(Base):
+    """
+    Исходящие уведомления (transactional outbox, см. outbox.py).
+    Пишется в той же транзакции, что и изменение брони; доставкой
+    занимается фоновый диспетчер.
+    """
+    __tablename__ = "outbox"
+    __table_args__ = (
+        Index(
+            "ix_outbox_pending",
+            "next_attempt_at",
+            "id",
+            postgresql_where=text("status = 'pending'"),
+            sqlite_where=text("status = 'pending'"),
+        ),
+    )
+
+    id = Column(Integer, primary_key=True)
+    event_type = Column(String(64), nullable=False)
+    payload = Column(JSON, nullable=False)
+    zone_closure_id = Column(
+        Integer,
+        ForeignKey("zone_closures.id", ondelete="SET NULL"),
+        nullable=True,
+        index=True,
+    )
+    status = Column(String(32), default="pending", nullable=False)  # pending / delivered / failed
+    attempts = Column(Integer, default=0, nullable=False)
+    next_attempt_at = Column(UTCDateTime(), server_default=func.now(), nullable=False)
+    last_error = Column(Text, nullable=True)
+    # Уже доставленные каналы ("email", "push") — при повторе не отправляются
+    delivered_channels = Column(JSON, default=list, server_default=text("'[]'"), nullable=False)
+    created_at = Column(UTCDateTime(), server_default=func.now(), nullable=False)
+    delivered_at = Column(UTCDateTime(), nullable=True)
+
+    def __repr__(self) -> str:
+        return f"<OutboxEvent id={self.id} type={self.event_type!r} status={self.status!r}>"
+
+
+class IdempotencyKey(Base):
+    """
+    Ответ на запрос с заголовком Idempotency-Key (см. idempotency.py).
+    Ключ уникален в пределах пользователя; повтор запроса получает
+    сохранённый ответ до expires_at.
+    """
+    __tablename__ = "idempotency_keys"
+
+    user_id = Column(Integer, primary_key=True)
+    key = Column(String(255), primary_key=True)
+    fingerprint = Column(String(64), nullable=False)  # sha256 пути и тела запроса
+    status = Column(String(32), default="in_progress", nullable=False)  # in_progress / completed
+    response_status = Column(Integer, nullable=True)
+    response_body = Column(JSON, nullable=True)
+    created_at = Column(UTCDateTime(), nullable=False)
+    expires_at = Column(UTCDateTime(), nullable=False, index=True)
+
+    def __repr__(self) -> str:
+        return f"<IdempotencyKey user_id={self.user_id} key={self.key!r} status={self.status!r}>"
+
+
+class ZoneHourlyUsage(Base):
+    """
+    Свёртка загрузки зоны по часам (см. analytics.py): брони, пересекающие
+    час, пересчитываются фоновой задачей по изменённым броням.
+    Часы без броней и отмен не хранятся.
+    """
+    __tablename__ = "zone_hourly_usage"
+
+    zone_id = Column(
+        Integer,
+        ForeignKey("zones.id", ondelete="CASCADE"),
+        primary_key=True,
+    )
+    hour = Column(UTCDateTime(), primary_key=True, index=True)  # начало часа, UTC
+    booked_minutes = Column(Integer, default=0, nullable=False)  # минуты неотменённых броней в этом часе
+    bookings = Column(Integer, default=0, nullable=False)  # неотменённые брони, начавшиеся в этом часе
+    cancellations = Column(Integer, default=0, nullable=False)  # отменённые брони, начавшиеся в этом часе
+
+    def __repr__(self) -> str:
+        return f"<ZoneHourlyUsage zone_id={self.zone_id} hour={self.hour} minutes={self.booked_minutes}>"
+
+
+class RollupWatermark(Base):
+    """
+    Докуда обработаны изменения броней: ключ (bookings.updated_at, bookings.id)
+    последней учтённой брони. Одна строка на свёртку.
+    """
+    __tablename__ = "rollup_watermarks"
+
+    name = Column(String(64), primary_key=True)
+    updated_at = Column(UTCDateTime(), nullable=False)
+    booking_id = Column(Integer, nullable=False)
+
+    def __repr__(self) -> str:
+        return f"<RollupWatermark name={self.name!r} updated_at={self.updated_at} id={self.booking_id}>"
+
+
+# Партиция по умолчанию: вставка в архив не падает, даже если месячная партиция ещё не создана
+event.listen(
+    BookingArchive.__table__,
+    "after_create",
+    DDL(
+        "CREATE TABLE IF NOT EXISTS bookings_archive_default "
+        "PARTITION OF bookings_archive DEFAULT"
+    ).execute_if(dialect="postgresql"),
+)
+
+
+@event.listens_for(Booking, "before_insert")
+def _fill_from_slot(mapper, connection, target):
+    """
+    Денормализованные поля брони (zone_id, start_time, end_time) берутся из слота,
+    если их не передали. crud всегда заполняет их сам, запрос выполняется
+    только для вставок в обход crud.
+    """
+    if None not in (target.zone_id, target.start_time, target.end_time):
+        return
+    if target.slot_id is None:
+        return
+    row = connection.execute(
+        select(Place.zone_id, Slot.start_time, Slot.end_time)
+        .join(Slot, Slot.place_id == Place.id)
+        .where(Slot.id == target.slot_id)
+    ).first()
+    if row is None:
+        return
+    if target.zone_id is None:
+        target.zone_id = row.zone_id
+    if target.start_time is None:
+        target.start_time = row.start_time
+    if target.end_time is None:
+        target.end_time = row.end_time
+
+
+def _normalize_utc_attribute(target, value, oldvalue, initiator):
+    return None if value is None else naive_utc(value)
+
+
+for _mapper in Base.registry.mappers:
+    for _column_attr in _mapper.column_attrs:
+        if isinstance(_column_attr.columns[0].type, UTCDateTime):
+            event.listen(
+                getattr(_mapper.class_, _column_attr.key),
+                "set",
+                _normalize_utc_attribute,
+                retval=True,
+            )
@@ -1,132 +1,184 @@
-import httpx
-import os
+"""
+Отправка уведомлений через notification-service.
 
-NOTIFICATION_SERVICE_URL = os.getenv("NOTIFICATION_SERVICE_URL", "http://notification-service:8003")
-USER_SERVICE_URL = os.getenv("USER_SERVICE_URL", "http://user-service:8001")
+notify_* вызываются только диспетчером outbox (outbox.py), не из запросов:
+ошибки не глушатся, а пробрасываются, чтобы диспетчер повторил доставку.
+Email и push доставляются и повторяются независимо (см. _deliver).
+HTTP-вызовы идут через общие клиенты с пулом соединений (clients.py).
+"""
+from typing import Iterable, Optional, Set
+
+from cache import AsyncLRUCache
+from clients import NOTIFICATION_SERVICE, USER_SERVICE, get_client
+from config import settings
+
+# Каналы доставки (OutboxEvent.delivered_channels)
+EMAIL = "email"
+PUSH = "push"
+
+# user_id -> email; отсутствующие пользователи кэшируются как None на меньший срок
+user_email_cache = AsyncLRUCache(
+    maxsize=settings.USER_EMAIL_CACHE_SIZE,
+    ttl=settings.USER_EMAIL_CACHE_TTL_SECONDS,
+    negative_ttl=settings.USER_EMAIL_NEGATIVE_TTL_SECONDS,
+)
+
+async def fetch_user_email(user_id: int) -> Optional[str]:
+    """Запрос email в user-service (None — пользователя нет)"""
+    response = await get_client(USER_SERVICE).get(f"/users/{user_id}")
+    if response.status_code == 404:
+        return None
+    response.raise_for_status()
+    return response.json().get("email") or None
 
 async def get_user_email(user_id: int) -> str:
-    """Получить email пользователя из user-service"""
-    try:
-        async with httpx.AsyncClient(timeout=10.0) as client:
-            response = await client.get(f"{USER_SERVICE_URL}/users/{user_id}")
-            if response.status_code == 200:
-                user_data = response.json()
-                return user_data.get("email", "")
-    except Exception as e:
-        print(f"Failed to fetch user email: {e}")
-    return ""
+    """Получить email пользователя ("" — пользователя нет), через кэш"""
+    email = await user_email_cache.get_or_load(user_id, lambda: fetch_user_email(user_id))
+    return email or ""
+
+async def prefetch_user_emails(user_ids: Iterable[int]) -> None:
+    """
+    Заполняет кэш email для многих пользователей через POST /users/batch —
+    один запрос на пачку вместо GET на каждого (закрытие зоны и т.п.).
+    """
+    ids = [user_id for user_id in dict.fromkeys(user_ids) if user_id not in user_email_cache]
+    for i in range(0, len(ids), settings.USER_BATCH_SIZE):
+        chunk = ids[i:i + settings.USER_BATCH_SIZE]
+        response = await get_client(USER_SERVICE).post(
+            "/users/batch", json={"ids": chunk, "fields": ["email"]}
+        )
+        response.raise_for_status()
+        data = response.json()
+        for user in data["users"]:
+            user_email_cache.set(user["id"], user.get("email") or None)
+        for user_id in data["missing"]:
+            user_email_cache.set(user_id, None)
 
 async def send_email_notification(email: str, subject: str, text: str):
     """// уведомления: Отправить email уведомление через notification-service"""
-    try:
-        async with httpx.AsyncClient(timeout=10.0) as client:
-            await client.post(
-                f"{NOTIFICATION_SERVICE_URL}/notify/email",
-                json={
-                    "email": email,
-                    "subject": subject,
-                    "text": text,
-                }
-            )
-    except Exception as e:
-        # Логируем ошибку, но не прерываем основной процесс
-        print(f"Failed to send email notification: {e}")
+    response = await get_client(NOTIFICATION_SERVICE).post(
+        "/notify/email",
+        json={
+            "email": email,
+            "subject": subject,
+            "text": text,
+        }
+    )
+    response.raise_for_status()
 
 async def send_push_notification(user_id: int, title: str, message: str, notif_type: str = "info"):
     """// push: Отправить push-уведомление через notification-service"""
-    try:
-        async with httpx.AsyncClient(timeout=10.0) as client:
-            await client.post(
-                f"{NOTIFICATION_SERVICE_URL}/notify/push",
-                json={
-                    "user_id": user_id,
-                    "type": notif_type,
-                    "title": title,
-                    "message": message,
-                }
-            )
-    except Exception as e:
-        # Логируем ошибку, но не прерываем основной процесс
-        print(f"Failed to send push notification: {e}")
-
-async def notify_booking_created(user_id: int, zone_name: str, start_time, end_time):
-    """// уведомления: Отправить уведомление о создании бронирования"""
-    try:
+    response = await get_client(NOTIFICATION_SERVICE).post(
+        "/notify/push",
+        json={
+            "user_id": user_id,
+            "type": notif_type,
+            "title": title,
+            "message": message,
+        }
+    )
+    response.raise_for_status()
+
+async def _deliver(
+    user_id: int,
+    done: Optional[Set[str]],
+    subject: str,
+    text: str,
+    title: str,
+    message: str,
+    notif_type: str,
+):
+    """
+    Email и push — отдельные каналы доставки. Отправленный канал
+    отмечается в done (диспетчер сохраняет его в событии outbox), и при
+    повторе события после ошибки другого канала не отправляется снова.
+    """
+    if done is None:
+        done = set()
+    if EMAIL not in done:
         user_email = await get_user_email(user_id)
         if user_email:
-            await send_email_notification(
-                email=user_email,
-                subject="Бронирование создано",
-                text=f"Ваше бронирование в зоне '{zone_name}' успешно создано.\n"
-                     f"Время: {start_time} - {end_time}"
-            )
+            await send_email_notification(email=user_email, subject=subject, text=text)
+        done.add(EMAIL)
+    if PUSH not in done:
         await send_push_notification(
-            user_id=user_id,
-            title="Бронирование создано",
-            message=f"Бронирование в зоне '{zone_name}' создано",
-            notif_type="booking_created"
+            user_id=user_id, title=title, message=message, notif_type=notif_type
         )
-    except Exception as e:
-        print(f"Failed to send booking created notifications: {e}")
+        done.add(PUSH)
+
+async def notify_booking_created(user_id: int, zone_name: str, start_time, end_time, done: Optional[Set[str]] = None):
+    """// уведомления: Отправить уведомление о создании бронирования"""
+    await _deliver(
+        user_id, done,
+        subject="Бронирование создано",
+        text=f"Ваше бронирование в зоне '{zone_name}' успешно создано.\n"
+             f"Время: {start_time} - {end_time}",
+        title="Бронирование создано",
+        message=f"Бронирование в зоне '{zone_name}' создано",
+        notif_type="booking_created",
+    )
 
-async def notify_booking_cancelled(user_id: int, zone_name: str, start_time, end_time):
+async def notify_booking_cancelled(user_id: int, zone_name: str, start_time, end_time, done: Optional[Set[str]] = None):
     """// уведомления: Отправить уведомление об отмене бронирования"""
-    try:
-        user_email = await get_user_email(user_id)
-        if user_email:
-            await send_email_notification(
-                email=user_email,
-                subject="Бронирование отменено",
-                text=f"Ваше бронирование в зоне '{zone_name}' было отменено.\n"
-                     f"Время: {start_time} - {end_time}"
-            )
-        await send_push_notification(
-            user_id=user_id,
-            title="Бронирование отменено",
-            message=f"Бронирование в зоне '{zone_name}' отменено",
-            notif_type="booking_cancelled"
-        )
-    except Exception as e:
-        print(f"Failed to send booking cancelled notifications: {e}")
+    await _deliver(
+        user_id, done,
+        subject="Бронирование отменено",
+        text=f"Ваше бронирование в зоне '{zone_name}' было отменено.\n"
+             f"Время: {start_time} - {end_time}",
+        title="Бронирование отменено",
+        message=f"Бронирование в зоне '{zone_name}' отменено",
+        notif_type="booking_cancelled",
+    )
 
-async def notify_booking_extended(user_id: int, zone_name: str, end_time):
+async def notify_booking_extended(user_id: int, zone_name: str, end_time, done: Optional[Set[str]] = None):
     """// уведомления: Отправить уведомление о продлении бронирования"""
-    try:
-        user_email = await get_user_email(user_id)
-        if user_email:
-            await send_email_notification(
-                email=user_email,
-                subject="Бронирование продлено",
-                text=f"Ваше бронирование в зоне '{zone_name}' успешно продлено.\n"
-                     f"Новое время окончания: {end_time}"
-            )
-        await send_push_notification(
-            user_id=user_id,
-            title="Бронирование продлено",
-            message=f"Бронирование в зоне '{zone_name}' продлено",
-            notif_type="booking_extended"
-        )
-    except Exception as e:
-        print(f"Failed to send booking extended notifications: {e}")
+    await _deliver(
+        user_id, done,
+        subject="Бронирование продлено",
+        text=f"Ваше бронирование в зоне '{zone_name}' успешно продлено.\n"
+             f"Новое время окончания: {end_time}",
+        title="Бронирование продлено",
+        message=f"Бронирование в зоне '{zone_name}' продлено",
+        notif_type="booking_extended",
+    )
 
-async def notify_zone_closed(user_id: int, zone_name: str, reason: str, start_time, end_time):
-    """// уведомления: Отправить уведомление о закрытии зоны"""
-    try:
-        user_email = await get_user_email(user_id)
-        if user_email:
-            await send_email_notification(
-                email=user_email,
-                subject="Зона закрыта - бронирование отменено",
-                text=f"Зона '{zone_name}' закрыта на обслуживание.\n"
-                     f"Причина: {reason}\n"
-                     f"Ваше бронирование было автоматически отменено.\n"
-                     f"Время: {start_time} - {end_time}"
-            )
-        await send_push_notification(
-            user_id=user_id,
-            title="Зона закрыта",
-            message=f"Зона '{zone_name}' закрыта. Бронирование отменено",
-            notif_type="zone_closed"
-        )
-    except Exception as e:
-        print(f"Failed to send zone closed notifications: {e}")
\ No newline at end of file
+def _interval_lines(intervals) -> str:
+    return "\n".join(f"  {start_time} - {end_time}" for start_time, end_time in intervals)
+
+async def notify_zone_closed(user_id: int, zone_name: str, reason: str, intervals, done: Optional[Set[str]] = None):
+    """// уведомления: Одно уведомление пользователю обо всех его бронях, отменённых закрытием зоны"""
+    await _deliver(
+        user_id, done,
+        subject="Зона закрыта - бронирование отменено",
+        text=f"Зона '{zone_name}' закрыта на обслуживание.\n"
+             f"Причина: {reason}\n"
+             f"Ваши бронирования были автоматически отменены ({len(intervals)}).\n"
+             f"Время:\n{_interval_lines(intervals)}",
+        title="Зона закрыта",
+        message=f"Зона '{zone_name}' закрыта. Отменено бронирований: {len(intervals)}",
+        notif_type="zone_closed",
+    )
+
+async def notify_bookings_bulk_created(user_id: int, zone_name: str, intervals, done: Optional[Set[str]] = None):
+    """// уведомления: Одно сводное уведомление о серии бронирований"""
+    await _deliver(
+        user_id, done,
+        subject="Серия бронирований создана",
+        text=f"В зоне '{zone_name}' создано бронирований: {len(intervals)}.\n"
+             f"Время:\n{_interval_lines(intervals)}",
+        title="Серия бронирований создана",
+        message=f"Создано бронирований в зоне '{zone_name}': {len(intervals)}",
+        notif_type="booking_created",
+    )
+
+async def notify_bookings_bulk_cancelled(user_id: int, zone_name: str, intervals, done: Optional[Set[str]] = None):
+    """// уведомления: Одно сводное уведомление о массовой отмене бронирований"""
+    await _deliver(
+        user_id, done,
+        subject="Бронирования отменены",
+        text=f"В зоне '{zone_name}' отменено бронирований: {len(intervals)}.\n"
+             f"Время:\n{_interval_lines(intervals)}",
+        title="Бронирования отменены",
+        message=f"Отменено бронирований в зоне '{zone_name}': {len(intervals)}",
+        notif_type="booking_cancelled",
+    )
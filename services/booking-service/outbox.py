@@ -0,0 +1,240 @@
+# services/booking-service/app/outbox.py
+"""
+Transactional outbox для уведомлений о бронях.
+
+crud пишет событие в таблицу outbox в той же транзакции, что и изменение
+брони (enqueue), и не ходит в user-service / notification-service: эндпоинт
+отвечает сразу после commit, а событие не теряется, если процесс упал.
+
+Фоновый диспетчер (run_dispatcher) забирает пачку готовых событий через
+SELECT ... FOR UPDATE SKIP LOCKED — несколько реплик booking-service не
+возьмут одно событие дважды — и сдвигает им next_attempt_at на время аренды
+(OUTBOX_LEASE_SECONDS). Доставка идёт уже вне транзакции, параллельно, но
+не больше OUTBOX_CONCURRENCY событий одновременно; результат записывается
+отдельно: delivered, повтор с экспоненциальной задержкой или failed после
+OUTBOX_MAX_ATTEMPTS попыток.
+
+Email и push одного события — отдельные каналы: уже доставленные каналы
+сохраняются в delivered_channels, повтор события отправляет только
+оставшиеся. Ответ 4xx (кроме 408/429) повтором не исправить — такое
+событие сразу помечается failed.
+"""
+from __future__ import annotations
+
+import asyncio
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Awaitable, Callable, Dict, List, Optional, Set
+
+import httpx
+from sqlalchemy import and_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+import models
+import notifications
+from config import settings
+from db import SessionLocal
+
+BOOKING_CREATED = "booking_created"
+BOOKINGS_BULK_CREATED = "bookings_bulk_created"
+BOOKING_CANCELLED = "booking_cancelled"
+BOOKINGS_BULK_CANCELLED = "bookings_bulk_cancelled"
+BOOKING_EXTENDED = "booking_extended"
+ZONE_CLOSED = "zone_closed"
+
+
+def _json_value(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, (list, tuple)):
+        return [_json_value(item) for item in value]
+    return value
+
+
+def _dt(value: Optional[str]) -> Optional[datetime]:
+    return datetime.fromisoformat(value) if value else None
+
+
+def enqueue(
+    session: AsyncSession,
+    event_type: str,
+    zone_closure_id: Optional[int] = None,
+    **payload,
+) -> models.OutboxEvent:
+    """Добавляет событие в сессию; сохраняется вместе с commit вызывающего."""
+    event = models.OutboxEvent(
+        event_type=event_type,
+        payload={key: _json_value(value) for key, value in payload.items()},
+        zone_closure_id=zone_closure_id,
+        status="pending",
+        attempts=0,
+        next_attempt_at=datetime.now(timezone.utc),
+    )
+    session.add(event)
+    return event
+
+
+async def _booking_created(p: dict, done: Set[str]) -> None:
+    await notifications.notify_booking_created(
+        p["user_id"], p["zone_name"], _dt(p["start_time"]), _dt(p["end_time"]), done
+    )
+
+
+async def _bookings_bulk_created(p: dict, done: Set[str]) -> None:
+    await notifications.notify_bookings_bulk_created(
+        p["user_id"], p["zone_name"], [(_dt(s), _dt(e)) for s, e in p["intervals"]], done
+    )
+
+
+async def _booking_cancelled(p: dict, done: Set[str]) -> None:
+    await notifications.notify_booking_cancelled(
+        p["user_id"], p["zone_name"], _dt(p["start_time"]), _dt(p["end_time"]), done
+    )
+
+
+async def _bookings_bulk_cancelled(p: dict, done: Set[str]) -> None:
+    await notifications.notify_bookings_bulk_cancelled(
+        p["user_id"], p["zone_name"], [(_dt(s), _dt(e)) for s, e in p["intervals"]], done
+    )
+
+
+async def _booking_extended(p: dict, done: Set[str]) -> None:
+    await notifications.notify_booking_extended(
+        p["user_id"], p["zone_name"], _dt(p["end_time"]), done
+    )
+
+
+async def _zone_closed(p: dict, done: Set[str]) -> None:
+    # События до группировки по пользователю несли одну бронь: start_time/end_time
+    intervals = p.get("intervals") or [(p["start_time"], p["end_time"])]
+    await notifications.notify_zone_closed(
+        p["user_id"], p["zone_name"], p["reason"], [(_dt(s), _dt(e)) for s, e in intervals],
+        done,
+    )
+
+
+HANDLERS: Dict[str, Callable[[dict, Set[str]], Awaitable[None]]] = {
+    BOOKING_CREATED: _booking_created,
+    BOOKINGS_BULK_CREATED: _bookings_bulk_created,
+    BOOKING_CANCELLED: _booking_cancelled,
+    BOOKINGS_BULK_CANCELLED: _bookings_bulk_cancelled,
+    BOOKING_EXTENDED: _booking_extended,
+    ZONE_CLOSED: _zone_closed,
+}
+
+
+@dataclass
+class DispatchResult:
+    delivered: int = 0
+    retried: int = 0
+    failed: int = 0
+
+
+def is_permanent(error: Exception) -> bool:
+    """Ошибка, которую повтор не исправит: 4xx от сервиса, кроме 408 и 429."""
+    if not isinstance(error, httpx.HTTPStatusError):
+        return False
+    code = error.response.status_code
+    return 400 <= code < 500 and code not in (408, 429)
+
+
+def retry_delay(attempts: int) -> timedelta:
+    """Экспоненциальная задержка перед попыткой номер attempts + 1."""
+    seconds = settings.OUTBOX_BACKOFF_SECONDS * 2 ** (attempts - 1)
+    return timedelta(seconds=min(seconds, settings.OUTBOX_MAX_BACKOFF_SECONDS))
+
+
+async def claim_batch(
+    session: AsyncSession,
+    batch_size: int,
+    now: datetime,
+) -> List[models.OutboxEvent]:
+    """Забирает готовые события и продлевает им аренду на время доставки."""
+    result = await session.execute(
+        select(models.OutboxEvent)
+        .where(
+            and_(
+                models.OutboxEvent.status == "pending",
+                models.OutboxEvent.next_attempt_at <= now,
+            )
+        )
+        .order_by(models.OutboxEvent.next_attempt_at, models.OutboxEvent.id)
+        .limit(batch_size)
+        .with_for_update(skip_locked=True)
+    )
+    events = list(result.scalars().all())
+    lease_until = now + timedelta(seconds=settings.OUTBOX_LEASE_SECONDS)
+    for event in events:
+        event.next_attempt_at = lease_until
+    await session.commit()
+    return events
+
+
+async def dispatch_batch(
+    session: AsyncSession,
+    batch_size: Optional[int] = None,
+    now: Optional[datetime] = None,
+) -> DispatchResult:
+    """Одна итерация диспетчера: claim, параллельная доставка, запись результата."""
+    now = now or datetime.now(timezone.utc)
+    events = await claim_batch(session, batch_size or settings.OUTBOX_BATCH_SIZE, now)
+    user_ids = {event.payload.get("user_id") for event in events} - {None}
+    if len(user_ids) > 1:
+        # Email всех получателей пачки — одним запросом к user-service
+        try:
+            await notifications.prefetch_user_emails(user_ids)
+        except Exception as e:
+            print(f"Failed to prefetch user emails: {e}")
+    semaphore = asyncio.Semaphore(settings.OUTBOX_CONCURRENCY)
+
+    async def deliver(event: models.OutboxEvent) -> Optional[Exception]:
+        handler = HANDLERS.get(event.event_type)
+        if handler is None:
+            return LookupError(f"Неизвестный тип события: {event.event_type}")
+        done = set(event.delivered_channels or ())
+        async with semaphore:
+            try:
+                await handler(event.payload, done)
+            except Exception as e:
+                return e
+            finally:
+                # Каналы, доставленные до ошибки, при повторе не отправляются
+                event.delivered_channels = sorted(done)
+        return None
+
+    errors = await asyncio.gather(*(deliver(event) for event in events))
+    outcome = DispatchResult()
+    for event, error in zip(events, errors):
+        if error is not None:
+            event.attempts += 1
+            event.last_error = str(error) or type(error).__name__
+            unknown = event.event_type not in HANDLERS
+            if unknown or is_permanent(error) or event.attempts >= settings.OUTBOX_MAX_ATTEMPTS:
+                event.status = "failed"
+                outcome.failed += 1
+            else:
+                event.next_attempt_at = now + retry_delay(event.attempts)
+                outcome.retried += 1
+        else:
+            event.attempts += 1
+            event.status = "delivered"
+            event.delivered_at = datetime.now(timezone.utc)
+            event.last_error = None
+            outcome.delivered += 1
+    await session.commit()
+    return outcome
+
+
+async def run_dispatcher() -> None:
+    """Фоновая задача: разбирает outbox, пока есть готовые события, потом спит."""
+    while True:
+        try:
+            async with SessionLocal() as session:
+                while True:
+                    outcome = await dispatch_batch(session)
+                    total = outcome.delivered + outcome.retried + outcome.failed
+                    if total < settings.OUTBOX_BATCH_SIZE:
+                        break
+        except Exception as e:
+            print(f"Outbox dispatcher failed: {e}")
+        await asyncio.sleep(settings.OUTBOX_POLL_SECONDS)
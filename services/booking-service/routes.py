@@ -12,13 +12,19 @@ from fastapi import (
     status,
     Query,
     Path,
+    Request,
 )
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 
 import crud
+import idempotency
+import live
 import schemas
-from crud import BookingExtensionError
-from db import get_session
+from config import settings
+from crud import BookingBulkError, BookingExtensionError
+from db import get_read_session, get_session
+from fastjson import FastJSONResponse
 
 router = APIRouter(tags=["booking"])
 
@@ -30,11 +36,53 @@ router = APIRouter(tags=["booking"])
 )
 async def list_zones(
     include_inactive: bool = Query(False, description="Включить неактивные зоны"),
-    session: AsyncSession = Depends(get_session),
+    session: AsyncSession = Depends(get_read_session),
 ):
+    if settings.FAST_JSON_RESPONSES:
+        return FastJSONResponse(
+            await crud.get_zones(session, include_inactive=include_inactive, as_rows=True)
+        )
     return await crud.get_zones(session, include_inactive=include_inactive)
 
 
+@router.get(
+    "/zones/stream",
+    summary="Живые изменения зон (Server-Sent Events)",
+    response_class=StreamingResponse,
+)
+async def zones_stream(
+    session: AsyncSession = Depends(get_read_session),
+):
+    """
+    Первое событие snapshot — список зон как в GET /zones, дальше дельты из
+    live.hub (см. live.py). resync — клиент отстал, нужно перечитать список.
+    """
+    subscription = live.hub.subscribe()
+    if subscription is None:
+        raise HTTPException(503, "Слишком много подписчиков, попробуйте позже")
+    try:
+        snapshot = await crud.get_zones(session, as_rows=True)
+        # Соединение с БД возвращается в пул: дальше поток его не держит
+        await session.rollback()
+    except BaseException:
+        live.hub.unsubscribe(subscription)
+        raise
+
+    async def events():
+        try:
+            yield live.format_event(live.SNAPSHOT, snapshot)
+            async for chunk in live.stream(subscription):
+                yield chunk
+        finally:
+            live.hub.unsubscribe(subscription)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 @router.get(
     "/zones/{zone_id}/places",
     response_model=List[schemas.PlaceOut],
@@ -42,11 +90,33 @@ async def list_zones(
 )
 async def list_places_in_zone(
     zone_id: int,
-    session: AsyncSession = Depends(get_session),
+    session: AsyncSession = Depends(get_read_session),
 ):
+    if settings.FAST_JSON_RESPONSES:
+        return FastJSONResponse(await crud.get_place_rows_by_zone(session, zone_id))
     return await crud.get_places_by_zone(session, zone_id)
 
 
+@router.get(
+    "/zones/{zone_id}/slots",
+    response_model=schemas.SlotMatrix,
+    summary="Слоты всех мест зоны за интервал дат (колоночный формат)",
+)
+async def zone_slot_matrix(
+    zone_id: int,
+    date_from: date = Query(..., alias="from"),
+    date_to: date = Query(..., alias="to"),
+    session: AsyncSession = Depends(get_read_session),
+):
+    try:
+        matrix = await crud.get_zone_slot_matrix(session, zone_id, date_from, date_to)
+    except ValueError as e:
+        raise HTTPException(400, str(e))
+    if matrix is None:
+        raise HTTPException(404, "Зона не найдена")
+    return matrix
+
+
 @router.get(
     "/places/{place_id}/slots",
     response_model=List[schemas.SlotOut],
@@ -55,8 +125,12 @@ async def list_places_in_zone(
 async def list_slots(
     place_id: int,
     date_: date = Query(..., alias="date"),
-    session: AsyncSession = Depends(get_session),
+    session: AsyncSession = Depends(get_read_session),
 ):
+    if settings.FAST_JSON_RESPONSES:
+        return FastJSONResponse(
+            await crud.get_slot_rows_by_place_and_date(session, place_id, date_)
+        )
     return await crud.get_slots_by_place_and_date(session, place_id, date_)
 
 
@@ -68,16 +142,24 @@ async def list_slots(
 )
 async def create_booking(
     booking_in: schemas.BookingCreate,
+    request: Request,
     session: AsyncSession = Depends(get_session),
     user_id: int = Depends(get_current_user_id),
+    key: Optional[str] = Depends(idempotency.idempotency_key),
 ):
-    booking = await crud.create_booking(session, user_id, booking_in)
-    if booking is None:
-        raise HTTPException(
-            status.HTTP_409_CONFLICT, 
-            "Невозможно создать бронь: слот недоступен или зона переполнена"
-        )
-    return booking
+    async def handler():
+        booking = await crud.create_booking(session, user_id, booking_in)
+        if booking is None:
+            raise HTTPException(
+                status.HTTP_409_CONFLICT, 
+                "Невозможно создать бронь: слот недоступен или зона переполнена"
+            )
+        return booking
+
+    return await idempotency.run(
+        session, user_id, key, request.url.path, booking_in.model_dump(mode="json"),
+        handler, schemas.BookingOut, status.HTTP_201_CREATED,
+    )
 
 
 @router.post(
@@ -88,16 +170,40 @@ async def create_booking(
 )
 async def create_booking_by_time(
     booking_in: schemas.BookingCreateTimeRange,
+    request: Request,
     session: AsyncSession = Depends(get_session),
     user_id: int = Depends(get_current_user_id),
+    key: Optional[str] = Depends(idempotency.idempotency_key),
 ):
-    booking = await crud.create_booking_by_time_range(session, user_id, booking_in)
-    if booking is None:
-        raise HTTPException(
-            status.HTTP_409_CONFLICT,
-            "Невозможно создать бронь: нет свободных мест, некорректный интервал, превышен лимит в 6 часов или зона переполнена"
-        )
-    return booking
+    async def handler():
+        booking = await crud.create_booking_by_time_range(session, user_id, booking_in)
+        if booking is None:
+            raise HTTPException(
+                status.HTTP_409_CONFLICT,
+                "Невозможно создать бронь: нет свободных мест, некорректный интервал, превышен лимит в 6 часов или зона переполнена"
+            )
+        return booking
+
+    return await idempotency.run(
+        session, user_id, key, request.url.path, booking_in.model_dump(mode="json"),
+        handler, schemas.BookingOut, status.HTTP_201_CREATED,
+    )
+
+
+@router.post(
+    "/bookings/bulk",
+    response_model=schemas.BookingBulkResult,
+    summary="Создать серию броней (по списку дат или правилу повторения)",
+)
+async def create_bookings_bulk(
+    data: schemas.BookingBulkCreate,
+    session: AsyncSession = Depends(get_session),
+    user_id: int = Depends(get_current_user_id),
+):
+    try:
+        return await crud.create_bookings_bulk(session, user_id, data)
+    except BookingBulkError as e:
+        raise HTTPException(400, str(e))
 
 
 @router.post(
@@ -118,20 +224,29 @@ async def cancel_booking(
     return booking
 
 
-@router.get(
-    "/bookings/history",
-    response_model=List[schemas.BookingOut],
-    summary="История броней",
+@router.post(
+    "/bookings/cancel/bulk",
+    response_model=schemas.BookingBulkCancelResult,
+    summary="Массовая отмена своих броней (по списку id или фильтру)",
 )
-async def booking_history(
+async def cancel_bookings_bulk(
+    data: schemas.BookingBulkCancel,
+    session: AsyncSession = Depends(get_session),
+    user_id: int = Depends(get_current_user_id),
+):
+    try:
+        return await crud.cancel_bookings_bulk(session, user_id, data)
+    except BookingBulkError as e:
+        raise HTTPException(400, str(e))
+
+
+def history_filters(
     status_: Optional[str] = Query(None, alias="status"),
     zone_id: Optional[int] = Query(None),
     date_from: Optional[date] = Query(None),
     date_to: Optional[date] = Query(None),
-    session: AsyncSession = Depends(get_session),
-    user_id: int = Depends(get_current_user_id),
-):
-    filters = schemas.BookingHistoryFilters(
+) -> schemas.BookingHistoryFilters:
+    return schemas.BookingHistoryFilters(
         status=status_,
         zone_id=zone_id,
         date_from=(
@@ -142,7 +257,64 @@ async def booking_history(
         ),
     )
 
-    return await crud.get_booking_history(session, user_id, filters)
+
+@router.get(
+    "/bookings/history",
+    response_model=List[schemas.BookingOut],
+    summary="История броней",
+)
+async def booking_history(
+    include_archived: bool = Query(False, description="Добавить брони из архива"),
+    filters: schemas.BookingHistoryFilters = Depends(history_filters),
+    session: AsyncSession = Depends(get_read_session),
+    user_id: int = Depends(get_current_user_id),
+):
+    if settings.FAST_JSON_RESPONSES:
+        return FastJSONResponse(await crud.get_booking_history_rows(
+            session, user_id, filters, include_archived=include_archived
+        ))
+    return await crud.get_booking_history(
+        session, user_id, filters, include_archived=include_archived
+    )
+
+
+@router.get(
+    "/bookings/history/page",
+    response_model=schemas.BookingHistoryPage,
+    summary="История броней постранично (keyset-курсор)",
+)
+async def booking_history_page(
+    limit: int = Query(
+        settings.HISTORY_PAGE_SIZE, ge=1, le=settings.HISTORY_MAX_PAGE_SIZE
+    ),
+    cursor: Optional[str] = Query(None, description="next_cursor предыдущей страницы"),
+    filters: schemas.BookingHistoryFilters = Depends(history_filters),
+    session: AsyncSession = Depends(get_read_session),
+    user_id: int = Depends(get_current_user_id),
+):
+    try:
+        return await crud.get_booking_history_page(
+            session, user_id, filters, limit=limit, cursor=cursor
+        )
+    except ValueError as e:
+        raise HTTPException(400, str(e))
+
+
+@router.get(
+    "/bookings/history/export",
+    summary="Полная история броней потоком NDJSON",
+    response_class=StreamingResponse,
+)
+async def booking_history_export(
+    filters: schemas.BookingHistoryFilters = Depends(history_filters),
+    session: AsyncSession = Depends(get_read_session),
+    user_id: int = Depends(get_current_user_id),
+):
+    async def rows():
+        async for booking in crud.stream_booking_history(session, user_id, filters):
+            yield schemas.BookingOut.model_validate(booking).model_dump_json() + "\n"
+
+    return StreamingResponse(rows(), media_type="application/x-ndjson")
 
 
 @router.post(
@@ -153,18 +325,27 @@ async def booking_history(
 async def extend_booking(
     booking_id: int,
     extend_data: schemas.BookingExtendTimeRequest,
+    request: Request,
     session: AsyncSession = Depends(get_session),
     user_id: int = Depends(get_current_user_id),
+    key: Optional[str] = Depends(idempotency.idempotency_key),
 ):
-    try:
-        booking = await crud.extend_booking(
-            session, 
-            user_id, 
-            booking_id,
-            extend_hours=extend_data.extend_hours,
-            extend_minutes=extend_data.extend_minutes,
-        )
-        return booking
-    except BookingExtensionError as e:
-        # Возвращаем детальное описание ошибки пользователю
-        raise HTTPException(400, str(e))
+    async def handler():
+        try:
+            booking = await crud.extend_booking(
+                session, 
+                user_id, 
+                booking_id,
+                extend_hours=extend_data.extend_hours,
+                extend_minutes=extend_data.extend_minutes,
+            )
+            return booking
+        except BookingExtensionError as e:
+            # Возвращаем детальное описание ошибки пользователю
+            raise HTTPException(400, str(e))
+
+    # Повтор продления без ключа создал бы вторую бронь в цепочке
+    return await idempotency.run(
+        session, user_id, key, request.url.path, extend_data.model_dump(mode="json"),
+        handler, schemas.BookingOut,
+    )
@@ -1,7 +1,19 @@
-from datetime import datetime
-from typing import Optional, List
+from datetime import date, datetime, time
+from typing import Annotated, Optional, List
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, PlainSerializer, field_validator, model_validator
+
+from timezone_utils import utc_iso
+
+# Время в ответах: атрибуты моделей — naive UTC (models.UTCDateTime), а в JSON
+# уходит ISO 8601 со смещением ("...Z"), как у fastjson
+UTCDatetime = Annotated[datetime, PlainSerializer(utc_iso, return_type=str, when_used="json")]
+
+# Одно определение для списка зон, статистики и live (crud.in_progress)
+CURRENT_OCCUPANCY = (
+    "Занятые сейчас места: активные брони зоны, идущие в данный момент. "
+    "Пользователь с двумя такими бронями даёт 2"
+)
 
 
 # ------------------------------------------------------------
@@ -23,12 +35,25 @@ class ZoneBase(BaseModel):
 
 class ZoneCreate(ZoneBase):
     places_count: int = Field(..., ge=1, json_schema_extra={"example": 10})
+    # Часы работы и шаг сетки слотов (UTC)
+    opens_at: time = Field(time(8, 0), json_schema_extra={"example": "08:00"})
+    closes_at: time = Field(time(22, 0), json_schema_extra={"example": "22:00"})
+    slot_minutes: int = Field(60, ge=5, le=360, multiple_of=5)
+
+    @model_validator(mode="after")
+    def check_hours(self) -> "ZoneCreate":
+        if self.closes_at <= self.opens_at:
+            raise ValueError("closes_at must be later than opens_at")
+        return self
 
 
 class ZoneUpdate(BaseModel):
     name: Optional[str] = None
     address: Optional[str] = None
     is_active: Optional[bool] = None
+    opens_at: Optional[time] = None
+    closes_at: Optional[time] = None
+    slot_minutes: Optional[int] = Field(None, ge=5, le=360, multiple_of=5)
 
 
 class ZoneOut(ORMBase):
@@ -37,14 +62,17 @@ class ZoneOut(ORMBase):
     address: Optional[str]
     is_active: bool
     closure_reason: Optional[str]
-    closed_until: Optional[datetime]
-    created_at: datetime
-    updated_at: datetime
+    closed_until: Optional[UTCDatetime]
+    opens_at: time = time(8, 0)
+    closes_at: time = time(22, 0)
+    slot_minutes: int = 60
+    created_at: UTCDatetime
+    updated_at: UTCDatetime
 
     # --- Добавь статистические поля ---
     active_bookings: int  # Число активных бронирований в зоне
     cancelled_bookings: int  # Число отменённых бронирований в зоне
-    current_occupancy: int  # Сколько человек сейчас в зоне
+    current_occupancy: int = Field(description=CURRENT_OCCUPANCY)
 
 
 # ============================================================
@@ -56,8 +84,8 @@ class PlaceOut(ORMBase):
     zone_id: int
     name: str
     is_active: bool
-    created_at: datetime
-    updated_at: datetime
+    created_at: UTCDatetime
+    updated_at: UTCDatetime
 
 
 # ============================================================
@@ -67,8 +95,8 @@ class PlaceOut(ORMBase):
 class SlotOut(ORMBase):
     id: int
     place_id: int
-    start_time: datetime
-    end_time: datetime
+    start_time: UTCDatetime
+    end_time: UTCDatetime
     is_available: bool
 
 
@@ -109,10 +137,85 @@ class BookingCreateTimeRange(BaseModel):
                 raise ValueError('end_minute must be a multiple of 5')
         return super().model_validate(value)
 
+class BookingRecurrence(BaseModel):
+    """
+    Правило повторения: каждый из указанных дней недели в интервале дат.
+    weekdays — номера дней недели (0 = понедельник, 6 = воскресенье).
+    """
+    date_from: date
+    date_to: date
+    weekdays: List[int] = Field(
+        default_factory=lambda: [0, 1, 2, 3, 4],
+        json_schema_extra={"example": [0, 1, 2, 3, 4]},
+    )
+
+    @field_validator("weekdays")
+    @classmethod
+    def check_weekdays(cls, value: List[int]) -> List[int]:
+        if not value or any(day < 0 or day > 6 for day in value):
+            raise ValueError("weekdays must contain values from 0 to 6")
+        return sorted(set(value))
+
+    @model_validator(mode="after")
+    def check_range(self) -> "BookingRecurrence":
+        if self.date_to < self.date_from:
+            raise ValueError("date_to must not be earlier than date_from")
+        return self
+
+
+class BookingBulkCreate(BaseModel):
+    """
+    Массовое создание броней в одной зоне на одно и то же время суток.
+    Даты задаются либо явным списком (dates), либо правилом (recurrence).
+    """
+    zone_id: int
+    start_hour: int = Field(..., ge=0, le=23)
+    start_minute: int = Field(..., ge=0, le=55, multiple_of=5)
+    end_hour: int = Field(..., ge=0, le=23)
+    end_minute: int = Field(..., ge=0, le=55, multiple_of=5)
+    dates: Optional[List[date]] = Field(None, json_schema_extra={"example": ["2025-12-15", "2025-12-16"]})
+    recurrence: Optional[BookingRecurrence] = None
+
+    @model_validator(mode="after")
+    def check_dates_source(self) -> "BookingBulkCreate":
+        if (self.dates is None) == (self.recurrence is None):
+            raise ValueError("exactly one of dates or recurrence must be provided")
+        return self
+
+
 class BookingCancelRequest(BaseModel):
     booking_id: int
 
 
+class BookingBulkCancel(BaseModel):
+    """
+    Массовая отмена своих броней: либо явный список booking_ids, либо фильтр —
+    будущие брони в одной зоне и/или с началом в интервале дат
+    [date_from, date_to], либо all=true — все будущие брони. Пустое тело
+    ничего не выбирает и отклоняется: отмена всего только по явному флагу.
+    """
+    booking_ids: Optional[List[int]] = Field(None, min_length=1, json_schema_extra={"example": [101, 102]})
+    zone_id: Optional[int] = None
+    date_from: Optional[date] = None
+    date_to: Optional[date] = None
+    all: bool = False
+
+    @model_validator(mode="after")
+    def check_selection(self) -> "BookingBulkCancel":
+        has_filter = (
+            self.zone_id is not None or self.date_from is not None or self.date_to is not None
+        )
+        if self.booking_ids is not None and (has_filter or self.all):
+            raise ValueError("booking_ids cannot be combined with zone_id/date_from/date_to/all")
+        if self.all and has_filter:
+            raise ValueError("all cannot be combined with zone_id/date_from/date_to")
+        if self.booking_ids is None and not has_filter and not self.all:
+            raise ValueError("booking_ids, zone_id/date_from/date_to or all=true is required")
+        if self.date_from and self.date_to and self.date_from > self.date_to:
+            raise ValueError("date_from must not be after date_to")
+        return self
+
+
 class BookingExtendRequest(BaseModel):
     """
     По факту тело не обязательно, но оставим
@@ -136,12 +239,38 @@ class BookingOut(ORMBase):
     slot_id: int
     zone_name: Optional[str]
     zone_address: Optional[str]
-    start_time: Optional[datetime]
-    end_time: Optional[datetime]
+    start_time: Optional[UTCDatetime]
+    end_time: Optional[UTCDatetime]
     status: str
     cancellation_reason: Optional[str]
-    created_at: datetime
-    updated_at: datetime
+    created_at: UTCDatetime
+    updated_at: UTCDatetime
+
+
+class BookingHistoryPage(BaseModel):
+    items: List[BookingOut]
+    next_cursor: Optional[str] = None
+
+
+class BookingBulkItem(BaseModel):
+    """Результат по одной дате из массового бронирования"""
+    date: date
+    status: str  # "created" | "conflict" | "zone_full" | "no_places"
+    booking: Optional[BookingOut] = None
+    detail: Optional[str] = None
+
+
+class BookingBulkResult(BaseModel):
+    created: int
+    failed: int
+    items: List[BookingBulkItem]
+
+
+class BookingBulkCancelResult(BaseModel):
+    cancelled: int
+    bookings: List[BookingOut]
+    # id из запроса, которые не отменены: брони нет, она чужая или уже не активна
+    skipped: List[int] = []
 
 
 # ============================================================
@@ -154,6 +283,26 @@ class ZoneCloseRequest(BaseModel):
     to_time: datetime = Field(..., json_schema_extra={"example": "2025-02-01T18:00:00"})
 
 
+class ZoneClosureOut(BaseModel):
+    """
+    Закрытие зоны и прогресс рассылки уведомлений.
+    status: "notifying" — уведомления ещё уходят, "completed" или
+    "completed_with_errors" — часть уведомлений доставить не удалось.
+    """
+    id: int
+    zone_id: int
+    reason: str
+    from_time: UTCDatetime
+    to_time: UTCDatetime
+    affected_bookings: int
+    affected_users: int
+    status: str
+    notifications_pending: int
+    notifications_delivered: int
+    notifications_failed: int
+    created_at: UTCDatetime
+
+
 class BookingExtendTimeRequest(BaseModel):
     """
     Запрос на продление брони с указанием времени продления.
@@ -163,20 +312,85 @@ class BookingExtendTimeRequest(BaseModel):
     extend_minutes: int = Field(default=0, ge=0, le=55, json_schema_extra={"example": 0})
 
 
+class SlotGridRequest(BaseModel):
+    """Генерация сетки слотов зоны на интервал дат (включительно)"""
+    date_from: date
+    date_to: date
+
+    @model_validator(mode="after")
+    def check_range(self) -> "SlotGridRequest":
+        if self.date_to < self.date_from:
+            raise ValueError("date_to must not be earlier than date_from")
+        return self
+
+
+class SlotGridResult(BaseModel):
+    zone_id: int
+    places: int
+    days: int
+    created: int  # Новых слотов; уже существующие пропускаются
+
+
+class SlotGcResult(BaseModel):
+    deleted: int
+
+
+class SlotMatrix(BaseModel):
+    """
+    Слоты всех активных мест зоны за интервал дат в колоночном виде.
+    i-й слот: id slot_ids[i], место place_ids[i], начало origin + start_offsets[i]
+    минут, длительность durations[i] минут, свободен — available[i].
+    Слоты упорядочены по месту и времени начала.
+    """
+    zone_id: int
+    origin: UTCDatetime  # Полночь (UTC) первого дня интервала
+    slot_ids: List[int]
+    place_ids: List[int]
+    start_offsets: List[int]
+    durations: List[int]
+    available: List[bool]
+
+
 class ZoneStatistics(BaseModel):
     """Статистика по зоне"""
     zone_id: int
     zone_name: str
     is_active: bool
     closure_reason: Optional[str]
-    closed_until: Optional[datetime]
+    closed_until: Optional[UTCDatetime]
     active_bookings: int
     cancelled_bookings: int
-    current_occupancy: int  # Сколько человек сейчас в зоне
+    current_occupancy: int = Field(description=CURRENT_OCCUPANCY)
 
 
 class GlobalStatistics(BaseModel):
     """Общая статистика по всем зонам"""
     total_active_bookings: int
     total_cancelled_bookings: int
-    users_in_coworking_now: int
+    users_in_coworking_now: int = Field(
+        description="Разные пользователи с активной бронью, идущей сейчас, по всем зонам"
+    )
+
+
+class ZoneUtilization(BaseModel):
+    """
+    Тепловая карта загрузки зоны: матрицы 7x24, строка — день недели
+    (0 — понедельник), столбец — час местного времени.
+    """
+    zone_id: int
+    zone_name: str
+    places: int  # Активные места зоны сейчас — знаменатель utilization
+    booked_minutes: List[List[int]]
+    bookings: List[List[int]]
+    cancellations: List[List[int]]
+    # booked_minutes / (places * 60 * число таких часов в интервале)
+    utilization: List[List[float]]
+
+
+class UtilizationOut(BaseModel):
+    """Загрузка зон за интервал дат из почасовой свёртки"""
+    date_from: date
+    date_to: date
+    timezone: str
+    rolled_up_to: Optional[UTCDatetime]  # Учтены брони, изменённые до этого момента
+    zones: List[ZoneUtilization]
@@ -0,0 +1,155 @@
+# services/booking-service/app/slot_grid.py
+"""
+Сетка слотов зон.
+
+Раньше слоты создавались по одному внутри транзакции брони, и slots
+заполнялась произвольными невыровненными интервалами. Здесь сетка зоны
+генерируется заранее: для каждого активного места и каждого дня интервала —
+ячейки по zone.slot_minutes от zone.opens_at до zone.closes_at (UTC).
+Вставка идёт многострочными INSERT ... ON CONFLICT DO NOTHING по
+uq_place_time_interval, поэтому повторный запуск безопасен. Бронь ячейки
+(по slot_id или по времени, совпадающему с ячейкой) только переключает
+is_available у существующей строки.
+
+Сборщик мусора удаляет прошедшие слоты без броней (им же пользуется архивация).
+
+Запуск вручную:
+    python slot_grid.py generate --zone 1 --from 2026-11-01 --to 2026-11-30
+    python slot_grid.py gc
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+from datetime import date, datetime, timedelta, timezone
+from typing import Iterator, List, Optional
+
+from sqlalchemy import and_, delete, exists, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+
+import models
+from config import settings
+from db import SessionLocal
+
+
+class SlotGridError(Exception):
+    pass
+
+
+def grid_cells(zone: models.Zone, day: date) -> Iterator[tuple]:
+    """Ячейки (start, end) сетки зоны на один день."""
+    step = timedelta(minutes=zone.slot_minutes)
+    start = datetime.combine(day, zone.opens_at, tzinfo=timezone.utc)
+    close = datetime.combine(day, zone.closes_at, tzinfo=timezone.utc)
+    while start + step <= close:
+        yield start, start + step
+        start += step
+
+
+def _insert(session: AsyncSession):
+    dialect = session.bind.dialect.name
+    if dialect == "postgresql":
+        return postgresql.insert(models.Slot)
+    if dialect == "sqlite":
+        return sqlite.insert(models.Slot)
+    raise SlotGridError(f"ON CONFLICT не поддерживается для {dialect}")
+
+
+async def generate_slot_grid(
+    session: AsyncSession,
+    zone_id: int,
+    date_from: date,
+    date_to: date,
+) -> Optional[tuple]:
+    """
+    Генерирует сетку зоны на [date_from, date_to].
+    Возвращает (число мест, число новых слотов) или None, если зоны нет.
+    """
+    zone = await session.get(models.Zone, zone_id)
+    if zone is None:
+        return None
+    days = (date_to - date_from).days + 1
+    if days > settings.SLOT_GRID_MAX_DAYS:
+        raise SlotGridError(
+            f"Сетку можно сгенерировать не более чем на {settings.SLOT_GRID_MAX_DAYS} дней"
+        )
+    result = await session.execute(
+        select(models.Place.id).where(
+            and_(
+                models.Place.zone_id == zone_id,
+                models.Place.is_active.is_(True),
+            )
+        )
+    )
+    place_ids = list(result.scalars().all())
+    cells = [
+        cell
+        for offset in range(days)
+        for cell in grid_cells(zone, date_from + timedelta(days=offset))
+    ]
+    rows: List[dict] = [
+        {"place_id": place_id, "start_time": start, "end_time": end, "is_available": True}
+        for place_id in place_ids
+        for start, end in cells
+    ]
+    created = 0
+    batch = settings.SLOT_GRID_BATCH_SIZE
+    for i in range(0, len(rows), batch):
+        stmt = _insert(session).values(rows[i:i + batch]).on_conflict_do_nothing(
+            index_elements=["place_id", "start_time", "end_time"]
+        )
+        created += (await session.execute(stmt)).rowcount or 0
+    await session.commit()
+    return len(place_ids), created
+
+
+async def collect_unused_slots(
+    session: AsyncSession,
+    before: Optional[datetime] = None,
+) -> int:
+    """
+    Удаляет слоты, закончившиеся до before, на которые нет броней. Флаг
+    is_available не смотрим: слот брони, перенесённой в архив, занят, но
+    ссылок на него уже нет. Единственный сборщик слотов — для
+    POST /admin/slots/gc и для архивации (archive.py).
+    """
+    before = before or datetime.now(timezone.utc)
+    result = await session.execute(
+        delete(models.Slot)
+        .where(
+            and_(
+                models.Slot.end_time < before,
+                ~exists().where(models.Booking.slot_id == models.Slot.id),
+            )
+        )
+        .execution_options(synchronize_session=False)
+    )
+    await session.commit()
+    return result.rowcount or 0
+
+
+async def _main(args: argparse.Namespace) -> None:
+    async with SessionLocal() as session:
+        if args.command == "generate":
+            outcome = await generate_slot_grid(
+                session, args.zone, args.date_from, args.date_to
+            )
+            if outcome is None:
+                print(f"Зона {args.zone} не найдена")
+            else:
+                print(f"Мест: {outcome[0]}, создано слотов: {outcome[1]}")
+        else:
+            deleted = await collect_unused_slots(session)
+            print(f"Удалено неиспользованных слотов: {deleted}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Сетка слотов зон")
+    commands = parser.add_subparsers(dest="command", required=True)
+    generate = commands.add_parser("generate", help="Сгенерировать сетку зоны")
+    generate.add_argument("--zone", type=int, required=True)
+    generate.add_argument("--from", dest="date_from", type=date.fromisoformat, required=True)
+    generate.add_argument("--to", dest="date_to", type=date.fromisoformat, required=True)
+    commands.add_parser("gc", help="Удалить прошедшие неиспользованные слоты")
+    asyncio.run(_main(parser.parse_args()))
@@ -4,6 +4,8 @@ from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_asyn
 from typing import AsyncGenerator
 
 from main import app
+from catalogue import catalogue
+from dashboard import dashboard
 from db import get_session
 from models import Base
 
@@ -41,6 +43,9 @@ async def test_session(test_engine) -> AsyncGenerator[AsyncSession, None]:
         class_=AsyncSession,
     )
     
+    # Каталог зон и мест общий на процесс — снимок прошлого теста не нужен
+    catalogue.invalidate()
+    dashboard.invalidate()
     async with TestSessionLocal() as session:
         yield session
 
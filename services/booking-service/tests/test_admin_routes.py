@@ -64,6 +64,30 @@ async def test_update_zone_admin_endpoint(test_client, test_session):
     assert data["is_active"] is False
 
 
+@pytest.mark.asyncio
+async def test_update_zone_rejects_inverted_hours(test_client, test_session):
+    """PATCH проверяет часы работы после слияния с текущими значениями зоны"""
+    zone = models.Zone(name="Hours Zone", address="Addr", is_active=True)
+    test_session.add(zone)
+    await test_session.commit()
+    headers = {"X-User-Id": "1", "X-User-Role": "admin"}
+
+    # Зона открыта 08:00-22:00: одна граница раньше другой
+    response = await test_client.patch(
+        f"/admin/zones/{zone.id}", json={"closes_at": "07:00"}, headers=headers
+    )
+    assert response.status_code == 422
+    response = await test_client.patch(
+        f"/admin/zones/{zone.id}", json={"opens_at": "22:00"}, headers=headers
+    )
+    assert response.status_code == 422
+    response = await test_client.patch(
+        f"/admin/zones/{zone.id}", json={"opens_at": "06:00", "closes_at": "07:00"}, headers=headers
+    )
+    assert response.status_code == 200
+    assert response.json()["closes_at"] == "07:00:00"
+
+
 @pytest.mark.asyncio
 async def test_delete_zone_admin_endpoint(test_client, test_session):
     """Test DELETE /admin/zones/{zone_id} endpoint"""
@@ -0,0 +1,210 @@
+"""
+Тесты почасовой свёртки загрузки зон и тепловых карт (analytics.py).
+"""
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import select
+
+import analytics
+import models
+
+ADMIN = {"X-User-Id": "1", "X-User-Role": "admin"}
+# Понедельник, 10:00 по Москве
+MONDAY_10_MSK_UTC = datetime(2026, 10, 12, 7, 0)
+
+
+async def _zone(session, places=2):
+    zone = models.Zone(name="Analytics Zone", address="Addr", is_active=True)
+    session.add(zone)
+    await session.flush()
+    place_rows = [
+        models.Place(zone_id=zone.id, name=f"Место {i + 1}", is_active=True)
+        for i in range(places)
+    ]
+    session.add_all(place_rows)
+    await session.flush()
+    return zone, place_rows
+
+
+async def _booking(session, place, start, end, status="active", user_id=1, updated_at=None):
+    slot = models.Slot(place_id=place.id, start_time=start, end_time=end, is_available=False)
+    session.add(slot)
+    await session.flush()
+    booking = models.Booking(
+        user_id=user_id,
+        slot_id=slot.id,
+        status=status,
+        start_time=start,
+        end_time=end,
+        updated_at=updated_at or datetime.utcnow() - timedelta(minutes=5),
+    )
+    session.add(booking)
+    await session.flush()
+    return booking
+
+
+async def _usage(session):
+    rows = (await session.execute(
+        select(
+            models.ZoneHourlyUsage.hour,
+            models.ZoneHourlyUsage.booked_minutes,
+            models.ZoneHourlyUsage.bookings,
+            models.ZoneHourlyUsage.cancellations,
+        ).order_by(models.ZoneHourlyUsage.hour)
+    )).all()
+    return [tuple(row) for row in rows]
+
+
+@pytest.mark.asyncio
+async def test_rollup_splits_bookings_by_hour(test_session):
+    """Минуты брони делятся по часам, бронь и отмена считаются в часе начала"""
+    zone, places = await _zone(test_session)
+    start = MONDAY_10_MSK_UTC
+    await _booking(test_session, places[0], start + timedelta(minutes=30), start + timedelta(hours=2))
+    await _booking(test_session, places[1], start, start + timedelta(hours=1), user_id=2)
+    await _booking(
+        test_session, places[1], start + timedelta(hours=1), start + timedelta(hours=2),
+        status="cancelled", user_id=3,
+    )
+    await test_session.commit()
+
+    assert await analytics.refresh_rollups(test_session, lag_seconds=0) == 3
+    assert await _usage(test_session) == [
+        (start, 90, 2, 0),
+        (start + timedelta(hours=1), 60, 0, 1),
+    ]
+    # Без новых изменений проход ничего не читает
+    assert await analytics.refresh_rollups(test_session, lag_seconds=0) == 0
+
+
+@pytest.mark.asyncio
+async def test_rollup_is_incremental(test_session):
+    """Проход учитывает только брони после водяного знака; отмена правит уже учтённый час"""
+    zone, places = await _zone(test_session)
+    start = MONDAY_10_MSK_UTC
+    base = datetime.utcnow() - timedelta(minutes=10)
+    bookings = [
+        await _booking(
+            test_session, places[0], start + timedelta(hours=i), start + timedelta(hours=i + 1),
+            updated_at=base + timedelta(seconds=i),
+        )
+        for i in range(5)
+    ]
+    await test_session.commit()
+
+    # Пачки по 2 брони, каждая — своя транзакция
+    assert await analytics.refresh_rollups(test_session, batch_size=2, lag_seconds=0) == 5
+    assert [row[1] for row in await _usage(test_session)] == [60] * 5
+
+    # Отмена одной брони: пересчитывается только её час.
+    # updated_at явно — в SQLite CURRENT_TIMESTAMP с точностью до секунды
+    bookings[2].status = "cancelled"
+    bookings[2].updated_at = datetime.utcnow() - timedelta(minutes=1)
+    await test_session.commit()
+    assert await analytics.refresh_rollups(test_session, lag_seconds=0) == 1
+    usage = await _usage(test_session)
+    assert usage[2] == (start + timedelta(hours=2), 0, 0, 1)
+    assert [row[1] for row in usage] == [60, 60, 0, 60, 60]
+
+    # Изменения моложе ROLLUP_LAG_SECONDS ждут следующего прохода
+    bookings[0].status = "cancelled"
+    bookings[0].updated_at = datetime.utcnow()
+    await test_session.commit()
+    assert await analytics.refresh_rollups(test_session, lag_seconds=60) == 0
+    assert (await _usage(test_session))[0][1] == 60
+
+
+@pytest.mark.asyncio
+async def test_rollup_drops_empty_hours(test_session):
+    """Час, где после пересчёта ничего не осталось, удаляется из свёртки"""
+    zone, places = await _zone(test_session)
+    booking = await _booking(
+        test_session, places[0], MONDAY_10_MSK_UTC, MONDAY_10_MSK_UTC + timedelta(hours=1)
+    )
+    await test_session.commit()
+    await analytics.refresh_rollups(test_session, lag_seconds=0)
+    assert len(await _usage(test_session)) == 1
+
+    await test_session.delete(booking)
+    await test_session.commit()
+    # Удалённая бронь сама не попадает в проход — час пересчитывает отменённая
+    # бронь, задевающая его (отмена считается в часе своего начала)
+    await _booking(
+        test_session, places[1], MONDAY_10_MSK_UTC - timedelta(minutes=30),
+        MONDAY_10_MSK_UTC + timedelta(minutes=30), status="cancelled",
+        updated_at=datetime.utcnow() - timedelta(minutes=1),
+    )
+    await test_session.commit()
+    await analytics.refresh_rollups(test_session, lag_seconds=0)
+    assert await _usage(test_session) == [(MONDAY_10_MSK_UTC - timedelta(hours=1), 0, 0, 1)]
+
+
+@pytest.mark.asyncio
+async def test_utilization_heatmap(test_client, test_session):
+    """Тепловая карта: день недели и час по Москве, доля занятых место-минут"""
+    zone, places = await _zone(test_session, places=2)
+    start = MONDAY_10_MSK_UTC
+    await _booking(test_session, places[0], start, start + timedelta(hours=1))
+    await _booking(
+        test_session, places[1], start + timedelta(days=2), start + timedelta(days=2, minutes=30),
+        status="cancelled", user_id=2,
+    )
+    await test_session.commit()
+    await analytics.refresh_rollups(test_session, lag_seconds=0)
+
+    response = await test_client.get(
+        "/admin/analytics/utilization",
+        params={"from": "2026-10-12", "to": "2026-10-18"},
+        headers=ADMIN,
+    )
+    assert response.status_code == 200
+    data = response.json()
+    assert data["timezone"] == "Europe/Moscow"
+    assert data["rolled_up_to"] is not None
+    [heatmap] = data["zones"]
+    assert heatmap["zone_id"] == zone.id
+    assert heatmap["places"] == 2
+    assert len(heatmap["utilization"]) == 7
+    assert all(len(row) == 24 for row in heatmap["utilization"])
+    assert heatmap["booked_minutes"][0][10] == 60
+    assert heatmap["bookings"][0][10] == 1
+    assert heatmap["utilization"][0][10] == 0.5  # 60 из 2 мест * 60 минут
+    assert heatmap["cancellations"][2][10] == 1
+    assert sum(map(sum, heatmap["booked_minutes"])) == 60
+
+    # Две недели: каждый час встречается дважды, доля вдвое меньше
+    response = await test_client.get(
+        "/admin/analytics/utilization",
+        params={"from": "2026-10-12", "to": "2026-10-25", "zone_id": zone.id},
+        headers=ADMIN,
+    )
+    assert response.json()["zones"][0]["utilization"][0][10] == 0.25
+
+    # В UTC та же бронь — понедельник, 7:00
+    response = await test_client.get(
+        "/admin/analytics/utilization",
+        params={"from": "2026-10-12", "to": "2026-10-18", "tz": "UTC"},
+        headers=ADMIN,
+    )
+    assert response.json()["zones"][0]["booked_minutes"][0][7] == 60
+
+
+@pytest.mark.asyncio
+async def test_utilization_validation(test_client, test_session):
+    zone, _ = await _zone(test_session)
+    await test_session.commit()
+
+    def get(**params):
+        return test_client.get("/admin/analytics/utilization", params=params, headers=ADMIN)
+
+    assert (await get(**{"from": "2026-10-12", "to": "2026-10-11"})).status_code == 400
+    assert (await get(**{"from": "2025-01-01", "to": "2026-10-11"})).status_code == 400
+    assert (await get(**{"from": "2026-10-12", "to": "2026-10-18", "tz": "Mars/Base"})).status_code == 400
+    assert (await get(**{"from": "2026-10-12", "to": "2026-10-18", "zone_id": zone.id + 100})).status_code == 404
+    response = await test_client.get(
+        "/admin/analytics/utilization",
+        params={"from": "2026-10-12", "to": "2026-10-18"},
+        headers={"X-User-Id": "1", "X-User-Role": "user"},
+    )
+    assert response.status_code == 403
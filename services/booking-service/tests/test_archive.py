@@ -0,0 +1,93 @@
+"""
+Тесты архивации старых броней.
+"""
+import pytest
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import func, select
+
+import archive
+import models
+
+HEADERS = {"X-User-Id": "1", "X-User-Role": "user"}
+NOW = datetime(2026, 10, 15, 12, 0, tzinfo=timezone.utc)
+
+
+async def _booking(test_session, place, start_time, status="active"):
+    slot = models.Slot(
+        place_id=place.id,
+        start_time=start_time,
+        end_time=start_time + timedelta(hours=2),
+        is_available=status != "active",
+    )
+    test_session.add(slot)
+    await test_session.flush()
+    booking = models.Booking(user_id=1, slot_id=slot.id, status=status)
+    test_session.add(booking)
+    await test_session.flush()
+    return booking
+
+
+async def _setup(test_session):
+    zone = models.Zone(name="Test Zone", address="Test Addr", is_active=True)
+    test_session.add(zone)
+    await test_session.flush()
+    place = models.Place(zone_id=zone.id, name="Place 1", is_active=True)
+    test_session.add(place)
+    await test_session.flush()
+
+    old_active = await _booking(test_session, place, NOW - timedelta(days=250))
+    old_cancelled = await _booking(test_session, place, NOW - timedelta(days=300), status="cancelled")
+    recent = await _booking(test_session, place, NOW - timedelta(days=20))
+    await test_session.commit()
+    return old_active, old_cancelled, recent
+
+
+def test_archive_cutoff_is_month_aligned():
+    """Граница архивации — начало месяца, N месяцев назад"""
+    assert archive.archive_cutoff(NOW, 6) == datetime(2026, 4, 1, tzinfo=timezone.utc)
+    assert archive.archive_cutoff(datetime(2026, 2, 10, tzinfo=timezone.utc), 3) == datetime(
+        2025, 11, 1, tzinfo=timezone.utc
+    )
+
+
+@pytest.mark.asyncio
+async def test_archive_moves_old_bookings_and_slots(test_session):
+    """Старые брони переезжают в архив пачками, их слоты удаляются"""
+    old_active, old_cancelled, recent = await _setup(test_session)
+
+    outcome = await archive.archive_old_bookings(test_session, months=6, batch_size=1, now=NOW)
+
+    assert outcome.moved_bookings == 2
+    assert outcome.deleted_slots == 2
+
+    live_ids = (await test_session.execute(select(models.Booking.id))).scalars().all()
+    assert live_ids == [recent.id]
+    archived = (await test_session.execute(
+        select(models.BookingArchive).order_by(models.BookingArchive.id)
+    )).scalars().all()
+    assert [b.id for b in archived] == sorted([old_active.id, old_cancelled.id])
+    assert {b.status for b in archived} == {"active", "cancelled"}
+    assert all(b.zone_id is not None for b in archived)
+
+    slots_left = (await test_session.execute(select(func.count(models.Slot.id)))).scalar()
+    assert slots_left == 1
+
+
+@pytest.mark.asyncio
+async def test_history_reads_archive_on_demand(test_client, test_session):
+    """История показывает архив только с include_archived=true"""
+    old_active, old_cancelled, recent = await _setup(test_session)
+    await archive.archive_old_bookings(test_session, months=6, now=NOW)
+
+    response = await test_client.get("/bookings/history", headers=HEADERS)
+    assert response.status_code == 200
+    assert [b["id"] for b in response.json()] == [recent.id]
+
+    response = await test_client.get(
+        "/bookings/history", params={"include_archived": "true"}, headers=HEADERS
+    )
+    assert response.status_code == 200
+    assert sorted(b["id"] for b in response.json()) == sorted(
+        [old_active.id, old_cancelled.id, recent.id]
+    )
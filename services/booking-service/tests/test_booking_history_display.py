@@ -7,6 +7,7 @@ import pytest
 from datetime import datetime, timedelta
 
 import models
+from timezone_utils import as_utc
 
 
 @pytest.mark.asyncio
@@ -144,9 +145,11 @@ async def test_extended_booking_shows_time_range(test_client, test_session):
     start = datetime.fromisoformat(extended_booking['start_time'].replace('Z', '+00:00'))
     end = datetime.fromisoformat(extended_booking['end_time'].replace('Z', '+00:00'))
     
-    # Время должно быть примерно равно slot2 (с учётом временных зон)
-    assert abs((start - slot2.start_time).total_seconds()) < 60
-    assert abs((end - slot2.end_time).total_seconds()) < 60
+    # Время должно быть примерно равно slot2 (API отдаёт UTC со смещением,
+    # атрибуты моделей — naive UTC)
+    assert start.utcoffset() == timedelta(0)
+    assert abs((start - as_utc(slot2.start_time)).total_seconds()) < 60
+    assert abs((end - as_utc(slot2.end_time)).total_seconds()) < 60
     
     # Проверяем, что в истории обе брони имеют правильное время
     history_response = await test_client.get(
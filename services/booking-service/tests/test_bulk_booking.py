@@ -0,0 +1,153 @@
+"""
+Тесты массового бронирования (POST /bookings/bulk).
+"""
+import pytest
+from datetime import date, timedelta
+
+import crud
+import models
+import schemas
+
+HEADERS = {"X-User-Id": "1", "X-User-Role": "user"}
+
+
+async def _zone_with_places(test_session, places_count):
+    zone = models.Zone(name="Test Zone", address="Test Addr", is_active=True)
+    test_session.add(zone)
+    await test_session.flush()
+    for i in range(places_count):
+        test_session.add(models.Place(zone_id=zone.id, name=f"Place {i + 1}", is_active=True))
+    await test_session.commit()
+    return zone
+
+
+@pytest.mark.asyncio
+async def test_bulk_booking_explicit_dates(test_client, test_session):
+    """Серия броней по явному списку дат создаётся целиком"""
+    zone = await _zone_with_places(test_session, 1)
+    first_day = date.today() + timedelta(days=1)
+    days = [first_day + timedelta(days=i) for i in range(3)]
+
+    response = await test_client.post(
+        "/bookings/bulk",
+        json={
+            "zone_id": zone.id,
+            "start_hour": 10,
+            "start_minute": 0,
+            "end_hour": 12,
+            "end_minute": 0,
+            "dates": [d.isoformat() for d in days],
+        },
+        headers=HEADERS,
+    )
+    assert response.status_code == 200
+    data = response.json()
+    assert data["created"] == 3
+    assert data["failed"] == 0
+    assert [item["status"] for item in data["items"]] == ["created"] * 3
+    assert all(item["booking"]["user_id"] == 1 for item in data["items"])
+
+
+@pytest.mark.asyncio
+async def test_bulk_booking_recurrence_weekdays(test_session):
+    """Правило повторения разворачивается только в указанные дни недели"""
+    zone = await _zone_with_places(test_session, 2)
+    monday = date.today() - timedelta(days=date.today().weekday()) + timedelta(weeks=1)
+
+    result = await crud.create_bookings_bulk(
+        test_session,
+        user_id=1,
+        data=schemas.BookingBulkCreate(
+            zone_id=zone.id,
+            start_hour=9,
+            start_minute=0,
+            end_hour=10,
+            end_minute=30,
+            recurrence=schemas.BookingRecurrence(
+                date_from=monday,
+                date_to=monday + timedelta(days=13),
+                weekdays=[0, 2, 4],
+            ),
+        ),
+    )
+    assert result.created == 6
+    assert all(item.date.weekday() in (0, 2, 4) for item in result.items)
+
+
+@pytest.mark.asyncio
+async def test_bulk_booking_partial_success(test_session):
+    """Даты с конфликтом или без мест отчитываются отдельно, остальные создаются"""
+    zone = await _zone_with_places(test_session, 1)
+    first_day = date.today() + timedelta(days=1)
+    busy_day = first_day + timedelta(days=1)
+    full_day = first_day + timedelta(days=2)
+
+    # У пользователя 1 уже есть бронь на busy_day
+    await crud.create_booking_by_time_range(
+        test_session,
+        user_id=1,
+        booking_in=schemas.BookingCreateTimeRange(
+            zone_id=zone.id, date=busy_day.isoformat(),
+            start_hour=11, start_minute=0, end_hour=13, end_minute=0,
+        ),
+    )
+    # Единственное место на full_day занято другим пользователем
+    await crud.create_booking_by_time_range(
+        test_session,
+        user_id=2,
+        booking_in=schemas.BookingCreateTimeRange(
+            zone_id=zone.id, date=full_day.isoformat(),
+            start_hour=10, start_minute=0, end_hour=12, end_minute=0,
+        ),
+    )
+
+    result = await crud.create_bookings_bulk(
+        test_session,
+        user_id=1,
+        data=schemas.BookingBulkCreate(
+            zone_id=zone.id,
+            start_hour=10,
+            start_minute=0,
+            end_hour=12,
+            end_minute=0,
+            dates=[first_day, busy_day, full_day],
+        ),
+    )
+    statuses = {item.date: item.status for item in result.items}
+    assert statuses == {
+        first_day: "created",
+        busy_day: "conflict",
+        full_day: "zone_full",
+    }
+    assert result.created == 1
+    assert result.failed == 2
+
+
+@pytest.mark.asyncio
+async def test_bulk_booking_validation_errors(test_client, test_session):
+    """Неверный интервал и отсутствие источника дат отклоняются"""
+    zone = await _zone_with_places(test_session, 1)
+    day = (date.today() + timedelta(days=1)).isoformat()
+
+    response = await test_client.post(
+        "/bookings/bulk",
+        json={
+            "zone_id": zone.id,
+            "start_hour": 12, "start_minute": 0,
+            "end_hour": 10, "end_minute": 0,
+            "dates": [day],
+        },
+        headers=HEADERS,
+    )
+    assert response.status_code == 400
+
+    response = await test_client.post(
+        "/bookings/bulk",
+        json={
+            "zone_id": zone.id,
+            "start_hour": 10, "start_minute": 0,
+            "end_hour": 12, "end_minute": 0,
+        },
+        headers=HEADERS,
+    )
+    assert response.status_code == 422
@@ -0,0 +1,209 @@
+"""
+Тесты массовой отмены броней (POST /bookings/cancel/bulk) и общего с ней
+пути одиночной отмены.
+"""
+import pytest
+from datetime import datetime, timedelta
+
+from sqlalchemy import event, select
+
+import crud
+import models
+import outbox
+import schemas
+from config import settings
+
+USER = {"X-User-Id": "1", "X-User-Role": "user"}
+
+
+async def _zone(session, name, user_id, hours, start=None, status="active"):
+    """Зона с бронями пользователя: по одной на каждый сдвиг из hours (в часах от start)."""
+    start = start or datetime.utcnow().replace(minute=0, second=0, microsecond=0) + timedelta(days=1)
+    zone = models.Zone(name=name, address="Addr", is_active=True)
+    session.add(zone)
+    await session.flush()
+    place = models.Place(zone_id=zone.id, name="Место 1", is_active=True)
+    session.add(place)
+    await session.flush()
+    bookings = []
+    for hour in hours:
+        slot = models.Slot(
+            place_id=place.id,
+            start_time=start + timedelta(hours=hour),
+            end_time=start + timedelta(hours=hour + 1),
+            is_available=False,
+        )
+        session.add(slot)
+        await session.flush()
+        booking = models.Booking(
+            user_id=user_id, slot_id=slot.id, zone_name=zone.name, status=status
+        )
+        session.add(booking)
+        bookings.append(booking)
+    await session.commit()
+    return zone, bookings
+
+
+async def _slots_available(session, bookings):
+    result = await session.execute(
+        select(models.Slot.is_available)
+        .where(models.Slot.id.in_([booking.slot_id for booking in bookings]))
+    )
+    return result.scalars().all()
+
+
+@pytest.mark.asyncio
+async def test_bulk_cancel_by_ids(test_client, test_session):
+    """Отменяются только свои активные брони из списка, остальные id — в skipped"""
+    _, mine = await _zone(test_session, "Зона А", 1, range(3))
+    _, foreign = await _zone(test_session, "Зона Б", 2, range(1))
+    _, done = await _zone(test_session, "Зона В", 1, range(1), status="cancelled")
+
+    ids = [mine[0].id, mine[2].id, foreign[0].id, done[0].id, 999_999]
+    response = await test_client.post(
+        "/bookings/cancel/bulk", json={"booking_ids": ids}, headers=USER
+    )
+    assert response.status_code == 200
+    data = response.json()
+    assert data["cancelled"] == 2
+    assert [b["id"] for b in data["bookings"]] == [mine[0].id, mine[2].id]
+    assert {b["status"] for b in data["bookings"]} == {"cancelled"}
+    assert data["skipped"] == [foreign[0].id, done[0].id, 999_999]
+
+    assert await _slots_available(test_session, [mine[0], mine[2]]) == [True, True]
+    assert await _slots_available(test_session, [mine[1], foreign[0]]) == [False, False]
+
+
+@pytest.mark.asyncio
+async def test_bulk_cancel_future_bookings_in_zone(test_client, test_session):
+    """Фильтр: будущие брони в зоне; идущие и прошедшие брони не трогаются"""
+    now = datetime.utcnow().replace(second=0, microsecond=0)
+    zone_a, past = await _zone(test_session, "Зона А", 1, [-30, 0], start=now - timedelta(minutes=30))
+    _, future = await _zone(test_session, "Зона А2", 1, range(2))
+    future_a = []
+    place = (await crud.get_places_by_zone(test_session, zone_a.id))[0]
+    for days in (1, 3):
+        slot = models.Slot(
+            place_id=place.id,
+            start_time=now + timedelta(days=days),
+            end_time=now + timedelta(days=days, hours=1),
+            is_available=False,
+        )
+        test_session.add(slot)
+        await test_session.flush()
+        booking = models.Booking(user_id=1, slot_id=slot.id, status="active")
+        test_session.add(booking)
+        future_a.append(booking)
+    await test_session.commit()
+
+    response = await test_client.post(
+        "/bookings/cancel/bulk", json={"zone_id": zone_a.id}, headers=USER
+    )
+    data = response.json()
+    assert data["cancelled"] == 2
+    assert [b["id"] for b in data["bookings"]] == [b.id for b in future_a]
+    assert data["skipped"] == []
+
+    statuses = (await test_session.execute(
+        select(models.Booking.id, models.Booking.status)
+        .where(models.Booking.id.in_([b.id for b in past + future]))
+    )).all()
+    assert {status for _, status in statuses} == {"active"}
+
+    # all=true — все оставшиеся будущие брони пользователя,
+    # с интервалом дат — только попавшие в него
+    tomorrow = (datetime.utcnow() + timedelta(days=1)).date()
+    response = await test_client.post(
+        "/bookings/cancel/bulk",
+        json={"date_from": tomorrow.isoformat(), "date_to": tomorrow.isoformat()},
+        headers=USER,
+    )
+    assert response.json()["cancelled"] == sum(
+        1 for b in future if b.start_time.date() == tomorrow
+    )
+    response = await test_client.post("/bookings/cancel/bulk", json={"all": True}, headers=USER)
+    assert response.json()["cancelled"] == sum(
+        1 for b in future if b.start_time.date() != tomorrow
+    )
+
+
+@pytest.mark.asyncio
+async def test_bulk_cancel_outbox_summary_per_zone(test_session):
+    """Одно сводное событие outbox на зону вместо события на каждую бронь"""
+    _, zone_a = await _zone(test_session, "Зона А", 1, range(3))
+    _, zone_b = await _zone(test_session, "Зона Б", 1, range(2))
+
+    result = await crud.cancel_bookings_bulk(
+        test_session, 1,
+        schemas.BookingBulkCancel(booking_ids=[b.id for b in zone_a + zone_b]),
+    )
+    assert result.cancelled == 5
+    events = (await test_session.execute(
+        select(models.OutboxEvent).order_by(models.OutboxEvent.id)
+    )).scalars().all()
+    assert [e.event_type for e in events] == [outbox.BOOKINGS_BULK_CANCELLED] * 2
+    assert {e.payload["zone_name"]: len(e.payload["intervals"]) for e in events} == {
+        "Зона А": 3, "Зона Б": 2,
+    }
+
+
+@pytest.mark.asyncio
+async def test_bulk_cancel_validation(test_client, test_session, monkeypatch):
+    response = await test_client.post(
+        "/bookings/cancel/bulk", json={"booking_ids": [1], "zone_id": 1}, headers=USER
+    )
+    assert response.status_code == 422
+    response = await test_client.post(
+        "/bookings/cancel/bulk", json={"booking_ids": []}, headers=USER
+    )
+    assert response.status_code == 422
+    # Пустое тело не означает «отменить всё»
+    for body in ({}, {"all": False}, {"all": True, "zone_id": 1}, {"booking_ids": [1], "all": True}):
+        response = await test_client.post("/bookings/cancel/bulk", json=body, headers=USER)
+        assert response.status_code == 422, body
+    monkeypatch.setattr(settings, "MAX_BULK_CANCEL", 2)
+    response = await test_client.post(
+        "/bookings/cancel/bulk", json={"booking_ids": [1, 2, 3]}, headers=USER
+    )
+    assert response.status_code == 400
+
+
+@pytest.mark.asyncio
+async def test_cancel_statement_count_is_constant(test_session, test_engine):
+    """Одиночная и массовая отмена: два UPDATE ... RETURNING без предварительного SELECT"""
+
+    async def run(coro_factory):
+        statements = []
+
+        def count(conn, cursor, statement, *args):
+            # Строки outbox на SQLite пишутся по одной — их не считаем
+            if not statement.startswith("INSERT INTO outbox"):
+                statements.append(statement.lstrip().upper())
+
+        event.listen(test_engine.sync_engine, "before_cursor_execute", count)
+        try:
+            await coro_factory()
+        finally:
+            event.remove(test_engine.sync_engine, "before_cursor_execute", count)
+        return statements
+
+    _, [single] = await _zone(test_session, "Зона А", 1, range(1))
+    statements = await run(lambda: crud.cancel_booking(test_session, 1, single.id))
+    assert single.status == "cancelled"
+    assert [s.split()[0] for s in statements] == ["UPDATE", "UPDATE"]
+
+    _, few = await _zone(test_session, "Зона Б", 1, range(3))
+    _, many = await _zone(test_session, "Зона В", 1, range(30))
+    counts = []
+    for bookings in (few, many):
+        data = schemas.BookingBulkCancel(booking_ids=[b.id for b in bookings])
+        statements = await run(lambda: crud.cancel_bookings_bulk(test_session, 1, data))
+        assert sum(s.startswith("UPDATE BOOKINGS") for s in statements) == 1
+        assert sum(s.startswith("UPDATE SLOTS") for s in statements) == 1
+        counts.append(len(statements))
+    assert counts[0] == counts[1]
+
+    # Повторная отмена ничего не меняет и отдаёт бронь как есть
+    again = await crud.cancel_booking(test_session, 1, single.id)
+    assert again.id == single.id and again.status == "cancelled"
+    assert await crud.cancel_booking(test_session, 2, single.id) is None
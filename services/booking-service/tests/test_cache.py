@@ -0,0 +1,80 @@
+"""
+Тесты async LRU-кэша с TTL и кэша email пользователей.
+"""
+import asyncio
+
+import pytest
+
+import notifications
+from cache import AsyncLRUCache
+
+
+@pytest.mark.asyncio
+async def test_concurrent_misses_share_one_load():
+    """Single-flight: одновременные промахи по ключу — один вызов loader"""
+    cache = AsyncLRUCache(maxsize=10, ttl=60)
+    calls = 0
+
+    async def load():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return "user@example.com"
+
+    results = await asyncio.gather(*(cache.get_or_load(1, load) for _ in range(20)))
+
+    assert results == ["user@example.com"] * 20
+    assert calls == 1
+    assert await cache.get_or_load(1, load) == "user@example.com"
+    assert calls == 1
+    assert cache.stats()["hits"] == 1
+
+
+@pytest.mark.asyncio
+async def test_negative_ttl_errors_and_size_bound():
+    """None кэшируется на negative_ttl, ошибки не кэшируются, размер ограничен"""
+    cache = AsyncLRUCache(maxsize=2, ttl=60, negative_ttl=0)
+    calls = []
+
+    async def missing():
+        calls.append("missing")
+        return None
+
+    assert await cache.get_or_load("x", missing) is None
+    assert await cache.get_or_load("x", missing) is None
+    assert calls == ["missing", "missing"]  # negative_ttl=0 — сразу истекает
+
+    async def broken():
+        raise ConnectionError("user-service недоступен")
+
+    with pytest.raises(ConnectionError):
+        await cache.get_or_load("y", broken)
+
+    async def value(v):
+        return v
+
+    await cache.get_or_load("a", lambda: value(1))
+    await cache.get_or_load("b", lambda: value(2))
+    await cache.get_or_load("a", lambda: value(1))  # a стал свежим
+    await cache.get_or_load("c", lambda: value(3))  # вытесняет b
+    assert cache.stats()["size"] == 2
+    assert await cache.get_or_load("b", lambda: value(20)) == 20
+
+
+@pytest.mark.asyncio
+async def test_user_email_is_fetched_once(monkeypatch):
+    """get_user_email ходит в user-service один раз на пользователя, 404 тоже запоминается"""
+    notifications.user_email_cache.clear()
+    fetched = []
+
+    async def fetch(user_id):
+        fetched.append(user_id)
+        return None if user_id == 404 else f"user{user_id}@example.com"
+
+    monkeypatch.setattr(notifications, "fetch_user_email", fetch)
+
+    for _ in range(3):
+        assert await notifications.get_user_email(5) == "user5@example.com"
+        assert await notifications.get_user_email(404) == ""
+    assert fetched == [5, 404]
+    notifications.user_email_cache.clear()
@@ -0,0 +1,128 @@
+"""
+Тесты каталога зон и мест в памяти (catalogue.py).
+"""
+import pytest
+from datetime import date, timedelta
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+import crud
+import models
+import schemas
+from catalogue import catalogue, load_snapshot
+from models import Base
+
+
+async def _zone(test_session, places=2):
+    zone = models.Zone(name="Catalogue Zone", address="Addr", is_active=True)
+    test_session.add(zone)
+    await test_session.flush()
+    for i in range(places):
+        test_session.add(models.Place(zone_id=zone.id, name=f"Место {i + 1}", is_active=True))
+    await test_session.commit()
+    return zone
+
+
+def _count_catalogue_queries(test_engine):
+    statements = []
+
+    def track(conn, cursor, statement, parameters, context, executemany):
+        if "FROM zones" in statement or "FROM places" in statement:
+            statements.append(statement)
+
+    event.listen(test_engine.sync_engine, "before_cursor_execute", track)
+    return statements
+
+
+@pytest.mark.asyncio
+async def test_booking_path_reads_zone_and_places_from_catalogue(test_engine, test_session):
+    """Брони по времени не запрашивают зоны и места после загрузки каталога"""
+    zone = await _zone(test_session)
+    await crud.get_places_by_zone(test_session, zone.id)
+    statements = _count_catalogue_queries(test_engine)
+    loads = catalogue.loads
+
+    day = (date.today() + timedelta(days=1)).isoformat()
+    for hour in (10, 11):
+        booking = await crud.create_booking_by_time_range(
+            test_session,
+            user_id=hour,
+            booking_in=schemas.BookingCreateTimeRange(
+                zone_id=zone.id, date=day, start_hour=hour, start_minute=0,
+                end_hour=hour + 1, end_minute=0,
+            ),
+        )
+        assert booking is not None
+        assert booking.zone_name == "Catalogue Zone"
+
+    assert statements == []
+    assert catalogue.loads == loads
+
+
+@pytest.mark.asyncio
+async def test_admin_writes_invalidate_catalogue(test_session):
+    """Изменение зоны через crud сразу видно в списках"""
+    zone = await _zone(test_session)
+    assert (await crud.get_zones(test_session))[0].name == "Catalogue Zone"
+
+    await crud.update_zone(test_session, zone.id, schemas.ZoneUpdate(name="Renamed"))
+    assert (await crud.get_zones(test_session))[0].name == "Renamed"
+
+    await crud.delete_zone(test_session, zone.id)
+    assert await crud.get_zones(test_session) == []
+
+
+@pytest.mark.asyncio
+async def test_orm_changes_outside_crud_invalidate_catalogue(test_session):
+    """Место, выключенное напрямую через ORM, пропадает из каталога"""
+    zone = await _zone(test_session, places=3)
+    places = await crud.get_places_by_zone(test_session, zone.id)
+    assert [p.name for p in places] == ["Место 1", "Место 2", "Место 3"]
+
+    place = await test_session.get(models.Place, places[0].id)
+    place.is_active = False
+    await test_session.commit()
+
+    places = await crud.get_places_by_zone(test_session, zone.id)
+    assert [p.name for p in places] == ["Место 2", "Место 3"]
+
+
+@pytest.mark.asyncio
+async def test_load_racing_with_invalidation_is_not_cached(test_session, monkeypatch):
+    """Снимок, загруженный во время сброса, отдаётся, но не запоминается"""
+    await _zone(test_session)
+
+    async def load_and_invalidate(session):
+        snapshot = await load_snapshot(session)
+        catalogue.invalidate()
+        return snapshot
+
+    monkeypatch.setattr("catalogue.load_snapshot", load_and_invalidate)
+    snapshot = await catalogue.get(test_session)
+    assert len(snapshot.zones) == 1
+    assert catalogue.stats()["loaded"] is False
+
+
+@pytest.mark.asyncio
+async def test_snapshot_is_never_built_from_replica(test_engine, test_session, monkeypatch):
+    """Каталог, запрошенный через сессию реплики, загружается с основной базы"""
+    await _zone(test_session)
+    monkeypatch.setattr("catalogue.SessionLocal", async_sessionmaker(
+        bind=test_engine, expire_on_commit=False, class_=AsyncSession,
+    ))
+    # Отставшая реплика: зона ещё не доехала
+    replica_engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    async with replica_engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    replica = async_sessionmaker(
+        bind=replica_engine, expire_on_commit=False, class_=AsyncSession,
+        info={"read_only": True},
+    )
+    try:
+        async with replica() as session:
+            snapshot = await catalogue.get(session)
+    finally:
+        await replica_engine.dispose()
+    assert len(snapshot.zones) == 1
+    assert catalogue.stats()["zones"] == 1
@@ -0,0 +1,154 @@
+"""
+Тесты пула клиентов соседних сервисов на локальных ASGI-заглушках.
+"""
+import asyncio
+
+import httpx
+import pytest
+import pytest_asyncio
+from fastapi import FastAPI, HTTPException
+
+import clients
+import notifications
+
+
+def _user_service(calls):
+    app = FastAPI()
+
+    @app.get("/users/{user_id}")
+    async def get_user(user_id: int):
+        calls.append(user_id)
+        # Первый запрос — временная ошибка, повтор должен пройти
+        if len(calls) == 1:
+            raise HTTPException(status_code=503)
+        if user_id == 404:
+            raise HTTPException(status_code=404)
+        return {"id": user_id, "email": f"user{user_id}@example.com"}
+
+    @app.post("/users/batch")
+    async def get_users_batch(body: dict):
+        calls.append(tuple(body["ids"]))
+        users = [
+            {"id": user_id, "email": f"user{user_id}@example.com"}
+            for user_id in body["ids"]
+            if user_id != 404
+        ]
+        missing = [user_id for user_id in body["ids"] if user_id == 404]
+        return {"users": users, "missing": missing}
+
+    @app.get("/slow")
+    async def slow():
+        await asyncio.sleep(1)
+        return {}
+
+    return app
+
+
+def _notification_service(received):
+    app = FastAPI()
+
+    @app.post("/notify/{kind}")
+    async def notify(kind: str, body: dict):
+        received.append((kind, body))
+        if body.get("fail"):
+            raise HTTPException(status_code=503)
+        return {"ok": True}
+
+    return app
+
+
+@pytest_asyncio.fixture
+async def registry(monkeypatch):
+    calls, received = [], []
+    target = clients.ClientRegistry()
+    target.register(
+        clients.USER_SERVICE,
+        "http://user-service",
+        timeout=0.5,
+        retries=2,
+        transport=httpx.ASGITransport(app=_user_service(calls)),
+    )
+    target.register(
+        clients.NOTIFICATION_SERVICE,
+        "http://notification-service",
+        timeout=0.5,
+        retries=2,
+        transport=httpx.ASGITransport(app=_notification_service(received)),
+    )
+    monkeypatch.setattr(clients, "registry", target)
+    monkeypatch.setattr(clients.settings, "HTTP_RETRY_BACKOFF_SECONDS", 0)
+    notifications.user_email_cache.clear()
+    yield target, calls, received
+    await target.aclose()
+
+
+@pytest.mark.asyncio
+async def test_notifications_reuse_one_client_per_service(registry):
+    """notify_* ходят через клиенты реестра, а не создают новые"""
+    target, calls, received = registry
+
+    await notifications.notify_booking_extended(7, "Zone", "2026-01-01 10:00")
+
+    assert calls == [7, 7]  # 503 и успешный повтор
+    assert [kind for kind, _ in received] == ["email", "push"]
+    assert received[0][1]["email"] == "user7@example.com"
+    assert clients.get_client(clients.USER_SERVICE) is target.get(clients.USER_SERVICE)
+
+    stats = target.stats()
+    assert stats[clients.USER_SERVICE]["requests"] == 2
+    assert stats[clients.USER_SERVICE]["retries"] == 1
+    assert stats[clients.USER_SERVICE]["errors"] == 1
+    assert stats[clients.NOTIFICATION_SERVICE]["requests"] == 2
+
+
+@pytest.mark.asyncio
+async def test_post_is_not_retried(registry):
+    """POST не идемпотентен: ошибка отдаётся сразу, повтор делает outbox"""
+    target, _, received = registry
+    client = target.get(clients.NOTIFICATION_SERVICE)
+
+    response = await client.post("/notify/email", json={"fail": True})
+
+    assert response.status_code == 503
+    assert len(received) == 1
+    assert client.stats.retries == 0
+
+
+@pytest.mark.asyncio
+async def test_timeout_budget_covers_the_whole_call(registry):
+    """Бюджет времени ограничивает вызов целиком, включая повторы"""
+    target, _, _ = registry
+    client = target.get(clients.USER_SERVICE)
+
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+    with pytest.raises(httpx.TimeoutException):
+        await client.get("/slow", timeout=0.1)
+    assert loop.time() - started < 0.5
+    assert client.stats.errors >= 1
+
+
+@pytest.mark.asyncio
+async def test_missing_user_has_no_email(registry):
+    """404 от user-service — пустой email, а не ошибка"""
+    target, calls, _ = registry
+    calls.append(0)  # пропустить искусственную 503
+
+    assert await notifications.get_user_email(404) == ""
+
+
+@pytest.mark.asyncio
+async def test_prefetch_fills_email_cache_with_one_batch_call(registry, monkeypatch):
+    """Email многих пользователей — один POST /users/batch, дальше из кэша"""
+    target, calls, _ = registry
+    monkeypatch.setattr(clients.settings, "USER_BATCH_SIZE", 3)
+
+    await notifications.prefetch_user_emails([1, 2, 404, 3, 1])
+
+    assert calls == [(1, 2, 404), (3,)]
+    assert await notifications.get_user_email(2) == "user2@example.com"
+    assert await notifications.get_user_email(404) == ""
+    assert len(calls) == 2  # GET /users/{id} не понадобился
+
+    await notifications.prefetch_user_emails([1, 2, 3])
+    assert len(calls) == 2
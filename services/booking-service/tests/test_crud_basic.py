@@ -193,6 +193,41 @@ async def test_extend_booking(test_session):
     assert slot_2.is_available is False
 
 
+@pytest.mark.asyncio
+async def test_booking_denormalized_fields_from_slot(test_session):
+    """Test that zone_id and times are copied from the slot when not given"""
+    zone = models.Zone(name="Test Zone", address="Test Addr", is_active=True)
+    test_session.add(zone)
+    await test_session.flush()
+    
+    place = models.Place(zone_id=zone.id, name="Place 1", is_active=True)
+    test_session.add(place)
+    await test_session.flush()
+    
+    start_time = datetime.now() + timedelta(days=1)
+    slot = models.Slot(
+        place_id=place.id,
+        start_time=start_time,
+        end_time=start_time + timedelta(hours=1),
+        is_available=False
+    )
+    test_session.add(slot)
+    await test_session.flush()
+    
+    booking = models.Booking(user_id=1, slot_id=slot.id, status="active")
+    test_session.add(booking)
+    await test_session.commit()
+    
+    assert booking.zone_id == zone.id
+    assert booking.start_time == slot.start_time
+    assert booking.end_time == slot.end_time
+    
+    # History filter by zone works without joining slots/places
+    filters = schemas.BookingHistoryFilters(zone_id=zone.id)
+    history = await crud.get_booking_history(test_session, user_id=1, filters=filters)
+    assert [b.id for b in history] == [booking.id]
+
+
 @pytest.mark.asyncio
 async def test_get_booking_history(test_session):
     """Test retrieving booking history"""
@@ -0,0 +1,112 @@
+"""
+Тесты быстрого пути сериализации (fastjson.py): ответ совпадает с обычным.
+"""
+import pytest
+from datetime import datetime, timedelta, timezone
+
+import fastjson
+import models
+from config import settings
+
+HEADERS = {"X-User-Id": "1", "X-User-Role": "user"}
+ADMIN_HEADERS = {"X-User-Id": "1", "X-User-Role": "admin"}
+
+
+async def _catalogue(test_session):
+    zone = models.Zone(name="Zone", address="Addr", is_active=True)
+    closed = models.Zone(
+        name="Closed", address=None, is_active=False, closure_reason="Ремонт",
+        closed_until=datetime.now(timezone.utc) + timedelta(days=1),
+    )
+    test_session.add_all([zone, closed])
+    await test_session.flush()
+    place = models.Place(zone_id=zone.id, name="Место 1", is_active=True)
+    test_session.add(place)
+    await test_session.flush()
+    start = datetime(2026, 3, 2, 10, 0, 0, 123456)
+    for i in range(3):
+        slot = models.Slot(
+            place_id=place.id,
+            start_time=start + timedelta(hours=i),
+            end_time=start + timedelta(hours=i + 1),
+            is_available=i != 1,
+        )
+        test_session.add(slot)
+        await test_session.flush()
+        test_session.add(models.Booking(
+            user_id=1,
+            slot_id=slot.id,
+            zone_id=zone.id,
+            zone_name=zone.name,
+            zone_address=None,
+            start_time=slot.start_time,
+            end_time=slot.end_time,
+            status="cancelled" if i == 2 else "active",
+            cancellation_reason="Отмена" if i == 2 else None,
+        ))
+    await test_session.commit()
+    return zone.id, place.id
+
+
+@pytest.mark.asyncio
+async def test_fast_path_matches_validated_responses(test_client, test_session, monkeypatch):
+    """Зоны, места, слоты и история: байты быстрого пути = JSON через response_model"""
+    zone_id, place_id = await _catalogue(test_session)
+    urls = [
+        ("/zones", HEADERS),
+        ("/zones?include_inactive=true", HEADERS),
+        (f"/zones/{zone_id}/places", HEADERS),
+        (f"/places/{place_id}/slots?date=2026-03-02", HEADERS),
+        ("/bookings/history", HEADERS),
+        ("/bookings/history?include_archived=true&status=active", HEADERS),
+        ("/admin/zones", ADMIN_HEADERS),
+    ]
+
+    slow = {}
+    for url, headers in urls:
+        response = await test_client.get(url, headers=headers)
+        assert response.status_code == 200, url
+        slow[url] = response.json()
+
+    monkeypatch.setattr(settings, "FAST_JSON_RESPONSES", True)
+    for url, headers in urls:
+        response = await test_client.get(url, headers=headers)
+        assert response.status_code == 200, url
+        assert response.headers["content-type"] == "application/json"
+        assert response.json() == slow[url], url
+    assert len(slow[f"/places/{place_id}/slots?date=2026-03-02"]) == 3
+
+
+def test_fallback_encoder_matches_orjson(monkeypatch):
+    """Без orjson формат дат и времени тот же"""
+    row = {
+        "utc": datetime(2026, 1, 1, 10, 0, 0, 5, tzinfo=timezone.utc),
+        "msk": datetime(2026, 1, 1, 13, 0, tzinfo=timezone(timedelta(hours=3))),
+        "naive": datetime(2026, 1, 1, 10, 0),
+        "opens_at": datetime(2026, 1, 1, 8, 0).time(),
+        "name": "Место",
+        "missing": None,
+    }
+    fast = fastjson.dumps([row])
+    monkeypatch.setattr(fastjson, "orjson", None)
+    assert fastjson.dumps([row]) == fast
+    assert b'"2026-01-01T10:00:00.000005Z"' in fast
+    # naive — время моделей, naive UTC
+    assert b'"naive":"2026-01-01T10:00:00Z"' in fast
+
+
+@pytest.mark.asyncio
+async def test_api_times_carry_utc_offset(test_client, test_session, monkeypatch):
+    """Атрибуты моделей naive UTC, но в ответах время со смещением ("Z") на обоих путях"""
+    await _catalogue(test_session)
+    for fast in (False, True):
+        monkeypatch.setattr(settings, "FAST_JSON_RESPONSES", fast)
+        history = (await test_client.get("/bookings/history", headers=HEADERS)).json()
+        zones = (await test_client.get("/zones?include_inactive=true", headers=HEADERS)).json()
+        values = [b[key] for b in history for key in ("start_time", "end_time", "created_at")]
+        values += [z["created_at"] for z in zones]
+        values += [z["closed_until"] for z in zones if z["closed_until"]]
+        for value in values:
+            assert value.endswith("Z"), value
+            assert datetime.fromisoformat(value).utcoffset() == timedelta(0)
+        assert history[0]["start_time"].startswith("2026-03-02T1")
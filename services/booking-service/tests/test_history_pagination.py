@@ -0,0 +1,134 @@
+"""
+Тесты постраничной истории броней (keyset-курсор) и NDJSON-выгрузки.
+"""
+import json
+
+import pytest
+from datetime import datetime, timedelta
+
+import crud
+import models
+import schemas
+
+HEADERS = {"X-User-Id": "1", "X-User-Role": "user"}
+
+
+async def _create_history(test_session, count, user_id=1):
+    zone = models.Zone(name="Test Zone", address="Test Addr", is_active=True)
+    test_session.add(zone)
+    await test_session.flush()
+
+    place = models.Place(zone_id=zone.id, name="Place 1", is_active=True)
+    test_session.add(place)
+    await test_session.flush()
+
+    base_time = datetime.utcnow()
+    for i in range(count):
+        slot = models.Slot(
+            place_id=place.id,
+            start_time=base_time + timedelta(days=i + 1),
+            end_time=base_time + timedelta(days=i + 1, hours=1),
+            is_available=False,
+        )
+        test_session.add(slot)
+        await test_session.flush()
+        # Пары с одинаковым created_at проверяют сортировку по id при равном created_at
+        test_session.add(models.Booking(
+            user_id=user_id,
+            slot_id=slot.id,
+            status="active",
+            zone_name=zone.name,
+            start_time=slot.start_time,
+            end_time=slot.end_time,
+            created_at=base_time - timedelta(minutes=i // 2),
+        ))
+    await test_session.commit()
+    return zone
+
+
+@pytest.mark.asyncio
+async def test_history_page_walks_all_rows_once(test_session):
+    """Проход по курсору возвращает каждую бронь ровно один раз в порядке истории"""
+    await _create_history(test_session, 7)
+
+    expected = [b.id for b in await crud.get_booking_history(test_session, user_id=1)]
+
+    seen = []
+    cursor = None
+    while True:
+        page = await crud.get_booking_history_page(
+            test_session, user_id=1, limit=3, cursor=cursor
+        )
+        assert len(page.items) <= 3
+        seen.extend(item.id for item in page.items)
+        cursor = page.next_cursor
+        if cursor is None:
+            break
+
+    assert seen == expected
+    assert len(seen) == 7
+
+
+@pytest.mark.asyncio
+async def test_history_page_respects_filters(test_session):
+    """Фильтры истории применяются и в постраничном режиме"""
+    zone = await _create_history(test_session, 4)
+    await _create_history(test_session, 2)
+
+    page = await crud.get_booking_history_page(
+        test_session,
+        user_id=1,
+        filters=schemas.BookingHistoryFilters(zone_id=zone.id),
+        limit=10,
+    )
+    assert len(page.items) == 4
+    assert page.next_cursor is None
+
+
+@pytest.mark.asyncio
+async def test_history_page_endpoint(test_client, test_session):
+    """GET /bookings/history/page отдаёт next_cursor и отвергает битый курсор"""
+    await _create_history(test_session, 3)
+
+    response = await test_client.get(
+        "/bookings/history/page", params={"limit": 2}, headers=HEADERS
+    )
+    assert response.status_code == 200
+    data = response.json()
+    assert len(data["items"]) == 2
+    assert data["next_cursor"]
+
+    response = await test_client.get(
+        "/bookings/history/page",
+        params={"limit": 2, "cursor": data["next_cursor"]},
+        headers=HEADERS,
+    )
+    assert response.status_code == 200
+    data = response.json()
+    assert len(data["items"]) == 1
+    assert data["next_cursor"] is None
+
+    response = await test_client.get(
+        "/bookings/history/page", params={"cursor": "garbage"}, headers=HEADERS
+    )
+    assert response.status_code == 400
+
+    response = await test_client.get(
+        "/bookings/history/page", params={"limit": 10_000}, headers=HEADERS
+    )
+    assert response.status_code == 422
+
+
+@pytest.mark.asyncio
+async def test_history_export_ndjson(test_client, test_session):
+    """GET /bookings/history/export отдаёт по одной брони на строку"""
+    await _create_history(test_session, 5)
+    await _create_history(test_session, 2, user_id=2)
+
+    response = await test_client.get("/bookings/history/export", headers=HEADERS)
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert len(lines) == 5
+    assert all(line["user_id"] == 1 for line in lines)
@@ -0,0 +1,210 @@
+"""
+Тесты заголовка Idempotency-Key на пишущих ручках броней.
+"""
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+import crud
+import idempotency
+import models
+from config import settings
+from db import get_session
+from main import app
+from models import Base
+
+HEADERS = {"X-User-Id": "1", "X-User-Role": "user"}
+
+
+async def _zone_with_slots(session, count=2):
+    zone = models.Zone(name="Idem Zone", address="Addr", is_active=True)
+    session.add(zone)
+    await session.flush()
+    place = models.Place(zone_id=zone.id, name="Место 1", is_active=True)
+    session.add(place)
+    await session.flush()
+    start = datetime.now().replace(microsecond=0) + timedelta(days=1)
+    slots = [
+        models.Slot(
+            place_id=place.id,
+            start_time=start + timedelta(hours=i),
+            end_time=start + timedelta(hours=i + 1),
+            is_available=True,
+        )
+        for i in range(count)
+    ]
+    session.add_all(slots)
+    await session.commit()
+    return zone, [slot.id for slot in slots]
+
+
+async def _count_bookings(session):
+    return (await session.execute(select(func.count(models.Booking.id)))).scalar_one()
+
+
+@pytest.mark.asyncio
+async def test_retry_replays_created_booking(test_client, test_session):
+    """Повтор с тем же ключом получает тот же ответ, вторая бронь не создаётся"""
+    _, slots = await _zone_with_slots(test_session)
+    headers = {**HEADERS, "Idempotency-Key": "create-1"}
+
+    first = await test_client.post("/bookings", json={"slot_id": slots[0]}, headers=headers)
+    retry = await test_client.post("/bookings", json={"slot_id": slots[0]}, headers=headers)
+
+    assert first.status_code == retry.status_code == 201
+    assert retry.json() == first.json()
+    assert "Idempotent-Replayed" not in first.headers
+    assert retry.headers["Idempotent-Replayed"] == "true"
+    assert await _count_bookings(test_session) == 1
+
+    # Без ключа повтор проходит проверки заново и получает конфликт
+    again = await test_client.post("/bookings", json={"slot_id": slots[0]}, headers=HEADERS)
+    assert again.status_code == 409
+
+
+@pytest.mark.asyncio
+async def test_retry_of_extension_does_not_chain_twice(test_client, test_session):
+    """Повтор продления возвращает ту же продлённую бронь"""
+    _, slots = await _zone_with_slots(test_session, count=3)
+    created = await test_client.post("/bookings", json={"slot_id": slots[0]}, headers=HEADERS)
+    booking_id = created.json()["id"]
+
+    headers = {**HEADERS, "Idempotency-Key": "extend-1"}
+    body = {"extend_hours": 1, "extend_minutes": 0}
+    first = await test_client.post(f"/bookings/{booking_id}/extend", json=body, headers=headers)
+    retry = await test_client.post(f"/bookings/{booking_id}/extend", json=body, headers=headers)
+
+    assert first.status_code == retry.status_code == 200
+    assert retry.json()["id"] == first.json()["id"]
+    assert await _count_bookings(test_session) == 2
+
+
+@pytest.mark.asyncio
+async def test_key_reuse_and_error_replay(test_client, test_session):
+    """4xx тоже сохраняется; ключ с другим запросом — 422; некорректный ключ — 400"""
+    _, slots = await _zone_with_slots(test_session)
+    headers = {**HEADERS, "Idempotency-Key": "missing-slot"}
+
+    first = await test_client.post("/bookings", json={"slot_id": 999999}, headers=headers)
+    retry = await test_client.post("/bookings", json={"slot_id": 999999}, headers=headers)
+    assert first.status_code == retry.status_code == 409
+    assert retry.json() == first.json()
+    assert retry.headers["Idempotent-Replayed"] == "true"
+
+    other = await test_client.post("/bookings", json={"slot_id": slots[0]}, headers=headers)
+    assert other.status_code == 422
+    assert await _count_bookings(test_session) == 0
+
+    too_long = {**HEADERS, "Idempotency-Key": "k" * (idempotency.MAX_KEY_LENGTH + 1)}
+    response = await test_client.post("/bookings", json={"slot_id": slots[0]}, headers=too_long)
+    assert response.status_code == 400
+
+    # Ключи разных пользователей не пересекаются
+    other_user = {"X-User-Id": "2", "X-User-Role": "user", "Idempotency-Key": "missing-slot"}
+    response = await test_client.post("/bookings", json={"slot_id": slots[0]}, headers=other_user)
+    assert response.status_code == 201
+
+
+@pytest.mark.asyncio
+async def test_concurrent_duplicate_waits_for_first_attempt(tmp_path, monkeypatch):
+    """Дубль, пришедший во время первой попытки, ждёт её и получает тот же ответ"""
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'idem.db'}")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    Session = async_sessionmaker(bind=engine, expire_on_commit=False, class_=AsyncSession)
+
+    async def session_per_request():
+        async with Session() as session:
+            yield session
+
+    original = crud.create_booking
+    calls = 0
+
+    async def slow_create_booking(*args, **kwargs):
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.3)
+        return await original(*args, **kwargs)
+
+    monkeypatch.setattr(crud, "create_booking", slow_create_booking)
+    monkeypatch.setattr(settings, "IDEMPOTENCY_POLL_SECONDS", 0.02)
+    app.dependency_overrides[get_session] = session_per_request
+    try:
+        async with Session() as session:
+            _, slots = await _zone_with_slots(session)
+        slot_id = slots[0]
+
+        headers = {**HEADERS, "Idempotency-Key": "concurrent-1"}
+        async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+            first, duplicate = await asyncio.gather(
+                client.post("/bookings", json={"slot_id": slot_id}, headers=headers),
+                client.post("/bookings", json={"slot_id": slot_id}, headers=headers),
+            )
+
+        assert first.status_code == duplicate.status_code == 201
+        assert first.json() == duplicate.json()
+        assert calls == 1
+        async with Session() as session:
+            assert await _count_bookings(session) == 1
+    finally:
+        app.dependency_overrides.clear()
+        await engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_expired_keys_are_released_and_purged(test_client, test_session, monkeypatch):
+    """По истечении TTL ключ свободен, очистка удаляет просроченные строки"""
+    _, slots = await _zone_with_slots(test_session)
+    headers = {**HEADERS, "Idempotency-Key": "ttl-1"}
+    await test_client.post("/bookings", json={"slot_id": slots[0]}, headers=headers)
+
+    stored = await test_session.get(models.IdempotencyKey, (1, "ttl-1"))
+    stored.expires_at = datetime.now() - timedelta(days=2)
+    await test_session.commit()
+
+    response = await test_client.post("/bookings", json={"slot_id": slots[1]}, headers=headers)
+    assert response.status_code == 201
+    assert "Idempotent-Replayed" not in response.headers
+
+    monkeypatch.setattr(settings, "IDEMPOTENCY_TTL_SECONDS", -1)
+    await test_client.post(
+        "/bookings", json={"slot_id": slots[0]}, headers={**HEADERS, "Idempotency-Key": "ttl-2"}
+    )
+    assert await idempotency.purge_expired(test_session) >= 1
+    remaining = (await test_session.execute(select(models.IdempotencyKey.key))).scalars().all()
+    assert remaining == ["ttl-1"]
+
+
+@pytest.mark.asyncio
+async def test_crash_before_response_is_stored_does_not_duplicate(test_client, test_session, monkeypatch):
+    """Бронь и сохранённый ответ фиксируются одним commit: падение между ними
+    не оставляет записанной брони при ключе in_progress"""
+    _, slots = await _zone_with_slots(test_session)
+    headers = {**HEADERS, "Idempotency-Key": "crash-1"}
+    complete = idempotency._complete
+
+    async def crash(*args, **kwargs):
+        raise RuntimeError("процесс упал")
+
+    monkeypatch.setattr(idempotency, "_complete", crash)
+    with pytest.raises(RuntimeError):
+        await test_client.post("/bookings", json={"slot_id": slots[0]}, headers=headers)
+    # Соединение упавшего процесса закрыто — незафиксированное откатывается
+    await test_session.rollback()
+    assert await _count_bookings(test_session) == 0
+    stored = await test_session.get(models.IdempotencyKey, (1, "crash-1"))
+    assert stored.status == idempotency.IN_PROGRESS
+
+    # Повтор после IDEMPOTENCY_LOCK_SECONDS выполняет запрос ровно один раз
+    monkeypatch.setattr(idempotency, "_complete", complete)
+    monkeypatch.setattr(settings, "IDEMPOTENCY_LOCK_SECONDS", 0)
+    response = await test_client.post("/bookings", json={"slot_id": slots[0]}, headers=headers)
+    assert response.status_code == 201
+    replay = await test_client.post("/bookings", json={"slot_id": slots[0]}, headers=headers)
+    assert replay.headers["Idempotent-Replayed"] == "true"
+    assert replay.json() == response.json()
+    assert await _count_bookings(test_session) == 1
@@ -0,0 +1,147 @@
+"""
+Тесты живого потока изменений зон (live.py, GET /zones/stream).
+"""
+import asyncio
+import json
+
+import pytest
+from datetime import date, datetime, timedelta, timezone
+
+import crud
+import live
+import models
+import routes
+import schemas
+from config import settings
+
+
+def _parse(chunk: bytes) -> tuple:
+    fields = dict(
+        line.split(": ", 1) for line in chunk.decode().strip().split("\n")
+    )
+    return fields["event"], json.loads(fields["data"])
+
+
+def _drain(subscription) -> list:
+    items = []
+    while not subscription.queue.empty():
+        _, event_type, data = subscription.queue.get_nowait()
+        items.append((event_type, data))
+    return items
+
+
+@pytest.fixture
+def subscription():
+    subscription = live.hub.subscribe()
+    yield subscription
+    live.hub.unsubscribe(subscription)
+
+
+async def _zone(test_session):
+    zone = models.Zone(name="Live Zone", address="Addr", is_active=True)
+    test_session.add(zone)
+    await test_session.flush()
+    test_session.add(models.Place(zone_id=zone.id, name="Место 1", is_active=True))
+    await test_session.commit()
+    return zone
+
+
+@pytest.mark.asyncio
+async def test_booking_writes_publish_after_commit(test_session, subscription):
+    """Бронь и отмена публикуют slot_taken / slot_released с id слота"""
+    zone = await _zone(test_session)
+    _drain(subscription)
+    now = datetime.now(timezone.utc)
+    booking = await crud.create_booking_by_time_range(
+        test_session,
+        user_id=1,
+        booking_in=schemas.BookingCreateTimeRange(
+            zone_id=zone.id, date=(date.today() + timedelta(days=1)).isoformat(),
+            start_hour=10, start_minute=0, end_hour=11, end_minute=0,
+        ),
+    )
+    events = _drain(subscription)
+    assert [e for e, _ in events] == [live.SLOT_TAKEN]
+    assert events[0][1]["zone_id"] == zone.id
+    assert events[0][1]["slot_id"] == booking.slot_id
+
+    await crud.cancel_booking(test_session, user_id=1, booking_id=booking.id)
+    assert [e for e, _ in _drain(subscription)] == [live.SLOT_RELEASED]
+
+    # Бронь, идущая сейчас, меняет current_occupancy
+    place = (await crud.get_places_by_zone(test_session, zone.id))[0]
+    slot = models.Slot(
+        place_id=place.id, start_time=now - timedelta(minutes=30),
+        end_time=now + timedelta(minutes=30), is_available=True,
+    )
+    test_session.add(slot)
+    await test_session.commit()
+    await crud.create_booking(test_session, 2, schemas.BookingCreate(slot_id=slot.id))
+    events = _drain(subscription)
+    assert [e for e, _ in events] == [live.SLOT_TAKEN, live.OCCUPANCY_CHANGED]
+    assert events[1][1] == {"zone_id": zone.id, "delta": 1}
+
+
+@pytest.mark.asyncio
+async def test_rolled_back_events_are_dropped(test_session, subscription):
+    """События откатанной транзакции не публикуются"""
+    test_session.add(models.Zone(name="Rolled Back", address="Addr", is_active=True))
+    await test_session.flush()
+    live.emit(test_session, live.ZONE_OPENED, {"zone_id": 1})
+    await test_session.rollback()
+    live.emit(test_session, live.ZONE_CLOSED, {"zone_id": 2})
+    await test_session.commit()
+    assert _drain(subscription) == [(live.ZONE_CLOSED, {"zone_id": 2})]
+
+
+def test_slow_subscriber_gets_resync(monkeypatch):
+    """Переполненная очередь заменяется одним resync, остальные не страдают"""
+    monkeypatch.setattr(settings, "LIVE_QUEUE_SIZE", 3)
+    slow = live.hub.subscribe()
+    fast = live.hub.subscribe()
+    try:
+        for i in range(3):
+            live.hub.publish(live.ZONE_OPENED, {"zone_id": i})
+        _drain(fast)
+        live.hub.publish(live.ZONE_OPENED, {"zone_id": 3})
+
+        assert _drain(slow) == [(live.RESYNC, {})]
+        assert slow.dropped == 3
+        assert _drain(fast) == [(live.ZONE_OPENED, {"zone_id": 3})]
+    finally:
+        live.hub.unsubscribe(slow)
+        live.hub.unsubscribe(fast)
+
+
+@pytest.mark.asyncio
+async def test_stream_sends_snapshot_deltas_and_heartbeats(test_session, monkeypatch):
+    """Снимок, затем дельты; в тишине — пинги; после отключения подписки нет"""
+    monkeypatch.setattr(settings, "LIVE_HEARTBEAT_SECONDS", 0.05)
+    zone_id = (await _zone(test_session)).id
+    subscribers = len(live.hub.subscribers)
+
+    response = await routes.zones_stream(session=test_session)
+    assert response.media_type == "text/event-stream"
+    chunks = response.body_iterator
+
+    event_type, data = _parse(await chunks.__anext__())
+    assert event_type == live.SNAPSHOT
+    assert [z["name"] for z in data] == ["Live Zone"]
+
+    await crud.close_zone(
+        test_session,
+        zone_id,
+        schemas.ZoneCloseRequest(
+            reason="Ремонт",
+            from_time=datetime.now(timezone.utc),
+            to_time=datetime.now(timezone.utc) + timedelta(days=1),
+        ),
+    )
+    event_type, data = _parse(await chunks.__anext__())
+    assert event_type == live.ZONE_CLOSED
+    assert data["zone_id"] == zone_id
+
+    assert await asyncio.wait_for(chunks.__anext__(), timeout=1) == b": ping\n\n"
+
+    await chunks.aclose()
+    assert len(live.hub.subscribers) == subscribers
@@ -0,0 +1,168 @@
+"""
+Тесты версионных миграций (migrator.py).
+
+Разбор файлов миграций проверяется всегда. Применение — только на
+одноразовой локальной Postgres (схема public пересоздаётся):
+    MIGRATION_TEST_DATABASE_URL=postgresql+asyncpg://... python -m pytest tests/test_migrations.py
+"""
+import asyncio
+import os
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import inspect
+from sqlalchemy.ext.asyncio import create_async_engine
+
+import migrator
+from models import Base
+
+MIGRATION_TEST_DATABASE_URL = os.getenv("MIGRATION_TEST_DATABASE_URL")
+
+needs_postgres = pytest.mark.skipif(
+    not MIGRATION_TEST_DATABASE_URL,
+    reason="MIGRATION_TEST_DATABASE_URL не задан — нужна локальная Postgres",
+)
+
+
+def _write(directory, name, sql):
+    (directory / name).write_text(sql, encoding="utf-8")
+
+
+def test_load_migrations_orders_and_checksums(tmp_path):
+    """Файлы идут по номеру, а не по имени; no-transaction читается из заголовка"""
+    _write(tmp_path, "0010_later.sql", "CREATE TABLE b (id INT);")
+    _write(tmp_path, "0002_first.sql", "CREATE TABLE a (id INT);")
+    _write(tmp_path, "0011_index.sql", (
+        f"{migrator.NO_TRANSACTION_MARKER}\n"
+        "-- индекс без блокировки записи\n"
+        "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_a ON a (id);\n"
+        "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_b ON b (id);\n"
+    ))
+
+    migrations = migrator.load_migrations(tmp_path)
+    assert [(m.version, m.name) for m in migrations] == [
+        (2, "first"), (10, "later"), (11, "index"),
+    ]
+    assert migrations[0].transactional
+    assert not migrations[2].transactional
+    assert migrations[2].statements() == [
+        "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_a ON a (id)",
+        "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_b ON b (id)",
+    ]
+
+    applied = {2: migrations[0].checksum}
+    assert [m.version for m in migrator.pending_migrations(migrations, applied)] == [10, 11]
+    with pytest.raises(migrator.MigrationError):
+        migrator.pending_migrations(migrations, {2: "0" * 64})
+
+
+@pytest.mark.parametrize("files", [
+    {"0001_a.sql": "SELECT 1;", "1_b.sql": "SELECT 1;"},
+    {"add_column.sql": "SELECT 1;"},
+    {"0001_index.sql": "CREATE INDEX CONCURRENTLY ix ON t (id);"},
+])
+def test_load_migrations_rejects_bad_files(tmp_path, files):
+    """Дубли номеров, имя без номера и CONCURRENTLY в транзакции — ошибка"""
+    for name, sql in files.items():
+        _write(tmp_path, name, sql)
+    with pytest.raises(migrator.MigrationError):
+        migrator.load_migrations(tmp_path)
+
+
+def test_shipped_migrations_load():
+    """Миграции сервиса разбираются, первая — базовая схема"""
+    migrations = migrator.load_migrations()
+    assert migrations[0].version == 1
+    assert [m.version for m in migrations] == sorted({m.version for m in migrations})
+
+
+@pytest_asyncio.fixture
+async def pg_engine():
+    engine = create_async_engine(MIGRATION_TEST_DATABASE_URL)
+    async with engine.begin() as conn:
+        await conn.exec_driver_sql("DROP SCHEMA public CASCADE")
+        await conn.exec_driver_sql("CREATE SCHEMA public")
+    yield engine
+    await engine.dispose()
+
+
+@needs_postgres
+@pytest.mark.asyncio
+async def test_baseline_matches_models(pg_engine):
+    """После миграций в базе те же таблицы, колонки и индексы, что в models.py"""
+    applied = await migrator.migrate(pg_engine)
+    assert applied == [m.version for m in migrator.load_migrations()]
+
+    def schema(conn):
+        inspector = inspect(conn)
+        return {
+            table: (
+                {column["name"] for column in inspector.get_columns(table)},
+                {index["name"] for index in inspector.get_indexes(table)},
+            )
+            for table in Base.metadata.tables
+        }
+
+    async with pg_engine.connect() as conn:
+        actual = await conn.run_sync(schema)
+    for name, table in Base.metadata.tables.items():
+        columns, indexes = actual[name]
+        assert columns == {column.name for column in table.columns}, name
+        assert {index.name for index in table.indexes} <= indexes, name
+
+    # Повторный запуск — только проверка версии
+    assert await migrator.migrate(pg_engine) == []
+    assert all(applied_at for _, _, applied_at in await migrator.status(pg_engine))
+
+
+@needs_postgres
+@pytest.mark.asyncio
+async def test_concurrent_runners_apply_once(pg_engine, tmp_path):
+    """Реплики стартуют одновременно: каждая миграция применяется один раз"""
+    _write(tmp_path, "0001_table.sql", "CREATE TABLE counter (n INT);")
+    _write(tmp_path, "0002_row.sql", "INSERT INTO counter VALUES (1);")
+    _write(tmp_path, "0003_index.sql", (
+        f"{migrator.NO_TRANSACTION_MARKER}\n"
+        "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_counter ON counter (n);\n"
+    ))
+
+    engines = [create_async_engine(MIGRATION_TEST_DATABASE_URL) for _ in range(3)]
+    try:
+        results = await asyncio.gather(*[migrator.migrate(e, tmp_path) for e in engines])
+    finally:
+        for engine in engines:
+            await engine.dispose()
+
+    assert sorted(results) == [[], [], [1, 2, 3]]
+    async with pg_engine.connect() as conn:
+        assert (await conn.exec_driver_sql("SELECT count(*) FROM counter")).scalar() == 1
+        assert (await conn.exec_driver_sql(
+            "SELECT count(*) FROM pg_indexes WHERE indexname = 'ix_counter'"
+        )).scalar() == 1
+
+
+@needs_postgres
+@pytest.mark.asyncio
+async def test_failed_migration_rolls_back(pg_engine, tmp_path):
+    """Упавшая миграция не записывается и не оставляет изменений; изменённый файл — ошибка"""
+    _write(tmp_path, "0001_table.sql", "CREATE TABLE t (id INT);")
+    _write(tmp_path, "0002_broken.sql", "ALTER TABLE t ADD COLUMN name TEXT; SELECT 1/0;")
+    with pytest.raises(Exception):
+        await migrator.migrate(pg_engine, tmp_path)
+
+    async with pg_engine.connect() as conn:
+        versions = (await conn.exec_driver_sql(
+            "SELECT version FROM schema_migrations"
+        )).scalars().all()
+        columns = (await conn.exec_driver_sql(
+            "SELECT column_name FROM information_schema.columns WHERE table_name = 't'"
+        )).scalars().all()
+    assert versions == [1]
+    assert columns == ["id"]
+
+    _write(tmp_path, "0002_broken.sql", "ALTER TABLE t ADD COLUMN name TEXT;")
+    assert await migrator.migrate(pg_engine, tmp_path) == [2]
+
+    _write(tmp_path, "0001_table.sql", "CREATE TABLE t (id BIGINT);")
+    with pytest.raises(migrator.MigrationError):
+        await migrator.migrate(pg_engine, tmp_path)
@@ -0,0 +1,195 @@
+"""
+Тесты transactional outbox уведомлений.
+"""
+import httpx
+import pytest
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import select
+
+import crud
+import models
+import notifications
+import outbox
+import schemas
+from config import settings
+
+
+async def _slot(test_session):
+    zone = models.Zone(name="Outbox Zone", address="Addr", is_active=True)
+    test_session.add(zone)
+    await test_session.flush()
+    place = models.Place(zone_id=zone.id, name="Place 1", is_active=True)
+    test_session.add(place)
+    await test_session.flush()
+    start_time = datetime.now(timezone.utc) + timedelta(days=1)
+    slot = models.Slot(
+        place_id=place.id,
+        start_time=start_time,
+        end_time=start_time + timedelta(hours=1),
+        is_available=True,
+    )
+    test_session.add(slot)
+    await test_session.commit()
+    return slot
+
+
+async def _events(test_session):
+    result = await test_session.execute(
+        select(models.OutboxEvent).order_by(models.OutboxEvent.id)
+    )
+    return list(result.scalars().all())
+
+
+@pytest.mark.asyncio
+async def test_booking_changes_write_outbox_events(test_session):
+    """Создание и отмена брони пишут события в outbox, а не шлют HTTP"""
+    slot = await _slot(test_session)
+
+    booking = await crud.create_booking(
+        test_session, user_id=1, booking_in=schemas.BookingCreate(slot_id=slot.id)
+    )
+    await crud.cancel_booking(test_session, user_id=1, booking_id=booking.id)
+
+    events = await _events(test_session)
+    assert [e.event_type for e in events] == [outbox.BOOKING_CREATED, outbox.BOOKING_CANCELLED]
+    assert all(e.status == "pending" for e in events)
+    assert events[0].payload["user_id"] == 1
+    assert events[0].payload["zone_name"] == "Outbox Zone"
+    assert datetime.fromisoformat(events[0].payload["start_time"]) is not None
+
+
+@pytest.mark.asyncio
+async def test_dispatcher_delivers_and_retries_with_backoff(test_session, monkeypatch):
+    """Доставленные события помечаются delivered, упавшие переносятся с задержкой"""
+    delivered = []
+
+    async def ok(payload, done):
+        delivered.append(payload["user_id"])
+
+    async def broken(payload, done):
+        raise ConnectionError("notification-service недоступен")
+
+    monkeypatch.setitem(outbox.HANDLERS, outbox.BOOKING_CREATED, ok)
+    monkeypatch.setitem(outbox.HANDLERS, outbox.BOOKING_CANCELLED, broken)
+
+    outbox.enqueue(test_session, outbox.BOOKING_CREATED, user_id=7)
+    outbox.enqueue(test_session, outbox.BOOKING_CANCELLED, user_id=8)
+    await test_session.commit()
+
+    now = datetime.now(timezone.utc) + timedelta(minutes=1)
+    outcome = await outbox.dispatch_batch(test_session, now=now)
+    assert (outcome.delivered, outcome.retried, outcome.failed) == (1, 1, 0)
+    assert delivered == [7]
+
+    created, cancelled = await _events(test_session)
+    assert created.status == "delivered"
+    assert created.delivered_at is not None
+    assert cancelled.status == "pending"
+    assert cancelled.attempts == 1
+    assert "недоступен" in cancelled.last_error
+
+    # До истечения задержки событие не берётся повторно
+    outcome = await outbox.dispatch_batch(test_session, now=now)
+    assert (outcome.delivered, outcome.retried, outcome.failed) == (0, 0, 0)
+
+
+@pytest.mark.asyncio
+async def test_dispatcher_gives_up_after_max_attempts(test_session, monkeypatch):
+    """После OUTBOX_MAX_ATTEMPTS событие помечается failed и больше не берётся"""
+    async def broken(payload, done):
+        raise ConnectionError("timeout")
+
+    monkeypatch.setitem(outbox.HANDLERS, outbox.BOOKING_EXTENDED, broken)
+    monkeypatch.setattr(settings, "OUTBOX_MAX_ATTEMPTS", 2)
+
+    outbox.enqueue(test_session, outbox.BOOKING_EXTENDED, user_id=1)
+    await test_session.commit()
+
+    moment = datetime.now(timezone.utc)
+    for _ in range(2):
+        moment += timedelta(seconds=settings.OUTBOX_MAX_BACKOFF_SECONDS + 1)
+        await outbox.dispatch_batch(test_session, now=moment)
+
+    (event,) = await _events(test_session)
+    assert event.status == "failed"
+    assert event.attempts == 2
+
+    outcome = await outbox.dispatch_batch(test_session, now=moment + timedelta(days=1))
+    assert outcome.failed == outcome.retried == outcome.delivered == 0
+
+
+def test_retry_delay_is_exponential_and_capped():
+    assert outbox.retry_delay(1) == timedelta(seconds=settings.OUTBOX_BACKOFF_SECONDS)
+    assert outbox.retry_delay(3) == timedelta(seconds=settings.OUTBOX_BACKOFF_SECONDS * 4)
+    assert outbox.retry_delay(50) == timedelta(seconds=settings.OUTBOX_MAX_BACKOFF_SECONDS)
+
+
+@pytest.mark.asyncio
+async def test_retry_resends_only_failed_channel(test_session, monkeypatch):
+    """Push упал после email: повтор события отправляет только push"""
+    sent = []
+    push_fails = [True]
+
+    async def email(email, subject, text):
+        sent.append("email")
+
+    async def push(user_id, title, message, notif_type="info"):
+        if push_fails[0]:
+            raise ConnectionError("push недоступен")
+        sent.append("push")
+
+    async def user_email(user_id):
+        return "user@example.com"
+
+    monkeypatch.setattr(notifications, "send_email_notification", email)
+    monkeypatch.setattr(notifications, "send_push_notification", push)
+    monkeypatch.setattr(notifications, "get_user_email", user_email)
+
+    outbox.enqueue(
+        test_session, outbox.BOOKING_EXTENDED, user_id=1, zone_name="Zone",
+        end_time=datetime(2026, 1, 1, 10, 0),
+    )
+    await test_session.commit()
+
+    moment = datetime.now(timezone.utc) + timedelta(minutes=1)
+    outcome = await outbox.dispatch_batch(test_session, now=moment)
+    assert outcome.retried == 1
+    (event,) = await _events(test_session)
+    assert event.delivered_channels == [notifications.EMAIL]
+
+    push_fails[0] = False
+    moment += timedelta(seconds=settings.OUTBOX_MAX_BACKOFF_SECONDS + 1)
+    outcome = await outbox.dispatch_batch(test_session, now=moment)
+    assert outcome.delivered == 1
+    assert sent == ["email", "push"]
+    (event,) = await _events(test_session)
+    assert event.delivered_channels == [notifications.EMAIL, notifications.PUSH]
+
+
+@pytest.mark.asyncio
+async def test_client_error_fails_without_retry(test_session, monkeypatch):
+    """4xx от notification-service повтором не исправить — событие сразу failed"""
+    async def rejected(payload, done):
+        request = httpx.Request("POST", "http://notification-service/notify/push")
+        response = httpx.Response(422, request=request)
+        response.raise_for_status()
+
+    monkeypatch.setitem(outbox.HANDLERS, outbox.BOOKING_CREATED, rejected)
+    outbox.enqueue(test_session, outbox.BOOKING_CREATED, user_id=1)
+    await test_session.commit()
+
+    outcome = await outbox.dispatch_batch(
+        test_session, now=datetime.now(timezone.utc) + timedelta(minutes=1)
+    )
+    assert (outcome.retried, outcome.failed) == (0, 1)
+    (event,) = await _events(test_session)
+    assert event.status == "failed"
+    assert event.attempts == 1
+
+    # 429 и 5xx — временные
+    for code in (429, 503):
+        error = httpx.HTTPStatusError(
+            "", request=httpx.Request("GET", "http://x"), response=httpx.Response(code)
+        )
+        assert not outbox.is_permanent(error)
@@ -0,0 +1,215 @@
+"""
+Регрессионные тесты планов запросов.
+
+Запросы, которые генерируют функции crud.py, перехватываются на уровне
+драйвера и прогоняются через EXPLAIN на заполненной локальной Postgres.
+Тест падает, если в плане есть Seq Scan по горячей таблице (bookings, slots),
+то есть если какой-то запрос перестал попадать в индекс.
+
+Нужна одноразовая база: таблицы пересоздаются.
+    PLAN_TEST_DATABASE_URL=postgresql+asyncpg://... python -m pytest tests/test_query_plans.py
+Без PLAN_TEST_DATABASE_URL тесты пропускаются (SQLite планы не показательны).
+"""
+import json
+import os
+from datetime import datetime, timedelta, timezone
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import event, insert, select, text
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+import crud
+import models
+import schemas
+from models import Base
+
+PLAN_TEST_DATABASE_URL = os.getenv("PLAN_TEST_DATABASE_URL")
+
+pytestmark = [
+    pytest.mark.skipif(
+        not PLAN_TEST_DATABASE_URL,
+        reason="PLAN_TEST_DATABASE_URL не задан — нужна локальная Postgres",
+    ),
+    pytest.mark.asyncio(loop_scope="module"),
+]
+
+HOT_TABLES = {"bookings", "slots"}
+
+ZONES = 20
+PLACES_PER_ZONE = 10
+SLOTS_PER_PLACE = 100
+USERS = 500
+BASE_TIME = datetime(2026, 1, 5, 8, 0, tzinfo=timezone.utc)
+
+
+async def _seed(engine):
+    async with engine.begin() as conn:
+        await conn.execute(
+            insert(models.Zone),
+            [{"name": f"Zone {z}", "address": "Addr", "is_active": True} for z in range(ZONES)],
+        )
+        zone_ids = (await conn.execute(select(models.Zone.id))).scalars().all()
+        await conn.execute(
+            insert(models.Place),
+            [
+                {"zone_id": zone_id, "name": f"Place {p}", "is_active": True}
+                for zone_id in zone_ids
+                for p in range(PLACES_PER_ZONE)
+            ],
+        )
+        place_zones = dict((await conn.execute(
+            select(models.Place.id, models.Place.zone_id)
+        )).all())
+        slots = []
+        for place_id in place_zones:
+            for i in range(SLOTS_PER_PLACE):
+                start = BASE_TIME + timedelta(days=i * 3, hours=place_id % 8)
+                slots.append({
+                    "place_id": place_id,
+                    "start_time": start,
+                    "end_time": start + timedelta(hours=2),
+                    "is_available": False,
+                })
+        await conn.execute(insert(models.Slot), slots)
+        rows = (await conn.execute(
+            select(models.Slot.id, models.Slot.place_id, models.Slot.start_time, models.Slot.end_time)
+        )).all()
+        await conn.execute(
+            insert(models.Booking),
+            [
+                {
+                    "user_id": slot_id % USERS + 1,
+                    "slot_id": slot_id,
+                    "zone_id": place_zones[place_id],
+                    "status": "cancelled" if slot_id % 5 == 0 else "active",
+                    "zone_name": "Zone",
+                    "start_time": start,
+                    "end_time": end,
+                    "created_at": start - timedelta(days=1),
+                }
+                for slot_id, place_id, start, end in rows
+            ],
+        )
+    async with engine.begin() as conn:
+        await conn.execute(text("ANALYZE"))
+
+
+@pytest_asyncio.fixture(scope="module", loop_scope="module")
+async def plan_engine():
+    engine = create_async_engine(PLAN_TEST_DATABASE_URL, echo=False, future=True)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+    await _seed(engine)
+
+    yield engine
+
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+    await engine.dispose()
+
+
+def _seq_scans(plan):
+    found = []
+    if plan.get("Node Type") == "Seq Scan" and plan.get("Relation Name") in HOT_TABLES:
+        found.append(plan["Relation Name"])
+    for child in plan.get("Plans", []):
+        found.extend(_seq_scans(child))
+    return found
+
+
+def _index_names(plan):
+    names = {plan["Index Name"]} if plan.get("Index Name") else set()
+    for child in plan.get("Plans", []):
+        names |= _index_names(child)
+    return names
+
+
+async def _explain_crud_call(engine, call):
+    """Выполняет call(session), записывает его SELECT-ы и возвращает их планы."""
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT"):
+            statements.append((statement, parameters))
+
+    event.listen(engine.sync_engine, "before_cursor_execute", record)
+    try:
+        Session = async_sessionmaker(bind=engine, expire_on_commit=False, class_=AsyncSession)
+        async with Session() as session:
+            await call(session)
+            await session.rollback()
+    finally:
+        event.remove(engine.sync_engine, "before_cursor_execute", record)
+
+    assert statements, "функция не выполнила ни одного SELECT"
+    plans = []
+    async with engine.connect() as conn:
+        for statement, parameters in statements:
+            result = await conn.exec_driver_sql(
+                "EXPLAIN (FORMAT JSON) " + statement, parameters
+            )
+            raw = result.scalar()
+            plan = json.loads(raw) if isinstance(raw, str) else raw
+            plans.append((statement, plan[0]["Plan"]))
+    return plans
+
+
+WINDOW_START = BASE_TIME + timedelta(days=150)
+WINDOW_END = WINDOW_START + timedelta(hours=3)
+
+CRUD_CALLS = {
+    "check_user_booking_conflicts": lambda s: crud.check_user_booking_conflicts(
+        s, user_id=7, start_time=WINDOW_START, end_time=WINDOW_END
+    ),
+    "check_zone_capacity": lambda s: crud.check_zone_capacity(
+        s, zone_id=3, start_time=WINDOW_START, end_time=WINDOW_END
+    ),
+    "get_slots_by_place_and_date": lambda s: crud.get_slots_by_place_and_date(
+        s, place_id=42, target_date=WINDOW_START.date()
+    ),
+    "get_booking_history": lambda s: crud.get_booking_history(s, user_id=7),
+    "get_booking_history_status": lambda s: crud.get_booking_history(
+        s, user_id=7, filters=schemas.BookingHistoryFilters(status="active")
+    ),
+    "get_booking_history_page": lambda s: crud.get_booking_history_page(
+        s, user_id=7, limit=20
+    ),
+    "get_booking_history_zone": lambda s: crud.get_booking_history(
+        s, user_id=7, filters=schemas.BookingHistoryFilters(zone_id=3)
+    ),
+}
+
+
+# Запросы, ради которых добавлены составные индексы: без них планировщик
+# обходится одноколоночными индексами, Seq Scan не появляется, но план хуже.
+EXPECTED_INDEXES = {
+    "check_user_booking_conflicts": "ix_booking_user_active_time",
+    "get_booking_history_page": "ix_booking_user_created",
+    "check_zone_capacity": "ix_booking_zone_status_time",
+}
+
+
+@pytest.mark.parametrize("name", sorted(CRUD_CALLS))
+async def test_no_seq_scan_on_hot_tables(plan_engine, name):
+    plans = await _explain_crud_call(plan_engine, CRUD_CALLS[name])
+    for statement, plan in plans:
+        seq = _seq_scans(plan)
+        assert not seq, (
+            f"{name}: Seq Scan по {seq}\n{statement}\n{json.dumps(plan, indent=2)}"
+        )
+
+
+@pytest.mark.parametrize("name", sorted(EXPECTED_INDEXES))
+async def test_hot_query_uses_composite_index(plan_engine, name):
+    plans = await _explain_crud_call(plan_engine, CRUD_CALLS[name])
+    used = set().union(*(_index_names(plan) for _, plan in plans))
+    assert EXPECTED_INDEXES[name] in used, f"{name}: использованы индексы {sorted(used)}"
+
+
+async def test_seed_is_large_enough(plan_engine):
+    """Планировщик выбирает индексы только на достаточно больших таблицах"""
+    async with plan_engine.connect() as conn:
+        rows = (await conn.execute(select(models.Booking.id).limit(10_000))).all()
+    assert len(rows) == 10_000
@@ -0,0 +1,166 @@
+"""
+Тесты маршрутизации читающих запросов на реплику.
+"""
+import pytest
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+import db
+import models
+from config import settings
+
+
+class _Monitor:
+    def __init__(self, healthy):
+        self.healthy = healthy
+
+    async def usable(self):
+        return self.healthy
+
+
+class _Request:
+    def __init__(self, method="GET", user_id=None):
+        self.method = method
+        self.headers = {} if user_id is None else {"X-User-Id": str(user_id)}
+
+
+@pytest.fixture
+def replica(test_engine, monkeypatch):
+    """Реплика — та же тестовая база, но сессии помечены read_only"""
+    ReplicaSession = async_sessionmaker(
+        bind=test_engine,
+        expire_on_commit=False,
+        class_=AsyncSession,
+        info={"read_only": True},
+    )
+    monitor = _Monitor(healthy=True)
+    monkeypatch.setattr(db, "ReadSessionLocal", ReplicaSession)
+    # Каталог зон с реплики не строится — грузится через основную
+    monkeypatch.setattr("catalogue.SessionLocal", async_sessionmaker(
+        bind=test_engine, expire_on_commit=False, class_=AsyncSession,
+    ))
+    monkeypatch.setattr(db, "replica_monitor", monitor)
+    monkeypatch.setattr(db, "recent_writers", db.RecentWriters())
+    return monitor
+
+
+async def _read_session(request):
+    primary = object()
+    gen = db.get_read_session(request, primary=primary)
+    session = await gen.__anext__()
+    await gen.aclose()
+    return session, primary
+
+
+@pytest.mark.asyncio
+async def test_reads_go_to_replica_unless_user_just_wrote(replica):
+    """Чтение — с реплики; после своей записи пользователь читает с основной"""
+    session, primary = await _read_session(_Request(user_id=5))
+    assert session is not primary
+    assert session.info["read_only"] is True
+
+    db.recent_writers.mark(5)
+    session, primary = await _read_session(_Request(user_id=5))
+    assert session is primary
+
+    session, primary = await _read_session(_Request(user_id=6))
+    assert session is not primary
+
+
+@pytest.mark.asyncio
+async def test_write_is_visible_to_immediate_read(replica, test_engine, monkeypatch):
+    """Запись отмечается при commit — чтение сразу после неё идёт на основную,
+    даже если teardown сессии записи ещё не выполнен (ответ уже отправлен)"""
+    monkeypatch.setattr(db, "SessionLocal", async_sessionmaker(
+        bind=test_engine, expire_on_commit=False, class_=AsyncSession,
+    ))
+    writer = db.get_session(_Request(method="POST", user_id=5))
+    session = await writer.__anext__()
+    session.add(models.Zone(name="Written Zone", address="Addr", is_active=True))
+    await session.commit()
+
+    # Teardown зависимости записи ещё не выполнен
+    read, primary = await _read_session(_Request(user_id=5))
+    assert read is primary
+    read, primary = await _read_session(_Request(user_id=6))
+    assert read is not primary
+    await writer.aclose()
+
+    # GET и запросы без commit пользователя не помечают
+    reader = db.get_session(_Request(method="GET", user_id=7))
+    session = await reader.__anext__()
+    await session.commit()
+    await reader.aclose()
+    assert not db.recent_writers.recent(7)
+
+
+@pytest.mark.asyncio
+async def test_unhealthy_replica_falls_back_to_primary(replica, monkeypatch):
+    """Недоступная или отстающая реплика — чтение с основной"""
+    replica.healthy = False
+    session, primary = await _read_session(_Request())
+    assert session is primary
+
+    monkeypatch.setattr(db, "ReadSessionLocal", None)
+    assert await db.use_replica(_Request()) is False
+
+
+@pytest.mark.asyncio
+async def test_replica_monitor_reports_unreachable_replica(monkeypatch):
+    """Проверка здоровья не падает на недоступной базе и кэширует результат"""
+    engine = create_async_engine("sqlite+aiosqlite:////nonexistent/dir/replica.db")
+    monitor = db.ReplicaMonitor(engine)
+    try:
+        assert await monitor.usable() is False
+        assert monitor.lag is None
+        assert monitor._fresh()
+    finally:
+        await engine.dispose()
+
+    assert await db.ReplicaMonitor(None).usable() is False
+
+
+def test_recent_writers_window(monkeypatch):
+    """Пометка записи действует READ_YOUR_WRITES_SECONDS и не копится бесконечно"""
+    writers = db.RecentWriters()
+    writers.mark(1)
+    assert writers.recent(1)
+    assert not writers.recent(2)
+
+    # Пометка старше окна не действует и вычищается при переполнении
+    writers._last_write[1] -= settings.READ_YOUR_WRITES_SECONDS
+    assert not writers.recent(1)
+
+    monkeypatch.setattr(settings, "READ_YOUR_WRITES_MAX_USERS", 1)
+    writers.mark(2)
+    assert list(writers._last_write) == [2]
+
+
+@pytest.mark.asyncio
+async def test_zone_list_on_replica_does_not_write(test_client, test_session, replica):
+    """На реплике истёкшее закрытие учитывается только в ответе"""
+    zone = models.Zone(
+        name="Reopened Zone",
+        address="Addr",
+        is_active=False,
+        closure_reason="Ремонт",
+        closed_until=datetime.now(timezone.utc) - timedelta(hours=1),
+    )
+    test_session.add(zone)
+    await test_session.commit()
+    zone_id = zone.id
+
+    response = await test_client.get("/zones")
+    assert response.status_code == 200
+    data = response.json()
+    assert [z["name"] for z in data] == ["Reopened Zone"]
+    assert data[0]["is_active"] is True
+    assert data[0]["closure_reason"] is None
+
+    test_session.expire_all()
+    stored = (await test_session.execute(
+        select(models.Zone).where(models.Zone.id == zone_id)
+    )).scalar_one()
+    assert stored.is_active is False
@@ -0,0 +1,118 @@
+"""
+Бенчмарк быстрого пути сериализации (fastjson.py).
+
+Для 10 / 1 000 / 10 000 броней одного пользователя сравнивается
+GET /bookings/history через response_model и через FastJSONResponse, а также
+только шаг сериализации (валидация ORM-объектов + JSON против orjson по
+словарям). Печатается стоимость одной строки в микросекундах.
+
+Запуск:
+    RUN_BENCHMARKS=1 python -m pytest -s tests/test_serialization_benchmark.py
+Без RUN_BENCHMARKS тесты пропускаются.
+"""
+import os
+import time
+from datetime import datetime, timedelta
+from typing import List
+
+import pytest
+from pydantic import TypeAdapter
+from sqlalchemy import insert, select
+
+import crud
+import fastjson
+import models
+import schemas
+from config import settings
+
+pytestmark = pytest.mark.skipif(
+    not os.getenv("RUN_BENCHMARKS"),
+    reason="RUN_BENCHMARKS не задан",
+)
+
+HEADERS = {"X-User-Id": "1", "X-User-Role": "user"}
+SIZES = [10, 1_000, 10_000]
+REPEAT = 5
+
+
+async def _fill(test_session, count):
+    zone = models.Zone(name="Bench Zone", address="Addr", is_active=True)
+    test_session.add(zone)
+    await test_session.flush()
+    place = models.Place(zone_id=zone.id, name="Место 1", is_active=True)
+    test_session.add(place)
+    await test_session.flush()
+    start = datetime(2026, 1, 1, 9, 0)
+    await test_session.execute(insert(models.Slot), [
+        {
+            "place_id": place.id,
+            "start_time": start + timedelta(hours=i),
+            "end_time": start + timedelta(hours=i + 1),
+            "is_available": False,
+        }
+        for i in range(count)
+    ])
+    slot_ids = (await test_session.execute(
+        select(models.Slot.id).order_by(models.Slot.id)
+    )).scalars().all()
+    await test_session.execute(insert(models.Booking), [
+        {
+            "user_id": 1,
+            "slot_id": slot_id,
+            "zone_id": zone.id,
+            "zone_name": zone.name,
+            "zone_address": zone.address,
+            "start_time": start + timedelta(hours=i),
+            "end_time": start + timedelta(hours=i + 1),
+            "status": "active",
+            "created_at": start + timedelta(minutes=i),
+            "updated_at": start + timedelta(minutes=i),
+        }
+        for i, slot_id in enumerate(slot_ids)
+    ])
+    await test_session.commit()
+
+
+async def _best(call) -> float:
+    best = float("inf")
+    for _ in range(REPEAT):
+        started = time.perf_counter()
+        await call()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("count", SIZES)
+async def test_history_per_row_cost(test_client, test_session, monkeypatch, count):
+    await _fill(test_session, count)
+
+    async def fetch():
+        response = await test_client.get("/bookings/history", headers=HEADERS)
+        assert response.status_code == 200
+
+    monkeypatch.setattr(settings, "FAST_JSON_RESPONSES", False)
+    slow = await _best(fetch)
+    monkeypatch.setattr(settings, "FAST_JSON_RESPONSES", True)
+    fast = await _best(fetch)
+
+    bookings = await crud.get_booking_history(test_session, user_id=1)
+    rows = await crud.get_booking_history_rows(test_session, user_id=1)
+    adapter = TypeAdapter(List[schemas.BookingOut])
+
+    async def validate_and_dump():
+        adapter.dump_json(adapter.validate_python(bookings, from_attributes=True))
+
+    async def dump_rows():
+        fastjson.dumps(rows)
+
+    slow_ser = await _best(validate_and_dump)
+    fast_ser = await _best(dump_rows)
+
+    print(
+        f"\n{count:>6} строк | запрос: {slow / count * 1e6:8.2f} -> {fast / count * 1e6:8.2f} мкс/строка"
+        f" | сериализация: {slow_ser / count * 1e6:6.2f} -> {fast_ser / count * 1e6:6.2f} мкс/строка"
+    )
+    if count >= 1_000:
+        assert fast < slow
+        assert fast_ser < slow_ser
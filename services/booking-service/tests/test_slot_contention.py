@@ -0,0 +1,259 @@
+"""
+Нагрузочный тест захвата слотов (crud._claim_slot).
+
+N одновременных crud.create_booking, каждый в своей сессии и от своего
+пользователя: все на один слот (ровно одна бронь, остальные — отказ) и на
+N разных слотов (все брони созданы). Печатается пропускная способность.
+То же для броней по времени без слотов сетки (crud._claim_adhoc_slot):
+слот на интервал создаётся один, лишних строк и двойных броней нет, в том
+числе для пересекающихся, но разных интервалов одного места.
+
+По умолчанию — файловая SQLite (запись в ней последовательна, проверяется
+только корректность). Настоящая конкуренция транзакций — на одноразовой
+локальной Postgres (таблицы пересоздаются):
+    CONTENTION_TEST_DATABASE_URL=postgresql+asyncpg://... python -m pytest -s tests/test_slot_contention.py
+"""
+import asyncio
+import os
+import time
+from datetime import datetime, timedelta
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import event, func, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+import crud
+import models
+import schemas
+from catalogue import catalogue
+from models import Base
+
+CONTENTION_TEST_DATABASE_URL = os.getenv("CONTENTION_TEST_DATABASE_URL")
+CLAIMS = 50
+
+
+@pytest_asyncio.fixture
+async def engine(tmp_path, monkeypatch):
+    url = CONTENTION_TEST_DATABASE_URL or f"sqlite+aiosqlite:///{tmp_path / 'contention.db'}"
+    kwargs = {} if CONTENTION_TEST_DATABASE_URL else {"connect_args": {"timeout": 30}}
+    engine = create_async_engine(url, **kwargs)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+    catalogue.invalidate()
+    # Одновременные загрузки снимка привязывают его lock к циклу событий теста
+    monkeypatch.setattr(catalogue, "_lock", asyncio.Lock())
+    yield engine
+    await engine.dispose()
+
+
+async def _slots(Session, count):
+    """count слотов подряд в одной зоне; мест столько же, вместимость не мешает"""
+    async with Session() as session:
+        zone = models.Zone(name="Hot Zone", address="Addr", is_active=True)
+        session.add(zone)
+        await session.flush()
+        places = [models.Place(zone_id=zone.id, name=f"Место {i}", is_active=True) for i in range(count)]
+        session.add_all(places)
+        await session.flush()
+        start = datetime.now().replace(microsecond=0) + timedelta(days=1)
+        slots = [
+            models.Slot(
+                place_id=places[i].id,
+                start_time=start + timedelta(hours=i),
+                end_time=start + timedelta(hours=i + 1),
+                is_available=True,
+            )
+            for i in range(count)
+        ]
+        session.add_all(slots)
+        await session.commit()
+        return [slot.id for slot in slots]
+
+
+async def _places(Session, count):
+    """Зона с count местами и без слотов: брони по времени создают слоты сами"""
+    async with Session() as session:
+        zone = models.Zone(name="Ad-hoc Zone", address="Addr", is_active=True)
+        session.add(zone)
+        await session.flush()
+        session.add_all([
+            models.Place(zone_id=zone.id, name=f"Место {i}", is_active=True) for i in range(count)
+        ])
+        await session.commit()
+        return zone.id
+
+
+async def _claim_all_by_time(Session, zone_id, count, hours=((10, 11),)):
+    """count броней по времени; интервалы (час начала, час конца) по кругу из hours"""
+    day = (datetime.utcnow() + timedelta(days=1)).date().isoformat()
+
+    async def claim(user_id, start_hour, end_hour):
+        async with Session() as session:
+            booking = await crud.create_booking_by_time_range(
+                session, user_id, schemas.BookingCreateTimeRange(
+                    zone_id=zone_id, date=day,
+                    start_hour=start_hour, start_minute=0, end_hour=end_hour, end_minute=0,
+                ),
+            )
+            return booking.id if booking else None
+
+    started = time.perf_counter()
+    results = await asyncio.gather(*[
+        claim(user_id, *hours[user_id % len(hours)]) for user_id in range(1, count + 1)
+    ])
+    return results, time.perf_counter() - started
+
+
+async def _slot_count(Session):
+    async with Session() as session:
+        return (await session.execute(select(func.count(models.Slot.id)))).scalar_one()
+
+
+async def _claim_all(Session, slot_ids):
+    async def claim(user_id, slot_id):
+        async with Session() as session:
+            booking = await crud.create_booking(
+                session, user_id, schemas.BookingCreate(slot_id=slot_id)
+            )
+            return booking.id if booking else None
+
+    started = time.perf_counter()
+    results = await asyncio.gather(*[
+        claim(user_id, slot_id) for user_id, slot_id in enumerate(slot_ids, start=1)
+    ])
+    return results, time.perf_counter() - started
+
+
+async def _booking_count(Session):
+    async with Session() as session:
+        return (await session.execute(select(func.count(models.Booking.id)))).scalar_one()
+
+
+@pytest.mark.asyncio
+async def test_concurrent_claims_on_one_slot(engine):
+    """Все запросы на один слот: бронь ровно одна, отказ — один запрос к БД"""
+    Session = async_sessionmaker(bind=engine, expire_on_commit=False, class_=AsyncSession)
+    [slot_id] = await _slots(Session, 1)
+
+    results, elapsed = await _claim_all(Session, [slot_id] * CLAIMS)
+    print(f"\n{CLAIMS} захватов одного слота: {CLAIMS / elapsed:8.0f} запросов/с")
+
+    assert sum(result is not None for result in results) == 1
+    assert await _booking_count(Session) == 1
+    async with Session() as session:
+        assert (await session.get(models.Slot, slot_id)).is_available is False
+
+    statements = []
+
+    def count(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    event.listen(engine.sync_engine, "before_cursor_execute", count)
+    try:
+        async with Session() as session:
+            assert await crud.create_booking(
+                session, 999, schemas.BookingCreate(slot_id=slot_id)
+            ) is None
+    finally:
+        event.remove(engine.sync_engine, "before_cursor_execute", count)
+    assert len(statements) == 1
+    assert statements[0].lstrip().upper().startswith("UPDATE SLOTS")
+
+
+@pytest.mark.asyncio
+async def test_concurrent_claims_on_different_slots(engine):
+    """Запросы на разные слоты не мешают друг другу: созданы все брони"""
+    Session = async_sessionmaker(bind=engine, expire_on_commit=False, class_=AsyncSession)
+    slot_ids = await _slots(Session, CLAIMS)
+
+    results, elapsed = await _claim_all(Session, slot_ids)
+    print(f"\n{CLAIMS} захватов разных слотов: {CLAIMS / elapsed:8.0f} запросов/с")
+
+    assert all(result is not None for result in results)
+    assert len(set(results)) == CLAIMS
+    assert await _booking_count(Session) == CLAIMS
+
+
+@pytest.mark.asyncio
+async def test_concurrent_adhoc_claims_on_one_place(engine):
+    """Брони по времени на единственное место без сетки: один слот, одна бронь"""
+    Session = async_sessionmaker(bind=engine, expire_on_commit=False, class_=AsyncSession)
+    zone_id = await _places(Session, 1)
+
+    results, elapsed = await _claim_all_by_time(Session, zone_id, CLAIMS)
+    print(f"\n{CLAIMS} захватов места вне сетки: {CLAIMS / elapsed:8.0f} запросов/с")
+
+    assert sum(result is not None for result in results) == 1
+    assert await _booking_count(Session) == 1
+    assert await _slot_count(Session) == 1
+    async with Session() as session:
+        [slot] = (await session.execute(select(models.Slot))).scalars().all()
+        assert slot.is_available is False
+
+
+@pytest.mark.asyncio
+async def test_concurrent_overlapping_adhoc_claims(engine):
+    """09:00–11:00 и 10:00–12:00 на одно место: уникальный индекс их не различает,
+    место всё равно получает ровно одна бронь"""
+    Session = async_sessionmaker(bind=engine, expire_on_commit=False, class_=AsyncSession)
+    zone_id = await _places(Session, 1)
+
+    results, _ = await _claim_all_by_time(Session, zone_id, CLAIMS, hours=((9, 11), (10, 12)))
+
+    assert sum(result is not None for result in results) == 1
+    assert await _booking_count(Session) == 1
+    async with Session() as session:
+        taken = (await session.execute(
+            select(func.count(models.Slot.id)).where(models.Slot.is_available.is_(False))
+        )).scalar_one()
+    assert taken == 1
+
+
+@pytest.mark.asyncio
+async def test_concurrent_grid_and_overlapping_adhoc_claims(engine):
+    """Ячейка сетки 10:00–11:00 по id и бронь 09:00–11:00 на то же место: одна бронь"""
+    Session = async_sessionmaker(bind=engine, expire_on_commit=False, class_=AsyncSession)
+    zone_id = await _places(Session, 1)
+    day = (datetime.utcnow() + timedelta(days=1)).replace(hour=0, minute=0, second=0, microsecond=0)
+    async with Session() as session:
+        [place] = await crud.get_places_by_zone(session, zone_id)
+        cell = models.Slot(
+            place_id=place.id,
+            start_time=day + timedelta(hours=10),
+            end_time=day + timedelta(hours=11),
+            is_available=True,
+        )
+        session.add(cell)
+        await session.commit()
+
+    half = CLAIMS // 2
+    (by_id, _), (by_time, _) = await asyncio.gather(
+        _claim_all(Session, [cell.id] * half),
+        _claim_all_by_time(Session, zone_id, half, hours=((9, 11),)),
+    )
+
+    assert sum(result is not None for result in by_id + by_time) == 1
+    assert await _booking_count(Session) == 1
+
+
+@pytest.mark.asyncio
+async def test_concurrent_adhoc_claims_spread_over_places(engine):
+    """Проигравший захват места переходит к следующему: брони на всех местах"""
+    Session = async_sessionmaker(bind=engine, expire_on_commit=False, class_=AsyncSession)
+    places = 5
+    zone_id = await _places(Session, places)
+
+    results, _ = await _claim_all_by_time(Session, zone_id, places)
+
+    created = [result for result in results if result is not None]
+    assert await _booking_count(Session) == len(created)
+    async with Session() as session:
+        rows = (await session.execute(
+            select(models.Slot.place_id, models.Slot.is_available)
+        )).all()
+    # Слот на каждое место не больше одного, все созданные слоты заняты
+    assert len({place_id for place_id, _ in rows}) == len(rows)
+    assert all(not available for _, available in rows)
+    assert len(rows) >= len(created)
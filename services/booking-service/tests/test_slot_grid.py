@@ -0,0 +1,190 @@
+"""
+Тесты генерации сетки слотов и сборщика неиспользованных слотов.
+"""
+import pytest
+from datetime import date, time, timedelta
+
+from sqlalchemy import func, select
+
+import crud
+import models
+import schemas
+import slot_grid
+
+ADMIN_HEADERS = {"X-User-Id": "1", "X-User-Role": "admin"}
+HEADERS = {"X-User-Id": "2", "X-User-Role": "user"}
+DAY = date.today() + timedelta(days=3)
+
+
+async def _zone(test_session, places=2):
+    zone = models.Zone(
+        name="Grid Zone",
+        address="Addr",
+        is_active=True,
+        opens_at=time(9, 0),
+        closes_at=time(12, 0),
+        slot_minutes=60,
+    )
+    test_session.add(zone)
+    await test_session.flush()
+    for i in range(places):
+        test_session.add(models.Place(zone_id=zone.id, name=f"Place {i}", is_active=True))
+    await test_session.commit()
+    return zone
+
+
+async def _slot_count(test_session):
+    return (await test_session.execute(select(func.count(models.Slot.id)))).scalar()
+
+
+@pytest.mark.asyncio
+async def test_generate_grid_is_idempotent(test_session):
+    """Сетка: места x дни x ячейки, повторный запуск ничего не добавляет"""
+    zone = await _zone(test_session)
+
+    places, created = await slot_grid.generate_slot_grid(
+        test_session, zone.id, DAY, DAY + timedelta(days=1)
+    )
+    assert places == 2
+    assert created == 2 * 2 * 3
+
+    _, created = await slot_grid.generate_slot_grid(
+        test_session, zone.id, DAY, DAY + timedelta(days=2)
+    )
+    assert created == 2 * 3
+    assert await _slot_count(test_session) == 2 * 3 * 3
+
+
+@pytest.mark.asyncio
+async def test_booking_flips_existing_grid_cell(test_session):
+    """Бронь по времени ячейки переключает её, а не создаёт новый слот"""
+    zone = await _zone(test_session, places=1)
+    await slot_grid.generate_slot_grid(test_session, zone.id, DAY, DAY)
+
+    booking = await crud.create_booking_by_time_range(
+        test_session,
+        user_id=2,
+        booking_in=schemas.BookingCreateTimeRange(
+            zone_id=zone.id,
+            date=DAY.isoformat(),
+            start_hour=10,
+            start_minute=0,
+            end_hour=11,
+            end_minute=0,
+        ),
+    )
+    assert booking is not None
+    assert await _slot_count(test_session) == 3
+    slot = await test_session.get(models.Slot, booking.slot_id)
+    assert slot.is_available is False
+
+    # Пересекающаяся бронь произвольной длины на единственное место не проходит
+    overlapping = await crud.create_booking_by_time_range(
+        test_session,
+        user_id=3,
+        booking_in=schemas.BookingCreateTimeRange(
+            zone_id=zone.id,
+            date=DAY.isoformat(),
+            start_hour=9,
+            start_minute=30,
+            end_hour=10,
+            end_minute=30,
+        ),
+    )
+    assert overlapping is None
+
+
+@pytest.mark.asyncio
+async def test_matrix_shows_cells_under_unaligned_booking_as_taken(test_client, test_session):
+    """Бронь 09:30–10:30 не совпадает с ячейкой: занятыми видны обе ячейки под ней"""
+    zone = await _zone(test_session, places=1)
+    await slot_grid.generate_slot_grid(test_session, zone.id, DAY, DAY)
+    booking = await crud.create_booking_by_time_range(
+        test_session,
+        user_id=2,
+        booking_in=schemas.BookingCreateTimeRange(
+            zone_id=zone.id,
+            date=DAY.isoformat(),
+            start_hour=9,
+            start_minute=30,
+            end_hour=10,
+            end_minute=30,
+        ),
+    )
+    assert booking is not None
+
+    async def availability():
+        response = await test_client.get(
+            f"/zones/{zone.id}/slots",
+            params={"from": DAY.isoformat(), "to": DAY.isoformat()},
+            headers=HEADERS,
+        )
+        data = response.json()
+        return dict(zip(data["start_offsets"], data["available"]))
+
+    # 9:00 и 10:00 — ячейки сетки, 9:30 — слот самой брони
+    assert await availability() == {540: False, 570: False, 600: False, 660: True}
+    place_id = (await test_session.get(models.Slot, booking.slot_id)).place_id
+    response = await test_client.get(
+        f"/places/{place_id}/slots", params={"date": DAY.isoformat()}, headers=HEADERS
+    )
+    assert [slot["is_available"] for slot in response.json()] == [False, False, False, True]
+
+    # Отмена освобождает и ячейки под бронью
+    await crud.cancel_booking(test_session, 2, booking.id)
+    assert await availability() == {540: True, 570: True, 600: True, 660: True}
+
+
+@pytest.mark.asyncio
+async def test_gc_removes_only_unused_past_slots(test_session):
+    """GC удаляет прошедшие слоты без броней, в том числе занятые (бронь ушла в архив)"""
+    zone = await _zone(test_session, places=1)
+    past = date.today() - timedelta(days=2)
+    await slot_grid.generate_slot_grid(test_session, zone.id, past, past)
+    await slot_grid.generate_slot_grid(test_session, zone.id, DAY, DAY)
+
+    used, orphan = (await test_session.execute(
+        select(models.Slot).order_by(models.Slot.start_time).limit(2)
+    )).scalars().all()
+    used.is_available = False
+    orphan.is_available = False
+    test_session.add(models.Booking(user_id=2, slot_id=used.id, status="active"))
+    await test_session.commit()
+
+    deleted = await slot_grid.collect_unused_slots(test_session)
+    assert deleted == 2
+    assert await _slot_count(test_session) == 1 + 3
+
+
+@pytest.mark.asyncio
+async def test_generate_grid_endpoint(test_client, test_session):
+    """POST /admin/zones/{id}/slots/generate: только админ, 404 и лимит дней"""
+    zone = await _zone(test_session)
+    body = {"date_from": DAY.isoformat(), "date_to": DAY.isoformat()}
+
+    response = await test_client.post(
+        f"/admin/zones/{zone.id}/slots/generate", json=body, headers=HEADERS
+    )
+    assert response.status_code == 403
+
+    response = await test_client.post(
+        f"/admin/zones/{zone.id}/slots/generate", json=body, headers=ADMIN_HEADERS
+    )
+    assert response.status_code == 200
+    assert response.json() == {"zone_id": zone.id, "places": 2, "days": 1, "created": 6}
+
+    response = await test_client.post(
+        "/admin/zones/999999/slots/generate", json=body, headers=ADMIN_HEADERS
+    )
+    assert response.status_code == 404
+
+    response = await test_client.post(
+        f"/admin/zones/{zone.id}/slots/generate",
+        json={"date_from": DAY.isoformat(), "date_to": (DAY + timedelta(days=400)).isoformat()},
+        headers=ADMIN_HEADERS,
+    )
+    assert response.status_code == 400
+
+    response = await test_client.post("/admin/slots/gc", headers=ADMIN_HEADERS)
+    assert response.status_code == 200
+    assert response.json() == {"deleted": 0}
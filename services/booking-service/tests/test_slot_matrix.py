@@ -0,0 +1,78 @@
+"""
+Тесты матрицы слотов зоны: GET /zones/{id}/slots?from=&to=.
+"""
+import pytest
+from datetime import datetime, timedelta
+
+import models
+
+HEADERS = {"X-User-Id": "1", "X-User-Role": "user"}
+
+
+async def _zone_with_slots(test_session):
+    zone = models.Zone(name="Matrix Zone", address="Addr", is_active=True)
+    other = models.Zone(name="Other Zone", address="Addr", is_active=True)
+    test_session.add_all([zone, other])
+    await test_session.flush()
+    first = models.Place(zone_id=zone.id, name="Место 1", is_active=True)
+    second = models.Place(zone_id=zone.id, name="Место 2", is_active=True)
+    disabled = models.Place(zone_id=zone.id, name="Место 3", is_active=False)
+    foreign = models.Place(zone_id=other.id, name="Место 1", is_active=True)
+    test_session.add_all([first, second, disabled, foreign])
+    await test_session.flush()
+    day = datetime(2026, 3, 2)
+    rows = [
+        (second, day + timedelta(hours=9), 60, True),
+        (first, day + timedelta(days=1, hours=10, minutes=30), 90, False),
+        (first, day + timedelta(hours=8), 60, True),
+        (disabled, day + timedelta(hours=8), 60, True),
+        (foreign, day + timedelta(hours=8), 60, True),
+        (first, day + timedelta(days=7, hours=8), 60, True),  # за интервалом
+    ]
+    for place, start, minutes, available in rows:
+        test_session.add(models.Slot(
+            place_id=place.id,
+            start_time=start,
+            end_time=start + timedelta(minutes=minutes),
+            is_available=available,
+        ))
+    await test_session.commit()
+    return zone, first, second
+
+
+@pytest.mark.asyncio
+async def test_zone_slot_matrix_is_columnar(test_client, test_session):
+    """Слоты активных мест зоны за интервал — параллельными массивами"""
+    zone, first, second = await _zone_with_slots(test_session)
+
+    response = await test_client.get(
+        f"/zones/{zone.id}/slots", params={"from": "2026-03-02", "to": "2026-03-03"},
+        headers=HEADERS,
+    )
+    assert response.status_code == 200
+    data = response.json()
+    assert data["origin"].startswith("2026-03-02T00:00:00")
+    assert data["place_ids"] == [first.id, first.id, second.id]
+    assert data["start_offsets"] == [8 * 60, 24 * 60 + 10 * 60 + 30, 9 * 60]
+    assert data["durations"] == [60, 90, 60]
+    assert data["available"] == [True, False, True]
+    assert len(data["slot_ids"]) == 3
+
+
+@pytest.mark.asyncio
+async def test_zone_slot_matrix_errors(test_client, test_session):
+    """Неизвестная зона — 404, перевёрнутый или слишком длинный интервал — 400"""
+    zone, _, _ = await _zone_with_slots(test_session)
+
+    response = await test_client.get(
+        f"/zones/{zone.id + 100}/slots", params={"from": "2026-03-02", "to": "2026-03-03"}
+    )
+    assert response.status_code == 404
+    response = await test_client.get(
+        f"/zones/{zone.id}/slots", params={"from": "2026-03-03", "to": "2026-03-02"}
+    )
+    assert response.status_code == 400
+    response = await test_client.get(
+        f"/zones/{zone.id}/slots", params={"from": "2026-01-01", "to": "2026-06-01"}
+    )
+    assert response.status_code == 400
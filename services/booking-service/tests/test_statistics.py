@@ -160,3 +160,49 @@ async def test_get_global_statistics_non_admin_forbidden(test_client, test_sessi
         headers={"X-User-Id": "1", "X-User-Role": "user"}
     )
     assert response.status_code == 403
+
+
+@pytest.mark.asyncio
+async def test_statistics_served_from_snapshot(test_client, test_session, monkeypatch):
+    """Повторные опросы панели отдают снимок, агрегат считается один раз"""
+    from config import settings
+    from dashboard import dashboard
+
+    monkeypatch.setattr(settings, "STATISTICS_REFRESH_SECONDS", 5.0)
+    monkeypatch.setattr(settings, "STATISTICS_MAX_AGE_SECONDS", 60.0)
+    headers = {"X-User-Id": "1", "X-User-Role": "admin"}
+
+    zone = models.Zone(name="Snapshot Zone", address="Addr", is_active=True)
+    test_session.add(zone)
+    await test_session.commit()
+
+    builds = dashboard.builds
+    for _ in range(5):
+        zones = await test_client.get("/admin/zones/statistics", headers=headers)
+        totals = await test_client.get("/admin/statistics", headers=headers)
+        assert zones.status_code == totals.status_code == 200
+    assert dashboard.builds == builds + 1
+    assert [z["zone_name"] for z in zones.json()] == ["Snapshot Zone"]
+    assert zones.json()[0]["active_bookings"] == 0
+
+    place = models.Place(zone_id=zone.id, name="Place 1", is_active=True)
+    test_session.add(place)
+    await test_session.flush()
+    now = datetime.utcnow()
+    slot = models.Slot(
+        place_id=place.id, start_time=now, end_time=now + timedelta(hours=1), is_available=False
+    )
+    test_session.add(slot)
+    await test_session.flush()
+    test_session.add(models.Booking(
+        user_id=1, slot_id=slot.id, status="active",
+        start_time=slot.start_time, end_time=slot.end_time,
+    ))
+    await test_session.commit()
+
+    # Новая бронь видна после пересборки снимка (в сервисе — фоновой задачей)
+    stale = await test_client.get("/admin/statistics", headers=headers)
+    assert stale.json()["total_active_bookings"] == 0
+    await dashboard.refresh(test_session)
+    fresh = await test_client.get("/admin/statistics", headers=headers)
+    assert fresh.json()["total_active_bookings"] == 1
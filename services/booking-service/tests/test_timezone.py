@@ -3,7 +3,10 @@
 """
 import pytest
 from datetime import datetime, timedelta, timezone
-import pytz
+
+from sqlalchemy import select
+
+import models
 
 from timezone_utils import (
     now_msk,
@@ -11,6 +14,8 @@ from timezone_utils import (
     to_msk,
     msk_to_utc,
     utc_to_msk,
+    AmbiguousTimeError,
+    NonExistentTimeError,
     MOSCOW_TZ,
 )
 
@@ -50,7 +55,7 @@ def test_to_msk_converts_naive_utc_to_moscow():
 def test_to_msk_converts_aware_utc_to_moscow():
     """Проверка преобразования aware UTC datetime в московское время."""
     # Создаем aware UTC datetime
-    utc_time = pytz.UTC.localize(datetime(2025, 1, 15, 12, 0, 0))
+    utc_time = datetime(2025, 1, 15, 12, 0, 0).replace(tzinfo=timezone.utc)
     
     result = to_msk(utc_time)
     
@@ -75,7 +80,7 @@ def test_msk_to_utc_converts_naive_moscow_to_utc():
 def test_msk_to_utc_converts_aware_moscow_to_utc():
     """Проверка преобразования aware московского времени в UTC."""
     # Создаем aware московское datetime
-    msk_time = MOSCOW_TZ.localize(datetime(2025, 1, 15, 15, 0, 0))
+    msk_time = datetime(2025, 1, 15, 15, 0, 0).replace(tzinfo=MOSCOW_TZ)
     
     result = msk_to_utc(msk_time)
     
@@ -97,7 +102,7 @@ def test_utc_to_msk_converts_naive_utc_to_moscow():
 
 def test_utc_to_msk_converts_aware_utc_to_moscow():
     """Проверка преобразования aware UTC в московское время."""
-    utc_time = pytz.UTC.localize(datetime(2025, 1, 15, 12, 0, 0))
+    utc_time = datetime(2025, 1, 15, 12, 0, 0).replace(tzinfo=timezone.utc)
     
     result = utc_to_msk(utc_time)
     
@@ -108,7 +113,7 @@ def test_utc_to_msk_converts_aware_utc_to_moscow():
 
 def test_round_trip_conversion():
     """Проверка обратной конвертации: MSK -> UTC -> MSK."""
-    original = MOSCOW_TZ.localize(datetime(2025, 1, 15, 15, 30, 45))
+    original = datetime(2025, 1, 15, 15, 30, 45).replace(tzinfo=MOSCOW_TZ)
     
     # MSK -> UTC
     utc = msk_to_utc(original)
@@ -122,3 +127,68 @@ def test_round_trip_conversion():
     assert back_to_msk.hour == original.hour
     assert back_to_msk.minute == original.minute
     assert back_to_msk.second == original.second
+
+
+def test_historical_moscow_offsets():
+    """Смещение берётся из истории зоны: +4 в 2011–2014, +3 до и после."""
+    assert msk_to_utc(datetime(2013, 1, 15, 15, 0)) == datetime(2013, 1, 15, 11, 0)
+    assert msk_to_utc(datetime(2015, 1, 15, 15, 0)) == datetime(2015, 1, 15, 12, 0)
+    assert msk_to_utc(datetime(2010, 7, 1, 12, 0)) == datetime(2010, 7, 1, 8, 0)  # летнее +4
+
+
+def test_msk_to_utc_rejects_skipped_time():
+    """28.03.2010 часы переведены с 02:00 на 03:00 — 02:30 не существует."""
+    with pytest.raises(NonExistentTimeError):
+        msk_to_utc(datetime(2010, 3, 28, 2, 30))
+    assert msk_to_utc(datetime(2010, 3, 28, 3, 0)) == datetime(2010, 3, 27, 23, 0)
+
+
+@pytest.mark.parametrize("moment", [
+    datetime(2010, 10, 31, 2, 30),  # перевод с летнего времени
+    datetime(2014, 10, 26, 1, 30),  # переход с +4 на +3
+])
+def test_msk_to_utc_rejects_ambiguous_time(moment):
+    """Время, которое было дважды, без явного смещения не угадываем."""
+    with pytest.raises(AmbiguousTimeError):
+        msk_to_utc(moment)
+
+
+def test_utc_to_msk_across_2014_transition():
+    """Оба прохода неоднозначного часа различаются по fold и смещению."""
+    first = utc_to_msk(datetime(2014, 10, 25, 21, 30))
+    second = utc_to_msk(datetime(2014, 10, 25, 22, 30))
+    assert first.replace(tzinfo=None) == second.replace(tzinfo=None) == datetime(2014, 10, 26, 1, 30)
+    assert first.utcoffset() == timedelta(hours=4)
+    assert second.utcoffset() == timedelta(hours=3)
+    assert msk_to_utc(second) == datetime(2014, 10, 25, 22, 30)
+
+
+@pytest.mark.asyncio
+async def test_models_store_and_return_naive_utc(test_session):
+    """Колонки моделей принимают любое время и всегда отдают naive UTC."""
+    zone = models.Zone(name="TZ Zone", address="Addr", is_active=True)
+    test_session.add(zone)
+    await test_session.flush()
+    place = models.Place(zone_id=zone.id, name="Место 1", is_active=True)
+    test_session.add(place)
+    await test_session.flush()
+
+    slot = models.Slot(
+        place_id=place.id,
+        start_time=datetime(2025, 1, 15, 15, 0, tzinfo=MOSCOW_TZ),
+        end_time=datetime(2025, 1, 15, 13, 0, tzinfo=timezone.utc),
+        is_available=True,
+    )
+    # Присвоенное значение нормализуется сразу, до записи в БД
+    assert slot.start_time == datetime(2025, 1, 15, 12, 0)
+    test_session.add(slot)
+    await test_session.commit()
+    slot_id = slot.id
+
+    test_session.expire_all()
+    stored = (await test_session.execute(
+        select(models.Slot).where(models.Slot.id == slot_id)
+    )).scalar_one()
+    assert stored.start_time == datetime(2025, 1, 15, 12, 0)
+    assert stored.end_time == datetime(2025, 1, 15, 13, 0)
+    assert stored.start_time.tzinfo is None
@@ -0,0 +1,92 @@
+"""
+Бенчмарк преобразований времени (timezone_utils.py).
+
+Сравнивается прежняя реализация на pytz (localize / normalize) с zoneinfo:
+московское время -> UTC, UTC -> московское время и получение текущего
+времени UTC (msk_to_utc(now_msk()) против now_utc()). Печатается стоимость
+одного преобразования в микросекундах. Без установленного pytz сравнение
+с ним пропускается.
+
+Запуск:
+    RUN_BENCHMARKS=1 python -m pytest -s tests/test_timezone_benchmark.py
+Без RUN_BENCHMARKS тесты пропускаются.
+"""
+import os
+import time
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from timezone_utils import msk_to_utc, now_msk, now_utc, utc_to_msk
+
+pytestmark = pytest.mark.skipif(
+    not os.getenv("RUN_BENCHMARKS"),
+    reason="RUN_BENCHMARKS не задан",
+)
+
+COUNT = 10_000
+REPEAT = 5
+# Метки за год с шагом 53 минуты — попадают в разные часы и сутки
+MOMENTS = [datetime(2025, 1, 1) + timedelta(minutes=53 * i) for i in range(COUNT)]
+
+
+def _best(call) -> float:
+    best = float("inf")
+    for _ in range(REPEAT):
+        started = time.perf_counter()
+        call()
+        best = min(best, time.perf_counter() - started)
+    return best / COUNT * 1e6
+
+
+def _report(name: str, old: float, new: float) -> None:
+    print(f"\n{name:<22} {old:6.2f} -> {new:6.2f} мкс")
+
+
+def test_msk_to_utc_cost():
+    pytz = pytest.importorskip("pytz")
+    moscow = pytz.timezone("Europe/Moscow")
+
+    def old():
+        for dt in MOMENTS:
+            moscow.localize(dt, is_dst=None).astimezone(pytz.UTC).replace(tzinfo=None)
+
+    def new():
+        for dt in MOMENTS:
+            msk_to_utc(dt)
+
+    old_cost, new_cost = _best(old), _best(new)
+    _report("МСК -> UTC", old_cost, new_cost)
+    assert new_cost < old_cost
+
+
+def test_utc_to_msk_cost():
+    pytz = pytest.importorskip("pytz")
+    moscow = pytz.timezone("Europe/Moscow")
+
+    def old():
+        for dt in MOMENTS:
+            moscow.normalize(pytz.UTC.localize(dt).astimezone(moscow))
+
+    def new():
+        for dt in MOMENTS:
+            utc_to_msk(dt)
+
+    old_cost, new_cost = _best(old), _best(new)
+    _report("UTC -> МСК", old_cost, new_cost)
+    assert new_cost < old_cost
+
+
+def test_current_utc_cost():
+    def old():
+        for _ in range(COUNT):
+            msk_to_utc(now_msk())
+
+    def new():
+        for _ in range(COUNT):
+            now_utc()
+
+    old_cost, new_cost = _best(old), _best(new)
+    _report("текущее время UTC", old_cost, new_cost)
+    assert new_cost < old_cost
+    assert abs(now_utc() - datetime.now(timezone.utc).replace(tzinfo=None)) < timedelta(seconds=1)
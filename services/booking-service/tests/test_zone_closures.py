@@ -0,0 +1,170 @@
+"""
+Тесты массового закрытия зоны и параллельной рассылки уведомлений.
+"""
+import asyncio
+
+import pytest
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import select
+
+import crud
+import models
+import outbox
+import schemas
+from config import settings
+
+ADMIN_HEADERS = {"X-User-Id": "1", "X-User-Role": "admin"}
+
+
+async def _busy_zone(test_session, user_ids):
+    zone = models.Zone(name="Busy Zone", address="Addr", is_active=True)
+    test_session.add(zone)
+    await test_session.flush()
+    start_time = datetime.now(timezone.utc) + timedelta(days=1)
+    slots = []
+    for i, user_id in enumerate(user_ids):
+        place = models.Place(zone_id=zone.id, name=f"Place {i}", is_active=True)
+        test_session.add(place)
+        await test_session.flush()
+        slot = models.Slot(
+            place_id=place.id,
+            start_time=start_time + timedelta(hours=i),
+            end_time=start_time + timedelta(hours=i + 1),
+            is_available=False,
+        )
+        test_session.add(slot)
+        await test_session.flush()
+        test_session.add(models.Booking(user_id=user_id, slot_id=slot.id, status="active"))
+        slots.append(slot)
+    await test_session.commit()
+    request = schemas.ZoneCloseRequest(
+        reason="Ремонт",
+        from_time=start_time - timedelta(hours=1),
+        to_time=start_time + timedelta(days=1),
+    )
+    return zone, slots, request
+
+
+@pytest.mark.asyncio
+async def test_close_zone_groups_notifications_per_user(test_session):
+    """Одно событие outbox на пользователя, слоты освобождены одним проходом"""
+    zone, slots, request = await _busy_zone(test_session, [1, 1, 2])
+
+    closure, bookings = await crud.close_zone_tracked(test_session, zone.id, request)
+
+    assert closure.affected_bookings == 3
+    assert closure.affected_users == 2
+    assert {b.status for b in bookings} == {"cancelled"}
+    assert all("Ремонт" in b.cancellation_reason for b in bookings)
+
+    result = await test_session.execute(
+        select(models.Slot.is_available).where(models.Slot.id.in_([s.id for s in slots]))
+    )
+    assert all(result.scalars().all())
+
+    events = (await test_session.execute(
+        select(models.OutboxEvent).order_by(models.OutboxEvent.id)
+    )).scalars().all()
+    assert [e.payload["user_id"] for e in events] == [1, 2]
+    assert [len(e.payload["intervals"]) for e in events] == [2, 1]
+    assert all(e.zone_closure_id == closure.id for e in events)
+
+
+@pytest.mark.asyncio
+async def test_zone_closure_progress_endpoint(test_client, test_session, monkeypatch):
+    """POST .../closures отвечает 202, GET показывает прогресс рассылки"""
+    zone, _, request = await _busy_zone(test_session, [1, 2, 3])
+
+    async def ok(payload, done):
+        pass
+
+    monkeypatch.setitem(outbox.HANDLERS, outbox.ZONE_CLOSED, ok)
+
+    response = await test_client.post(
+        f"/admin/zones/{zone.id}/closures",
+        json=request.model_dump(mode="json"),
+        headers=ADMIN_HEADERS,
+    )
+    assert response.status_code == 202
+    data = response.json()
+    assert data["status"] == "notifying"
+    assert data["affected_bookings"] == 3
+    assert data["notifications_pending"] == 3
+
+    await outbox.dispatch_batch(test_session, now=datetime.now(timezone.utc) + timedelta(minutes=1))
+
+    response = await test_client.get(
+        f"/admin/zones/{zone.id}/closures/{data['id']}", headers=ADMIN_HEADERS
+    )
+    assert response.status_code == 200
+    data = response.json()
+    assert data["status"] == "completed"
+    assert data["notifications_delivered"] == 3
+
+    response = await test_client.get(
+        f"/admin/zones/{zone.id + 1}/closures/{data['id']}", headers=ADMIN_HEADERS
+    )
+    assert response.status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_dispatcher_concurrency_is_bounded(test_session, monkeypatch):
+    """Одновременно доставляется не больше OUTBOX_CONCURRENCY событий"""
+    running = 0
+    peak = 0
+
+    async def slow(payload, done):
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.01)
+        running -= 1
+
+    monkeypatch.setitem(outbox.HANDLERS, outbox.ZONE_CLOSED, slow)
+    monkeypatch.setattr(settings, "OUTBOX_CONCURRENCY", 3)
+    for user_id in range(10):
+        outbox.enqueue(test_session, outbox.ZONE_CLOSED, user_id=user_id)
+    await test_session.commit()
+
+    outcome = await outbox.dispatch_batch(
+        test_session, now=datetime.now(timezone.utc) + timedelta(minutes=1)
+    )
+    assert outcome.delivered == 10
+    assert peak == 3
+
+
+@pytest.mark.asyncio
+async def test_close_zone_statement_count_is_constant(test_session, test_engine):
+    """Число запросов закрытия (кроме строк outbox) не зависит от числа броней"""
+    from sqlalchemy import event
+
+    async def close(user_ids):
+        zone, slots, request = await _busy_zone(test_session, user_ids)
+        await crud.get_zones(test_session)  # прогрев каталога
+        statements = []
+
+        def count(conn, cursor, statement, *args):
+            # Строки outbox — по одной на пользователя; на Postgres flush пишет
+            # их одним многострочным INSERT, на SQLite — по строке
+            if not statement.startswith("INSERT INTO outbox"):
+                statements.append(statement)
+
+        event.listen(test_engine.sync_engine, "before_cursor_execute", count)
+        try:
+            bookings = await crud.close_zone(test_session, zone.id, request)
+        finally:
+            event.remove(test_engine.sync_engine, "before_cursor_execute", count)
+        assert len(bookings) == len(user_ids)
+        assert all(booking.status == "cancelled" for booking in bookings)
+        freed = (await test_session.execute(
+            select(models.Slot.is_available).where(models.Slot.id.in_([s.id for s in slots]))
+        )).scalars().all()
+        assert all(freed)
+        return statements
+
+    few = await close([1, 2, 3])
+    many = await close(list(range(100, 120)))
+    assert len(few) == len(many)
+    assert sum(s.lstrip().upper().startswith("UPDATE SLOTS") for s in many) == 1
+    assert sum(s.lstrip().upper().startswith("UPDATE BOOKINGS") for s in many) == 1
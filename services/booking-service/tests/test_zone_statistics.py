@@ -255,3 +255,67 @@ async def test_zone_statistics_excludes_cancelled(test_session):
     assert zone_stat.current_occupancy == 0
     assert zone_stat.active_bookings == 0
     assert zone_stat.cancelled_bookings == 1
+
+
+@pytest.mark.asyncio
+async def test_statistics_single_query(test_session, test_engine):
+    """Статистика по зонам и общая — один запрос к БД при прогретом каталоге"""
+    from sqlalchemy import event
+
+    for name in ("Зона А", "Зона Б"):
+        test_session.add(models.Zone(name=name, address="Адрес", is_active=True))
+    await test_session.commit()
+    await crud.get_zones_statistics(test_session)  # прогрев каталога
+
+    statements = []
+
+    def count(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    event.listen(test_engine.sync_engine, "before_cursor_execute", count)
+    try:
+        zones, totals = await crud.get_statistics(test_session)
+    finally:
+        event.remove(test_engine.sync_engine, "before_cursor_execute", count)
+
+    assert len(statements) == 1
+    assert [z.zone_name for z in zones] == ["Зона А", "Зона Б"]
+    assert totals.total_active_bookings == 0
+
+
+@pytest.mark.asyncio
+async def test_current_occupancy_same_everywhere(test_session):
+    """
+    current_occupancy — идущие сейчас активные брони (занятые места) в списке
+    зон, статистике и карточке зоны; users_in_coworking_now — разные люди.
+    """
+    from admin import calc_zone_stats
+
+    zone = models.Zone(name="Зона", address="Адрес", is_active=True)
+    test_session.add(zone)
+    await test_session.flush()
+    now = datetime.utcnow()
+    for i in range(2):
+        place = models.Place(zone_id=zone.id, name=f"Место {i}", is_active=True)
+        test_session.add(place)
+        await test_session.flush()
+        slot = models.Slot(
+            place_id=place.id,
+            start_time=now - timedelta(minutes=30),
+            end_time=now + timedelta(minutes=30),
+            is_available=False,
+        )
+        test_session.add(slot)
+        await test_session.flush()
+        # Один пользователь занял оба места
+        test_session.add(models.Booking(
+            user_id=1, slot_id=slot.id, status="active", zone_id=zone.id,
+            zone_name=zone.name, start_time=slot.start_time, end_time=slot.end_time,
+        ))
+    await test_session.commit()
+
+    [listed] = await crud.get_zones(test_session)
+    [stat], totals = await crud.get_statistics(test_session)
+    card = await calc_zone_stats(test_session, zone.id)
+    assert listed.current_occupancy == stat.current_occupancy == card["current_occupancy"] == 2
+    assert totals.users_in_coworking_now == 1
@@ -1,19 +1,33 @@
 """
 Утилиты для работы с московским временем.
 Все даты и время в проекте используют часовой пояс Europe/Moscow.
-БД хранит времена в UTC (naive datetime), но при работе с API они преобразуются в московское время.
+БД хранит времена в UTC; колонки моделей имеют тип UTCDateTime (models.py):
+атрибуты моделей всегда naive UTC — и прочитанные из БД (SQLite отдаёт naive,
+Postgres — aware), и присвоенные в коде.
+
+Реализация на stdlib zoneinfo: объект зоны кэширует таблицу переходов, а
+смещение вычисляется в C — в разы быстрее pytz localize/normalize. Замеры —
+tests/test_timezone_benchmark.py.
 """
 from datetime import datetime, timezone
-import pytz
+from zoneinfo import ZoneInfo
 
 # Московский часовой пояс
-MOSCOW_TZ = pytz.timezone('Europe/Moscow')
+MOSCOW_TZ = ZoneInfo("Europe/Moscow")
+
+
+class NonExistentTimeError(ValueError):
+    """Московского времени нет: пропущено при переводе часов вперёд."""
+
+
+class AmbiguousTimeError(ValueError):
+    """Московское время встречается дважды: при переводе часов назад."""
 
 
 def now_msk() -> datetime:
     """
     Возвращает текущее время в московском часовом поясе.
-    
+
     Returns:
         datetime: Текущее время с timezone=Europe/Moscow
     """
@@ -23,60 +37,105 @@ def now_msk() -> datetime:
 def now_utc() -> datetime:
     """
     Возвращает текущее время в UTC (naive datetime).
-    Используется для значений по умолчанию в моделях SQLAlchemy.
-    
+    Используется для значений по умолчанию в моделях SQLAlchemy и вместо
+    msk_to_utc(now_msk()) — результат тот же без двух преобразований.
+
     Returns:
         datetime: Текущее время в UTC без timezone info
     """
     return datetime.now(timezone.utc).replace(tzinfo=None)
 
 
+def as_utc(dt: datetime) -> datetime:
+    """
+    Приводит datetime к aware UTC; naive считается временем UTC.
+    """
+    if dt.tzinfo is None:
+        return dt.replace(tzinfo=timezone.utc)
+    if dt.tzinfo is timezone.utc:
+        return dt
+    return dt.astimezone(timezone.utc)
+
+
+def naive_utc(dt: datetime) -> datetime:
+    """
+    Приводит datetime к naive UTC — представлению времени в моделях
+    (models.UTCDateTime); naive считается уже UTC.
+    """
+    if dt.tzinfo is None:
+        return dt
+    return dt.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def utc_iso(dt: datetime) -> str:
+    """
+    ISO 8601 в UTC с суффиксом "Z" — формат времени в ответах API; naive
+    считается UTC. Без смещения браузер (new Date) прочёл бы время как локальное.
+    """
+    return as_utc(dt).isoformat().replace("+00:00", "Z")
+
+
 def to_msk(dt: datetime) -> datetime:
     """
     Преобразует datetime в московский часовой пояс.
-    
+
     Args:
         dt: datetime объект (может быть naive или aware)
-    
+
     Returns:
         datetime: datetime с timezone=Europe/Moscow
     """
     if dt.tzinfo is None:
         # Если naive datetime, считаем что это UTC
-        dt = pytz.UTC.localize(dt)
+        dt = dt.replace(tzinfo=timezone.utc)
     return dt.astimezone(MOSCOW_TZ)
 
 
+def _localize(dt: datetime) -> datetime:
+    """
+    Naive московское время -> aware. Как pytz localize(is_dst=None):
+    несуществующее или неоднозначное время (переход часов) — ошибка.
+    """
+    first = dt.replace(tzinfo=MOSCOW_TZ, fold=0)
+    second = dt.replace(tzinfo=MOSCOW_TZ, fold=1)
+    if first.utcoffset() == second.utcoffset():
+        return first
+    # Несуществующее время не переживает круг через UTC
+    if first.astimezone(timezone.utc).astimezone(MOSCOW_TZ).replace(tzinfo=None) != dt:
+        raise NonExistentTimeError(dt.isoformat())
+    raise AmbiguousTimeError(dt.isoformat())
+
+
 def msk_to_utc(dt: datetime) -> datetime:
     """
     Преобразует московское время в UTC.
     Используется для работы с БД, которая хранит времена в UTC.
-    
+
     Args:
         dt: datetime объект в московском времени
-    
+
     Returns:
         datetime: datetime в UTC без timezone info (naive)
     """
     if dt.tzinfo is None:
-        # Если naive datetime, считаем что это московское время
-        # is_dst=None вызовет исключение при неоднозначном времени (DST переход)
-        dt = MOSCOW_TZ.localize(dt, is_dst=None)
-    return dt.astimezone(pytz.UTC).replace(tzinfo=None)
+        # Если naive datetime, считаем что это московское время;
+        # неоднозначное время (переход часов) вызывает исключение
+        dt = _localize(dt)
+    return dt.astimezone(timezone.utc).replace(tzinfo=None)
 
 
 def utc_to_msk(dt: datetime) -> datetime:
     """
     Преобразует UTC время в московское.
-    
+
     Args:
         dt: datetime объект в UTC (может быть naive или aware)
-    
+
     Returns:
         datetime: datetime с timezone=Europe/Moscow
     """
     if dt.tzinfo is None:
         # Если naive datetime, считаем что это UTC
-        dt = pytz.UTC.localize(dt)
+        dt = dt.replace(tzinfo=timezone.utc)
     return dt.astimezone(MOSCOW_TZ)
 
@@ -1,3 +1,11 @@
+"""
+Выполнение одного SQL-файла (схемы users/bookings общей БД и старые
+migration_add_*.sql).
+
+Схемой booking-service управляют версионные миграции
+services/booking-service/migrations (migrator.py): они применяются при
+старте сервиса, а migration_add_*.sql вошли в 0001_baseline.sql.
+"""
 import psycopg2
 from config import DATABASE_URL
 
@@ -15,5 +23,6 @@ if __name__ == "__main__":
     import sys
     if len(sys.argv) != 2:
         print("Usage: migrate.py <sqlfile>")
+        print("Схема booking-service: cd services/booking-service && python migrator.py")
     else:
         run_sql_file(sys.argv[1])
\ No newline at end of file
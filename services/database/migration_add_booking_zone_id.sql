@@ -0,0 +1,24 @@
+-- Миграция: денормализованный zone_id в bookings
+-- Дата: 2026-10-19
+--
+-- Вместимость, закрытие зоны, статистика и история фильтруют брони по зоне
+-- напрямую по bookings.zone_id, без join bookings -> slots -> places.
+-- Заодно заполняются start_time/end_time у старых броней, где их не было:
+-- фильтры по времени тоже идут по bookings.
+
+ALTER TABLE bookings
+ADD COLUMN IF NOT EXISTS zone_id INT REFERENCES zones(id) ON DELETE CASCADE;
+
+UPDATE bookings AS b
+SET zone_id = p.zone_id,
+    start_time = COALESCE(b.start_time, s.start_time),
+    end_time = COALESCE(b.end_time, s.end_time)
+FROM slots AS s
+JOIN places AS p ON p.id = s.place_id
+WHERE s.id = b.slot_id
+  AND (b.zone_id IS NULL OR b.start_time IS NULL OR b.end_time IS NULL);
+
+CREATE INDEX IF NOT EXISTS ix_booking_zone_status_time
+    ON bookings (zone_id, status, start_time, end_time);
+
+ANALYZE bookings;
@@ -0,0 +1,34 @@
+-- Миграция: архив броней, партиционированный по месяцам start_time
+-- Дата: 2026-10-19
+--
+-- Таблицу наполняет booking-service/archive.py: брони, закончившиеся раньше
+-- начала месяца (сейчас - ARCHIVE_AFTER_MONTHS), переносятся сюда пачками,
+-- освободившиеся прошлые слоты удаляются. Месячные партиции
+-- bookings_archive_yYYYYmMM создаются задачей перед переносом пачки.
+--
+-- Живые bookings/slots не партиционируются: ключ партиционирования пришлось бы
+-- включить в PK и в уникальный индекс слотов, а FK bookings.slot_id -> slots.id
+-- стал бы составным. Архивация держит горячие таблицы маленькими без этого.
+
+CREATE TABLE IF NOT EXISTS bookings_archive (
+    id INT NOT NULL,
+    start_time TIMESTAMP WITH TIME ZONE NOT NULL,
+    end_time TIMESTAMP WITH TIME ZONE,
+    user_id INT NOT NULL,
+    slot_id INT NOT NULL,
+    zone_id INT,
+    zone_name VARCHAR(255),
+    zone_address VARCHAR(255),
+    status VARCHAR(32) NOT NULL,
+    cancellation_reason TEXT,
+    created_at TIMESTAMP WITH TIME ZONE NOT NULL,
+    updated_at TIMESTAMP WITH TIME ZONE NOT NULL,
+    archived_at TIMESTAMP WITH TIME ZONE DEFAULT NOW() NOT NULL,
+    PRIMARY KEY (id, start_time)
+) PARTITION BY RANGE (start_time);
+
+CREATE TABLE IF NOT EXISTS bookings_archive_default
+    PARTITION OF bookings_archive DEFAULT;
+
+CREATE INDEX IF NOT EXISTS ix_booking_archive_user_created
+    ON bookings_archive (user_id, created_at);
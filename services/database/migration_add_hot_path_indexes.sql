@@ -0,0 +1,32 @@
+-- Миграция: составные и частичные индексы под горячие запросы booking-service
+-- Дата: 2026-10-19
+--
+-- Таблицы booking-service создаются по models.py в схеме по умолчанию
+-- (search_path), поэтому имена ниже не квалифицированы схемой.
+-- Индексы совпадают с __table_args__ моделей Booking / Slot.
+--
+-- На большой таблице лучше применять через psql по одной команде,
+-- заменив CREATE INDEX на CREATE INDEX CONCURRENTLY (вне транзакции).
+
+-- Пересечения броней пользователя: crud.check_user_booking_conflicts
+CREATE INDEX IF NOT EXISTS ix_booking_user_active_time
+    ON bookings (user_id, start_time, end_time)
+    WHERE status = 'active';
+
+-- Вместимость зоны и статистика по активным броням во времени:
+-- crud.check_zone_capacity, crud.get_global_statistics, admin.calc_zone_stats.
+-- INCLUDE даёт index-only scan для join на slots и подсчёта пользователей.
+CREATE INDEX IF NOT EXISTS ix_booking_active_time
+    ON bookings (start_time, end_time)
+    INCLUDE (slot_id, user_id)
+    WHERE status = 'active';
+
+-- История пользователя, keyset-пагинация по (created_at, id):
+-- crud.get_booking_history, crud.get_booking_history_page
+CREATE INDEX IF NOT EXISTS ix_booking_user_created
+    ON bookings (user_id, created_at, id);
+
+-- slots(place_id, start_time, end_time) уже покрыт уникальным индексом
+-- uq_place_time_interval, отдельный индекс для overlap-запросов не нужен.
+
+ANALYZE bookings;
@@ -0,0 +1,22 @@
+-- Миграция: transactional outbox для уведомлений
+-- Дата: 2026-10-19
+--
+-- booking-service пишет событие в outbox в той же транзакции, что и
+-- изменение брони; фоновый диспетчер (outbox.py) доставляет его в
+-- notification-service, забирая строки через FOR UPDATE SKIP LOCKED.
+
+CREATE TABLE IF NOT EXISTS outbox (
+    id SERIAL PRIMARY KEY,
+    event_type VARCHAR(64) NOT NULL,
+    payload JSON NOT NULL,
+    status VARCHAR(32) NOT NULL DEFAULT 'pending',
+    attempts INT NOT NULL DEFAULT 0,
+    next_attempt_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+    last_error TEXT,
+    created_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+    delivered_at TIMESTAMPTZ
+);
+
+CREATE INDEX IF NOT EXISTS ix_outbox_pending
+    ON outbox (next_attempt_at, id)
+    WHERE status = 'pending';
@@ -0,0 +1,24 @@
+-- Миграция: учёт закрытий зон и группировка уведомлений
+-- Дата: 2026-10-19
+--
+-- close_zone отменяет брони одним UPDATE ... RETURNING и пишет по одному
+-- событию outbox на пользователя; zone_closures хранит итог закрытия, а
+-- outbox.zone_closure_id позволяет считать прогресс рассылки.
+
+CREATE TABLE IF NOT EXISTS zone_closures (
+    id SERIAL PRIMARY KEY,
+    zone_id INT NOT NULL REFERENCES zones(id) ON DELETE CASCADE,
+    reason TEXT NOT NULL,
+    from_time TIMESTAMPTZ NOT NULL,
+    to_time TIMESTAMPTZ NOT NULL,
+    affected_bookings INT NOT NULL DEFAULT 0,
+    affected_users INT NOT NULL DEFAULT 0,
+    created_at TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+
+CREATE INDEX IF NOT EXISTS ix_zone_closures_zone_id ON zone_closures (zone_id);
+
+ALTER TABLE outbox
+ADD COLUMN IF NOT EXISTS zone_closure_id INT REFERENCES zone_closures(id) ON DELETE SET NULL;
+
+CREATE INDEX IF NOT EXISTS ix_outbox_zone_closure_id ON outbox (zone_closure_id);
@@ -0,0 +1,15 @@
+-- Миграция: часы работы и шаг сетки слотов зоны
+-- Дата: 2026-10-19
+--
+-- Сетку слотов генерирует services/booking-service/slot_grid.py:
+-- ячейки по slot_minutes от opens_at до closes_at (UTC) для каждого места.
+
+ALTER TABLE zones
+ADD COLUMN IF NOT EXISTS opens_at TIME NOT NULL DEFAULT '08:00',
+ADD COLUMN IF NOT EXISTS closes_at TIME NOT NULL DEFAULT '22:00',
+ADD COLUMN IF NOT EXISTS slot_minutes INT NOT NULL DEFAULT 60;
+
+-- Сборщик мусора ищет прошедшие свободные слоты
+CREATE INDEX IF NOT EXISTS ix_slot_available_end
+    ON slots (end_time)
+    WHERE is_available;
@@ -242,7 +242,7 @@ export default function AdminPage() {
                     </div>
                     <div className="text-sm">
                       <span className="font-medium text-blue-700">
-                        Пользователей сейчас в коворкинге: {zone.current_occupancy}
+                        Занято мест сейчас: {zone.current_occupancy}
                       </span>
                     </div>
                   </div>
@@ -40,6 +40,15 @@ def get_all_users(db: Session) -> List[User]:
     """Получить всех подтверждённых пользователей (для массовой рассылки)"""
     return db.query(User).filter(User.confirmed == True).all()
 
+# Поля, которые можно запросить через POST /users/batch (без паролей и кодов)
+BATCH_FIELDS = ("id", "name", "email", "role")
+
+def get_users_by_ids(db: Session, ids: List[int], fields: List[str]) -> List[dict]:
+    """Пользователи по списку id одним запросом; читаются только нужные колонки"""
+    columns = [getattr(User, name) for name in fields]
+    rows = db.query(*columns).filter(User.id.in_(ids)).all()
+    return [dict(zip(fields, row)) for row in rows]
+
 def create_recovery_code(db: Session, email: str):
     user = get_user_by_email(db, email)
     if not user:
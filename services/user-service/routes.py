@@ -1,6 +1,6 @@
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
-from pydantic import BaseModel, EmailStr, Field, ConfigDict
+from pydantic import BaseModel, EmailStr, Field, ConfigDict, field_validator
 
 from crud import (
     create_user,
@@ -8,12 +8,14 @@ from crud import (
     get_user_by_email,
     get_user_by_id,
     get_all_users,
+    get_users_by_ids,
+    BATCH_FIELDS,
     create_recovery_code,
     reset_password
 )
 
 from auth import verify_password, create_access_token
-from config import SessionLocal
+from config import SessionLocal, USER_BATCH_MAX_IDS
 
 router = APIRouter()
 
@@ -47,6 +49,23 @@ class UserOut(BaseModel):
     email: EmailStr
     role: str
 
+class UserBatchRequest(BaseModel):
+    """Запрос пользователей пачкой: только указанные поля (id возвращается всегда)"""
+    ids: list[int] = Field(..., min_length=1, max_length=USER_BATCH_MAX_IDS)
+    fields: list[str] = Field(default_factory=lambda: ["id", "email"])
+
+    @field_validator("fields")
+    @classmethod
+    def check_fields(cls, value: list[str]) -> list[str]:
+        unknown = set(value) - set(BATCH_FIELDS)
+        if unknown:
+            raise ValueError(f"unknown fields: {sorted(unknown)}; allowed: {list(BATCH_FIELDS)}")
+        return ["id"] + [name for name in dict.fromkeys(value) if name != "id"]
+
+class UserBatchResponse(BaseModel):
+    users: list[dict]
+    missing: list[int]
+
 def get_db():
     db = SessionLocal()
     try:
@@ -95,6 +114,14 @@ def get_users(db: Session = Depends(get_db)):
     users = get_all_users(db)
     return users
 
+@router.post("/users/batch", response_model=UserBatchResponse)
+def get_users_batch(data: UserBatchRequest, db: Session = Depends(get_db)):
+    """Пользователи по списку id одним запросом (для массовых уведомлений)"""
+    ids = list(dict.fromkeys(data.ids))
+    users = get_users_by_ids(db, ids, data.fields)
+    found = {user["id"] for user in users}
+    return {"users": users, "missing": [user_id for user_id in ids if user_id not in found]}
+
 @router.get("/users/{user_id}", response_model=UserOut)
 def get_user(user_id: int, db: Session = Depends(get_db)):
     """Получить информацию о пользователе по ID"""
@@ -185,3 +185,28 @@ def test_duplicate_email_registration(mock_send_email, test_client, test_db):
         }
     )
     assert response.status_code == 400
+
+
+@patch('crud.send_email')
+def test_users_batch_returns_requested_fields(mock_send_email, test_client, test_db):
+    """POST /users/batch: один запрос на пачку id, только запрошенные поля"""
+    mock_send_email.return_value = None
+    first = create_user(test_db, "First", "first@example.com", "password123")
+    second = create_user(test_db, "Second", "second@example.com", "password123")
+
+    response = test_client.post(
+        "/users/batch",
+        json={"ids": [second.id, first.id, 999, first.id], "fields": ["email"]},
+    )
+    assert response.status_code == 200
+    data = response.json()
+    assert sorted(data["users"], key=lambda u: u["id"]) == [
+        {"id": first.id, "email": "first@example.com"},
+        {"id": second.id, "email": "second@example.com"},
+    ]
+    assert data["missing"] == [999]
+
+    response = test_client.post(
+        "/users/batch", json={"ids": [first.id], "fields": ["hashed_password"]}
+    )
+    assert response.status_code == 422